@@ -44,8 +44,16 @@ mkdir -p staticfiles
 # Install any static-related requirements
 $PY -m pip install whitenoise
 
-# Collect static files
-echo "Collecting static files..."
+# Compile the stylesheet templates link to (static/notes/css/tailwind.css)
+# from assets/css/input.css and tailwind.config.js
+echo "Building Tailwind CSS..."
+npm install --no-audit --no-fund
+npm run build:prod
+
+# Collect static files. The production storage (stunotesapp/static_storage.py)
+# builds STATIC_BUNDLES, minifies JS/CSS, adds content hashes to file names
+# and writes .gz/.br variants next to each file.
+echo "Collecting, minifying and compressing static files..."
 export DJANGO_SETTINGS_MODULE=stunotesapp.settings
 $PY manage.py collectstatic --noinput
 
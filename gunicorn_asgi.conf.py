@@ -0,0 +1,13 @@
+# Gunicorn config for serving stunotesapp.asgi with uvicorn workers.
+#   gunicorn -c gunicorn_asgi.conf.py stunotesapp.asgi:application
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+worker_class = 'uvicorn.workers.UvicornWorker'
+# One event loop per worker handles many concurrent requests, so fewer
+# workers are needed than with the sync (WSGI) setup.
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = 5
+accesslog = '-'
@@ -0,0 +1,129 @@
+"""
+Deferred account deletion.
+
+`user.delete()` makes Django's collector load every task, note, reminder and
+admin request of the user into memory before deleting them, which can run
+past the serverless request timeout for heavy accounts. Instead:
+
+1. `schedule_account_deletion` deactivates the user (they can no longer log
+   in and existing sessions stop authenticating) and records an
+   `AccountDeletion` row. This is all the request does.
+2. `purge_pending_deletions` (run by the cron endpoint or the
+   `purge_deleted_accounts` command) deletes the related rows in bounded
+   batches with plain DELETE statements, updating progress as it goes, and
+   finally removes the user row.
+"""
+import time
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import facets
+from .models import (
+    AccountDeletion, AdminRequest, ArchivedTask, Note, NoteFingerprint, NoteRevision, NoteVector, Reminder,
+    RenderedNote, SyncTombstone, Task, User,
+)
+
+DEFAULT_BATCH_SIZE = 1000
+
+# (model, lookup from the model to the owning user's id), children first
+PURGE_STEPS = [
+    (Reminder, 'task__user_id'),
+    (Task, 'user_id'),
+    (ArchivedTask, 'user_id'),
+    (NoteRevision, 'note__user_id'),
+    (NoteVector, 'user_id'),
+    (NoteFingerprint, 'user_id'),
+    (RenderedNote, 'note__user_id'),
+    (Note, 'user_id'),
+    (AdminRequest, 'requester_id'),
+    (SyncTombstone, 'user_id'),
+]
+
+
+def schedule_account_deletion(user, requested_by=None):
+    """Deactivate `user` now and queue the purge of their data."""
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        deletion, _ = AccountDeletion.objects.update_or_create(
+            user=user,
+            defaults={
+                'email': user.email,
+                'requested_by': requested_by,
+                'status': 'pending',
+                'total_rows': sum(model.objects.filter(**{lookup: user.pk}).count() for model, lookup in PURGE_STEPS),
+                'deleted_rows': 0,
+                'error': '',
+            },
+        )
+    return deletion
+
+
+def _raw_delete(model, ids):
+    """DELETE by primary key without the ORM collector (no cascades, no signals)."""
+    table = connection.ops.quote_name(model._meta.db_table)
+    pk = connection.ops.quote_name(model._meta.pk.column)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {pk} IN ({placeholders})', ids)
+        return cursor.rowcount
+
+
+def purge_account(deletion, batch_size=DEFAULT_BATCH_SIZE, deadline=None):
+    """
+    Delete one account's rows in batches of `batch_size`.
+    Stops early (returning False) when `deadline` (a time.monotonic() value)
+    passes; the next run picks up where this one left off.
+    """
+    user_id = deletion.user_id
+    if deletion.status == 'pending':
+        # The batches below skip model signals, so settle the subject facets first
+        facets.release_user(user_id)
+        deletion.status = 'running'
+        deletion.started_at = timezone.now()
+        deletion.save(update_fields=['status', 'started_at'])
+
+    for model, lookup in PURGE_STEPS:
+        while True:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            # Newest first: a stored occurrence is always newer than its series
+            ids = list(model.objects.filter(**{lookup: user_id}).order_by('-pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                deleted = _raw_delete(model, ids)
+                AccountDeletion.objects.filter(pk=deletion.pk).update(
+                    deleted_rows=F('deleted_rows') + deleted
+                )
+
+    # Only the user row (and small auth tables) are left; the collector is cheap now
+    with transaction.atomic():
+        AdminRequest.objects.filter(reviewed_by_id=user_id).update(reviewed_by=None)
+        User.objects.filter(pk=user_id).delete()
+        AccountDeletion.objects.filter(pk=deletion.pk).update(status='done', finished_at=timezone.now())
+    return True
+
+
+def purge_pending_deletions(batch_size=DEFAULT_BATCH_SIZE, time_budget=None):
+    """
+    Work through queued deletions, oldest first. `time_budget` (seconds)
+    bounds one invocation so it fits in a serverless function run.
+    Returns the number of accounts fully purged.
+    """
+    deadline = time.monotonic() + time_budget if time_budget else None
+    purged = 0
+    queue = AccountDeletion.objects.filter(status__in=['pending', 'running']).order_by('created_at')
+    for deletion in queue:
+        if deletion.user_id is None:
+            AccountDeletion.objects.filter(pk=deletion.pk).update(status='done', finished_at=timezone.now())
+            continue
+        try:
+            if not purge_account(deletion, batch_size=batch_size, deadline=deadline):
+                break
+            purged += 1
+        except Exception as exc:
+            AccountDeletion.objects.filter(pk=deletion.pk).update(status='failed', error=str(exc))
+    return purged
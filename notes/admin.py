@@ -1,9 +1,33 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Task, Note, Reminder
+from .facets import global_counts, kind_of
+from .models import User, Task, Note, Reminder, AccountDeletion
+from .pagination import EstimatedCountPaginator
+
+
+class EstimatedCountMixin:
+    """Changelist counts from planner estimates on large tables (see notes/pagination.py)."""
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered COUNT(*) behind "N results (M total)"
+    show_full_result_count = False
+
+
+class SubjectListFilter(admin.SimpleListFilter):
+    """`subject` sidebar filter whose choices come from the facet table (notes/facets.py)."""
+    title = 'subject'
+    parameter_name = 'subject'
+
+    def lookups(self, request, model_admin):
+        return [(subject, f"{subject} ({count})") for subject, count in global_counts(kind_of(model_admin.model))]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(subject=self.value())
+        return queryset
+
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(EstimatedCountMixin, BaseUserAdmin):
     """
     Admin configuration for the User model.
 
@@ -46,9 +70,9 @@ class UserAdmin(BaseUserAdmin):
 # -------------------------
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(EstimatedCountMixin, admin.ModelAdmin):
     list_display = ['title', 'user', 'subject', 'priority', 'status', 'due_date', 'created_at']
-    list_filter = ['priority', 'status', 'subject', 'created_at', 'due_date']
+    list_filter = ['priority', 'status', SubjectListFilter, 'created_at', 'due_date']
     search_fields = ['title', 'user__username', 'subject', 'description']
     ordering = ['-created_at']
     
@@ -67,11 +91,16 @@ class TaskAdmin(admin.ModelAdmin):
 
 
 @admin.register(Note)
-class NoteAdmin(admin.ModelAdmin):
+class NoteAdmin(EstimatedCountMixin, admin.ModelAdmin):
     list_display = ['title', 'user', 'subject', 'created_at']
-    list_filter = ['subject', 'created_at']
-    search_fields = ['title', 'user__username', 'content', 'subject', 'tags']
+    list_filter = [SubjectListFilter, 'created_at']
+    # Not `content`: large note bodies are stored compressed (notes/fields.py)
+    search_fields = ['title', 'user__username', 'subject', 'tags']
     ordering = ['-created_at']
+
+    def get_queryset(self, request):
+        # The changelist never shows the body; the change form loads it on access
+        return super().get_queryset(request).defer('content')
     
     fieldsets = (
         ('Note Information', {
@@ -88,7 +117,7 @@ class NoteAdmin(admin.ModelAdmin):
 
 
 @admin.register(Reminder)
-class ReminderAdmin(admin.ModelAdmin):
+class ReminderAdmin(EstimatedCountMixin, admin.ModelAdmin):
     list_display = ['task', 'remind_time', 'is_sent', 'created_at']
     list_filter = ['is_sent', 'remind_time', 'created_at']
     search_fields = ['task__title', 'task__user__username']
@@ -105,6 +134,27 @@ class ReminderAdmin(admin.ModelAdmin):
         js = ('admin_assets/js/admin.js',)
 
 
+@admin.register(AccountDeletion)
+class AccountDeletionAdmin(admin.ModelAdmin):
+    """Progress of scheduled account purges (read-only; the cron job updates them)."""
+    list_display = ['email', 'status', 'progress_display', 'deleted_rows', 'total_rows', 'requested_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['email']
+    ordering = ['-created_at']
+    readonly_fields = ['user', 'email', 'requested_by', 'status', 'total_rows', 'deleted_rows', 'error', 'created_at', 'started_at', 'finished_at']
+
+    @admin.display(description='Progress')
+    def progress_display(self, obj):
+        return f"{obj.progress}%"
+
+    def has_add_permission(self, request):
+        return False
+
+    class Media:
+        css = {'all': ('admin_assets/css/admin.css',)}
+        js = ('admin_assets/js/admin.js',)
+
+
 # Customize the admin site headers and titles
 admin.site.site_header = "StuNotes Administration"
 admin.site.site_title = "StuNotes Admin Portal"
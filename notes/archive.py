@@ -0,0 +1,134 @@
+"""
+Archival of completed tasks.
+
+Completed tasks are kept forever for the history panel, but every dashboard
+query filters `notes_task`, so a long history makes each of them slower.
+Tasks completed more than TASK_ARCHIVE_AFTER_DAYS ago (by `updated_at`)
+are moved, in batches, to `ArchivedTask` in `notes_task_archive`, keeping
+their ids. The cron endpoint and ``manage.py archive_completed_tasks`` run
+`archive_completed_tasks`.
+
+A task is deleted through the ORM when it is archived, so the usual
+signals run: the dashboard sync sees a tombstone, subject facets and
+suggestions drop it, its reminders go with it. Recurring series and
+occurrences stored for a series stay in `notes_task`; expanding a series
+relies on them.
+
+`completed_history` pages through both tables newest first, so the history
+panel doesn't show where a task lives. Each page costs one LIMITed index
+scan per table, however long the history.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import ArchivedTask, Task
+from .pagination import encode_cursor, keyset_page
+
+DEFAULT_ARCHIVE_AFTER_DAYS = 90
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PAGE_SIZE = 25
+
+_ARCHIVED_FIELDS = ('id', 'user_id', 'title', 'description', 'subject', 'priority', 'due_date', 'created_at')
+
+
+def archivable(now=None):
+    """Tasks completed before the cutoff that may leave `notes_task`; None when archival is off."""
+    days = getattr(settings, 'TASK_ARCHIVE_AFTER_DAYS', DEFAULT_ARCHIVE_AFTER_DAYS)
+    if not days:
+        return None
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    return Task.objects.filter(
+        status='completed', updated_at__lt=cutoff,
+        recurrence='', series__isnull=True, occurrences__isnull=True,
+    )
+
+
+def _archive(tasks):
+    ArchivedTask.objects.bulk_create(
+        (ArchivedTask(completed_at=task.updated_at, **{f: getattr(task, f) for f in _ARCHIVED_FIELDS})
+         for task in tasks),
+        ignore_conflicts=True,
+    )
+    Task.objects.filter(pk__in=[task.pk for task in tasks]).delete()
+
+
+def archive_completed_tasks(batch_size=DEFAULT_BATCH_SIZE, time_budget=None, now=None):
+    """
+    Archive archivable tasks, `batch_size` per transaction, until none are
+    left or `time_budget` (seconds) runs out. Returns the number archived.
+    """
+    queryset = archivable(now)
+    if queryset is None:
+        return 0
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
+    archived = 0
+    while deadline is None or time.monotonic() < deadline:
+        with transaction.atomic():
+            # Locked, so a task reopened meanwhile is not archived
+            batch = list(queryset.select_for_update(of=('self',)).order_by('pk')[:batch_size])
+            if not batch:
+                break
+            _archive(batch)
+        archived += len(batch)
+    return archived
+
+
+def archived_count(user):
+    return ArchivedTask.objects.filter(user=user).count()
+
+
+def total_count(user):
+    """All of the user's tasks, live and archived (the sidebar and profile total)."""
+    return Task.objects.filter(user=user).count() + archived_count(user)
+
+
+def archived_totals():
+    """Archived tasks of all users, in total and by priority, in one query."""
+    return ArchivedTask.objects.aggregate(
+        total=Count('pk'),
+        **{priority: Count('pk', filter=Q(priority=priority)) for priority, _ in Task.PRIORITY_CHOICES},
+    )
+
+
+# ---------------------------------------------------
+# Completed-task history
+# ---------------------------------------------------
+
+def completed_history(user, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    The user's completed tasks, live and archived, most recently completed
+    first. Returns ``(rows, next_cursor)`` like `keyset_page`; rows are
+    `Task` and `ArchivedTask` instances, both with `completed_at` set.
+    """
+    live, live_more = keyset_page(
+        Task.objects.filter(user=user, status='completed').only('id', 'title', 'description', 'priority', 'updated_at'),
+        cursor=cursor, field='updated_at', page_size=page_size,
+    )
+    archived, archived_more = keyset_page(
+        ArchivedTask.objects.filter(user=user).only('id', 'title', 'description', 'priority', 'completed_at'),
+        cursor=cursor, field='completed_at', page_size=page_size,
+    )
+    for task in live:
+        task.completed_at = task.updated_at
+    rows = sorted([*live, *archived], key=lambda row: (row.completed_at, row.pk), reverse=True)
+    more = len(rows) > page_size or live_more or archived_more
+    rows = rows[:page_size]
+    if not more or not rows:
+        return rows, None
+    return rows, encode_cursor(rows[-1], 'completed_at')
+
+
+def serialize_completed(row):
+    return {
+        'id': row.pk,
+        'title': row.title,
+        'description': row.description,
+        'priority': row.priority,
+        'completed_at': row.completed_at.isoformat(),
+        'archived': isinstance(row, ArchivedTask),
+    }
@@ -0,0 +1,291 @@
+"""
+Async (ASGI) variants of the read-heavy dashboard and profile views.
+
+The queries go through Django's async ORM (`acount`, `async for`). In
+Django 4.2 each of those calls is `sync_to_async(thread_sensitive=True)`, so a
+request's queries share one thread and one connection and still run one after
+another, exactly as in the sync views; they are awaited in turn rather than
+gathered. What the async views buy is that a request waiting on the database
+doesn't hold a worker: the event loop keeps serving other requests. Storage
+calls (Cloudinary) don't touch the database and run in worker threads
+(`thread_sensitive=False`), so those are gathered and overlap for real.
+
+They are only routed when `ASYNC_VIEWS` is enabled (see `stunotesapp/asgi.py`);
+under WSGI the sync views stay in place, since Django would otherwise have
+to spin up an event loop per request.
+"""
+
+import asyncio
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.db.models import Count, Q
+from django.shortcuts import redirect, render
+from django.utils import timezone
+
+from .forms import UserProfileForm
+from .models import ArchivedTask, Note, Task, User
+from .routers import read_only
+from .thumbnails import delete_profile_thumbnails, generate_profile_thumbnails
+from . import archive, facets, recurrence, sync, views
+
+
+def _load_user(request):
+    # Evaluate the lazy request.user (session + user lookup) in a sync thread
+    return request.user if request.user.is_authenticated else None
+
+
+def async_login_required(view):
+    """`login_required` for coroutine views (Django 4.2's decorator is sync-only)."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await sync_to_async(_load_user)(request)
+        if user is None:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _session_get(request, key, default=None):
+    return await sync_to_async(request.session.get)(key, default)
+
+
+def _storage_delete(fieldfile):
+    try:
+        fieldfile.delete(save=False)
+    except Exception:
+        pass
+
+
+async def _arender(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+@async_login_required
+async def home(request):
+    """
+    Async version of `views.home`. Only the read-only dashboard render is
+    async; task create/edit (POST or ?edit=) goes through the sync view.
+    """
+    user = request.user
+    if request.method == "POST" or request.GET.get("edit") or user.is_staff or user.is_superuser:
+        return await sync_to_async(views.home)(request)
+
+    tasks = Task.objects.filter(user=user).order_by('-created_at')
+    user_notes = Note.objects.filter(user=user)
+    now = timezone.now()
+
+    total_tasks = await tasks.acount()
+    completed_tasks_count = await tasks.filter(status='completed').acount()
+    pending_tasks_count = await tasks.filter(status='pending').acount()
+    in_progress_tasks = await tasks.filter(status='in_progress').acount()
+    overdue_tasks_count = await tasks.overdue(now).acount()
+    total_notes = await user_notes.acount()
+    view_as_user = await _session_get(request, 'view_as_user', False)
+    open_tasks = await _alist(tasks.active().with_is_overdue(now)[:10])
+    notes = await _alist(user_notes.only('id', 'title', 'subject', 'created_at').order_by('-created_at')[:5])
+    today_tasks = await _alist(tasks.due_today(now).order_by('due_date'))
+    pending_tasks_list = await _alist(
+        tasks.filter(status='pending').only('id', 'title', 'due_date').order_by('due_date')
+    )
+    overdue_tasks_list = await _alist(tasks.overdue(now).only('id', 'title', 'due_date').order_by('due_date'))
+    all_notes_list = await _alist(user_notes.only('id', 'title', 'subject', 'created_at').order_by('-created_at'))
+    unique_subjects = await _alist(facets.user_subjects(user))
+    upcoming_tasks = await _alist(tasks.upcoming(24, now).only('id', 'title', 'due_date').order_by('due_date'))
+    occurrences = await sync_to_async(recurrence.dashboard_occurrences)(user, now)
+    archived_tasks_count = await ArchivedTask.objects.filter(user=user).acount()
+    completed_tasks_list, completed_next_cursor = await sync_to_async(archive.completed_history)(user)
+
+    context = {
+        'tasks': [*occurrences['next'], *open_tasks],
+        'notes': notes,
+        'form': views.TaskForm(),
+        'edit_form': None,
+        'task_to_edit': None,
+        'total_tasks': total_tasks + archived_tasks_count,
+        'completed_tasks': completed_tasks_count + archived_tasks_count,
+        'pending_tasks': pending_tasks_count,
+        'in_progress_tasks': in_progress_tasks,
+        'overdue_tasks': overdue_tasks_count,
+        'total_notes': total_notes,
+        'today_tasks': sorted([*today_tasks, *occurrences['today']], key=lambda t: t.due_date),
+        'completed_tasks_list': completed_tasks_list,
+        'completed_next_cursor': completed_next_cursor,
+        'pending_tasks_list': pending_tasks_list,
+        'overdue_tasks_list': overdue_tasks_list,
+        'all_notes_list': all_notes_list,
+        'upcoming_tasks': sorted([*upcoming_tasks, *occurrences['upcoming']], key=lambda t: t.due_date),
+        'unique_subjects': unique_subjects,
+        'total_tasks_count': total_tasks + archived_tasks_count,
+        'total_notes_sidebar': total_notes,
+        'view_as_user': view_as_user,
+        **sync.page_context(now),
+    }
+    return await _arender(request, "home.html", context)
+
+
+@read_only
+@async_login_required
+async def admin_dashboard(request):
+    """Async version of `views.admin_dashboard`."""
+    if not (request.user.is_staff or request.user.is_superuser):
+        messages.error(request, "You don't have permission to access the admin dashboard.")
+        return redirect("notes:home")
+
+    def _clear_view_as_user():
+        request.session.pop('view_as_user', None)
+    await sync_to_async(_clear_view_as_user)()
+
+    all_users = User.objects.all()
+    all_tasks = Task.objects.all()
+    all_notes = Note.objects.all()
+
+    # Last 7 days in the local timezone, as explicit [start, end) boundaries
+    start_day = timezone.localdate() - timedelta(days=6)
+    days = [start_day + timedelta(days=i) for i in range(7)]
+    bounds = [
+        (
+            timezone.make_aware(timezone.datetime.combine(day, timezone.datetime.min.time())),
+            timezone.make_aware(timezone.datetime.combine(day + timedelta(days=1), timezone.datetime.min.time())),
+        )
+        for day in days
+    ]
+
+    total_users = await all_users.acount()
+    admin_users = await all_users.filter(Q(is_staff=True) | Q(is_superuser=True)).acount()
+    total_tasks = await all_tasks.acount()
+    completed_tasks = await all_tasks.filter(status='completed').acount()
+    pending_tasks = await all_tasks.filter(status='pending').acount()
+    overdue_tasks = await all_tasks.overdue().acount()
+    total_notes = await all_notes.acount()
+    high_priority_tasks = await all_tasks.filter(priority='high').acount()
+    medium_priority_tasks = await all_tasks.filter(priority='medium').acount()
+    low_priority_tasks = await all_tasks.filter(priority='low').acount()
+    recent_users = await _alist(all_users.order_by('-created_at')[:5])
+    recent_tasks = await _alist(all_tasks.select_related('user').order_by('-created_at')[:10])
+    recent_notes = await _alist(all_notes.select_related('user').order_by('-created_at')[:10])
+    user_stats = await _alist(
+        all_users.annotate(task_count=Count('tasks'), note_count=Count('notes')).order_by('-task_count')[:10]
+    )
+    users_list = await _alist(all_users)
+    daily_tasks = [await all_tasks.filter(created_at__gte=s, created_at__lt=e).acount() for s, e in bounds]
+    daily_notes = [await all_notes.filter(created_at__gte=s, created_at__lt=e).acount() for s, e in bounds]
+    archived = await sync_to_async(archive.archived_totals)()
+
+    context = {
+        'total_users': total_users,
+        'admin_users': admin_users,
+        'regular_users': total_users - admin_users,
+        'total_tasks': total_tasks + archived['total'],
+        'completed_tasks': completed_tasks + archived['total'],
+        'pending_tasks': pending_tasks,
+        'overdue_tasks': overdue_tasks,
+        'high_priority_tasks': high_priority_tasks + archived['high'],
+        'medium_priority_tasks': medium_priority_tasks + archived['medium'],
+        'low_priority_tasks': low_priority_tasks + archived['low'],
+        'total_notes': total_notes,
+        'recent_users': recent_users,
+        'recent_tasks': recent_tasks,
+        'recent_notes': recent_notes,
+        'user_stats': user_stats,
+        'all_users': users_list,
+        'date_labels': [day.strftime('%b %d') for day in days],
+        'daily_tasks': daily_tasks,
+        'daily_notes': daily_notes,
+        'show_switch_to_user': False,
+        'view_as_user': False,
+    }
+    return await _arender(request, 'admin_dashboard.html', context)
+
+
+@read_only
+@async_login_required
+async def profile_view(request):
+    """Async version of `views.profile_view`."""
+    user = request.user
+    views.fill_display_names(user)
+
+    total_tasks = await Task.objects.filter(user=user).acount()
+    completed_tasks = await Task.objects.filter(user=user, status='completed').acount()
+    archived_tasks = await ArchivedTask.objects.filter(user=user).acount()
+    total_notes = await Note.objects.filter(user=user).acount()
+    view_as_user = await _session_get(request, 'view_as_user', False)
+
+    context = {
+        'user': user,
+        'total_notes_created': total_notes,
+        'total_tasks_created': total_tasks + archived_tasks,
+        'tasks_completed': completed_tasks + archived_tasks,
+        'view_as_user': view_as_user,
+    }
+    return await _arender(request, 'profile_view.html', context)
+
+
+@async_login_required
+async def edit_profile(request):
+    """
+    Async version of `views.edit_profile`. Deleting the old picture and its
+    thumbnails are independent Cloudinary calls, so they run concurrently.
+    """
+    user = request.user
+    views.fill_display_names(user)
+
+    if request.method != "POST":
+        return await sync_to_async(views.edit_profile)(request)
+
+    old = (await User.objects.only('profile_pic').aget(pk=user.pk)).profile_pic
+
+    if request.POST.get('remove_profile_pic') == '1':
+        try:
+            await asyncio.gather(
+                sync_to_async(_storage_delete, thread_sensitive=False)(old),
+                sync_to_async(delete_profile_thumbnails, thread_sensitive=False)(user),
+            )
+            user.profile_pic = None
+            await user.asave(update_fields=['profile_pic', 'profile_pic_thumbs'])
+            messages.success(request, "Profile picture removed. You can upload a new one.")
+        except Exception:
+            messages.error(request, "Failed to remove profile picture. Please try again.")
+        return redirect("notes:edit_profile")
+
+    form = UserProfileForm(request.POST, request.FILES, instance=user)
+    if not await sync_to_async(form.is_valid)():
+        messages.error(request, "Please correct the errors below.")
+        return await _arender(request, 'edit_profile.html', {"form": form, "user": user})
+
+    profile = form.save(commit=False)
+    uploaded = request.FILES.get('profile_pic')
+    if uploaded:
+        # As in the sync view: the old thumbnails go with every upload
+        await asyncio.gather(
+            sync_to_async(_storage_delete, thread_sensitive=False)(old),
+            sync_to_async(delete_profile_thumbnails, thread_sensitive=False)(profile),
+        )
+
+    first_name = request.POST.get('first_name', '').strip()
+    last_name = request.POST.get('last_name', '').strip()
+    profile.first_name = first_name
+    profile.last_name = last_name
+    full_from_post = request.POST.get('full_name', '').strip()
+    if full_from_post:
+        profile.full_name = full_from_post
+    else:
+        profile.full_name = (first_name + (' ' + last_name if first_name and last_name else '')).strip() or profile.full_name
+
+    # Saving uploads the new original, so it has to run before the thumbnails
+    await sync_to_async(profile.save)()
+    if uploaded:
+        try:
+            await sync_to_async(generate_profile_thumbnails, thread_sensitive=False)(profile, source=uploaded)
+            await profile.asave(update_fields=['profile_pic_thumbs'])
+        except Exception:
+            pass
+    messages.success(request, "Your profile has been updated successfully!")
+    return redirect("notes:profile_view")
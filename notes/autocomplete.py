@@ -0,0 +1,105 @@
+"""
+Subject and tag suggestions for the task and note forms.
+
+Each user's distinct subjects (from the facet counts in notes/facets.py,
+tasks and notes together) and note tags are loaded once into a
+`PrefixIndex`: a sorted list of lowercased keys searched with bisect. Every
+value is indexed under its full text and under each later word, so "bio"
+finds both "Biology" and "Intro to Biology". Suggestions are ranked by how
+often the value is used, then alphabetically. Values that differ only in
+case are merged under their most used spelling, which nudges users towards
+one spelling per subject.
+
+Indexes are kept per process for `AUTOCOMPLETE_MAX_INDEXES` users (see
+notes/local_cache.py). Task and note writes invalidate the user's index
+(notes/signals.py); without a shared cache other processes rebuild theirs
+once it is `AUTOCOMPLETE_INDEX_TTL` seconds old.
+"""
+import heapq
+import re
+from bisect import bisect_left
+
+from django.db.models import Sum
+
+from .local_cache import UserCache
+from .models import Note, SubjectFacet
+
+FIELDS = ('subject', 'tag')
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+DEFAULT_INDEX_TTL = 300
+DEFAULT_MAX_INDEXES = 500
+
+# Past the last character any key can contain
+_KEY_END = '\U0010ffff'
+_WORD_START = re.compile(r'(?<=[\s\-/_(])\w')
+
+
+def _normalize(text):
+    return ' '.join(text.casefold().split())
+
+
+class PrefixIndex:
+    """Prefix lookups over weighted ``(value, count)`` pairs."""
+
+    def __init__(self, pairs):
+        spellings = {}
+        for value, count in pairs:
+            value = value.strip()
+            if value:
+                key = _normalize(value)
+                spellings.setdefault(key, {}).setdefault(value, 0)
+                spellings[key][value] += count
+        ranked = sorted(
+            ((sum(counts.values()), key, max(counts, key=counts.get)) for key, counts in spellings.items()),
+            key=lambda entry: (-entry[0], entry[1]),
+        )
+        # A value's position in `values` is its rank, so the best matches
+        # for a prefix are the smallest ids in its key range
+        self.values = [(value, count) for count, _, value in ranked]
+        entries = []
+        for rank, (_, key, _) in enumerate(ranked):
+            entries.append((key, rank))
+            entries.extend((key[match.start():], rank) for match in _WORD_START.finditer(key))
+        entries.sort()
+        self._keys = [key for key, _ in entries]
+        self._ids = [rank for _, rank in entries]
+
+    def __len__(self):
+        return len(self.values)
+
+    def complete(self, prefix, limit=DEFAULT_LIMIT):
+        """Up to `limit` ``(value, count)`` pairs matching `prefix`, best first."""
+        prefix = _normalize(prefix)
+        if not prefix:
+            return self.values[:limit]
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + _KEY_END, lo)
+        return [self.values[rank] for rank in heapq.nsmallest(limit, set(self._ids[lo:hi]))]
+
+
+# ---------------------------------------------------
+# Per-user indexes
+# ---------------------------------------------------
+
+def build_indexes(user_id):
+    """``{field: PrefixIndex}`` for the user, read from the database."""
+    subjects = (SubjectFacet.objects.filter(user_id=user_id).values('subject')
+                .annotate(n=Sum('count')).values_list('subject', 'n').order_by())
+    tags = []
+    for value in Note.objects.filter(user_id=user_id).exclude(tags='').values_list('tags', flat=True):
+        tags.extend((tag, 1) for tag in value.split(','))
+    return {'subject': PrefixIndex(subjects), 'tag': PrefixIndex(tags)}
+
+
+_indexes = UserCache(
+    'autocomplete', build_indexes,
+    'AUTOCOMPLETE_MAX_INDEXES', DEFAULT_MAX_INDEXES, 'AUTOCOMPLETE_INDEX_TTL', DEFAULT_INDEX_TTL,
+)
+get_indexes = _indexes.get
+invalidate = _indexes.invalidate
+
+
+def suggest(user_id, field, prefix, limit=DEFAULT_LIMIT):
+    """The user's `field` values ('subject' or 'tag') starting with `prefix`."""
+    return get_indexes(user_id)[field].complete(prefix, limit)
@@ -0,0 +1,242 @@
+"""
+Response optimization: HTML minification and gzip/brotli compression.
+
+`response_compression_middleware` post-processes every response Django
+produces (static files are served, already compressed, by WhiteNoise before
+it):
+
+- HTML is minified when RESPONSE_MINIFY_HTML is on. Comments are dropped and
+  whitespace runs next to tags are collapsed to one character. Tags are
+  copied as they are (a quoted attribute value may contain '>' or several
+  spaces), and so is the text inside <pre>, <textarea>, <script> and
+  <style>, so the page renders and submits exactly as before.
+- Text responses of at least RESPONSE_COMPRESS_MIN_BYTES are compressed with
+  brotli or gzip, whichever the client's Accept-Encoding prefers (brotli on
+  ties). Buffered gzip responses get Django's random filename padding
+  against BREACH.
+- Streaming responses (sync or async) are compressed chunk by chunk, flushing
+  after each so clients still receive data as it is produced. Event streams
+  are passed through untouched.
+"""
+import re
+import zlib
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+GZIP_LEVEL = 6
+# Responses are compressed on every request: favour speed over the last few %
+BROTLI_QUALITY = 5
+# Same padding as django.middleware.gzip.GZipMiddleware
+GZIP_MAX_RANDOM_BYTES = 100
+DEFAULT_MIN_BYTES = 1024
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/javascript', 'application/xml',
+    'application/xhtml+xml', 'image/svg+xml',
+)
+UNCOMPRESSED_TYPES = ('text/event-stream',)
+
+_PRESERVE = re.compile(r'<(pre|textarea|script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+# A comment, or a tag whose quoted attribute values may contain '>'
+_MARKUP = re.compile(
+    r'<!--.*?-->|</?[A-Za-z][^>"\']*(?:(?:"[^"]*"|\'[^\']*\')[^>"\']*)*>|<![^>]*>', re.DOTALL,
+)
+# Conditional comments (<!--[if ...]>) are kept
+_COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.DOTALL)
+_EDGE_WHITESPACE = re.compile(r'\A\s{2,}|\s{2,}\Z')
+
+
+# ---------------------------------------------------
+# HTML minification
+# ---------------------------------------------------
+
+def _collapse(match):
+    return '\n' if '\n' in match.group() else ' '
+
+
+def _minify_text(text):
+    return _EDGE_WHITESPACE.sub(_collapse, text)
+
+
+def _minify_segment(segment):
+    # Only the text between tags is touched
+    parts, text, last = [], '', 0
+    for match in _MARKUP.finditer(segment):
+        text += segment[last:match.start()]
+        last = match.end()
+        if _COMMENT.fullmatch(match.group()):
+            continue  # dropped; the text on either side joins up
+        parts += [_minify_text(text), match.group()]
+        text = ''
+    parts.append(_minify_text(text + segment[last:]))
+    return ''.join(parts)
+
+
+def minify_html(html):
+    """Drop comments and collapse whitespace between tags, outside pre/textarea/script/style."""
+    parts, last = [], 0
+    for match in _PRESERVE.finditer(html):
+        parts.append(_minify_segment(html[last:match.start()]))
+        parts.append(match.group())
+        last = match.end()
+    parts.append(_minify_segment(html[last:]))
+    return ''.join(parts)
+
+
+# ---------------------------------------------------
+# Compression
+# ---------------------------------------------------
+
+def _parse_accept_encoding(header):
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    """'br', 'gzip' or None for an Accept-Encoding header value."""
+    accepted = _parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get('*', 0.0)
+    candidates = [('br', 2), ('gzip', 1)] if brotli is not None else [('gzip', 1)]
+    best = max(
+        ((accepted.get(coding, wildcard), rank, coding) for coding, rank in candidates),
+        default=(0.0, 0, None),
+    )
+    return best[2] if best[0] > 0 else None
+
+
+def compress_bytes(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return compress_string(data, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+
+
+class _StreamEncoder:
+    """Incremental gzip/brotli encoder that flushes after every chunk."""
+
+    def __init__(self, encoding):
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self.encoding = encoding
+
+    def encode(self, chunk):
+        if self.encoding == 'br':
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def _compress_stream(chunks, encoding):
+    encoder = _StreamEncoder(encoding)
+    for chunk in chunks:
+        data = encoder.encode(chunk)
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+async def _compress_async_stream(chunks, encoding):
+    encoder = _StreamEncoder(encoding)
+    async for chunk in chunks:
+        data = encoder.encode(chunk)
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+# ---------------------------------------------------
+# Middleware
+# ---------------------------------------------------
+
+def _media_type(response):
+    return response.get('Content-Type', '').partition(';')[0].strip().lower()
+
+
+def _compressible(media_type):
+    if media_type in UNCOMPRESSED_TYPES:
+        return False
+    return media_type.startswith('text/') or media_type in COMPRESSIBLE_TYPES
+
+
+def _optimize(request, response):
+    if response.has_header('Content-Encoding') or 'no-transform' in response.get('Cache-Control', ''):
+        return response
+    media_type = _media_type(response)
+    if not _compressible(media_type):
+        return response
+
+    if (media_type == 'text/html' and not response.streaming
+            and getattr(settings, 'RESPONSE_MINIFY_HTML', True)):
+        charset = response.charset
+        response.content = minify_html(response.content.decode(charset)).encode(charset)
+        if response.has_header('Content-Length'):
+            response.headers['Content-Length'] = str(len(response.content))
+
+    min_bytes = getattr(settings, 'RESPONSE_COMPRESS_MIN_BYTES', DEFAULT_MIN_BYTES)
+    if not response.streaming and len(response.content) < min_bytes:
+        return response
+
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if encoding is None:
+        return response
+
+    if response.streaming:
+        if response.is_async:
+            response.streaming_content = _compress_async_stream(response.streaming_content, encoding)
+        else:
+            response.streaming_content = _compress_stream(response.streaming_content, encoding)
+        del response.headers['Content-Length']
+    else:
+        compressed = compress_bytes(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+
+    # The representation changed; a strong validator must become weak
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response.headers['ETag'] = 'W/' + etag
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+@sync_and_async_middleware
+def response_compression_middleware(get_response):
+    """Minifies HTML and gzip/brotli-compresses responses (see module docstring)."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            return _optimize(request, await get_response(request))
+    else:
+        def middleware(request):
+            return _optimize(request, get_response(request))
+    return middleware
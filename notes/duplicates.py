@@ -0,0 +1,197 @@
+"""
+Near-duplicate notes, found with 64-bit SimHash fingerprints.
+
+Saving a note splits its title and content into overlapping two-word
+shingles. Every shingle's 64-bit hash votes on each bit of the fingerprint,
+which keeps the bits most shingles agree on, so a few edited, added or
+removed words flip only a few bits. Two notes are near-duplicates when their
+fingerprints differ in at most `MAX_DISTANCE` bits.
+
+`NoteFingerprint` stores the fingerprint together with its four 16-bit
+bands in per-user indexed columns. Seven differing bits spread over four
+bands leave at least one band with at most one differing bit, so the
+candidates for a note are the rows where some band equals the note's band
+or differs from it in one bit: four indexed IN lookups of 17 values each,
+instead of a comparison with every note.
+
+Fingerprints are written by the note signal handlers (notes/signals.py).
+Notes saved before this existed, or written without signals, are picked up
+by ``manage.py find_duplicate_notes``.
+"""
+import hashlib
+import re
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Note, NoteFingerprint
+
+BITS = 64
+BANDS = 4
+BAND_BITS = BITS // BANDS
+MAX_DISTANCE = 7
+SHINGLE_WORDS = 2
+
+_MASK = (1 << BITS) - 1
+_WORD = re.compile(r'\w+')
+
+
+# ---------------------------------------------------
+# Fingerprints
+# ---------------------------------------------------
+
+def _shingle_hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def simhash(text):
+    """The text's 64-bit SimHash (unsigned), or None if it has no words."""
+    import numpy as np  # off the cold-start path
+
+    words = _WORD.findall(text.casefold())
+    if not words:
+        return None
+    width = min(SHINGLE_WORDS, len(words))
+    shingles = {' '.join(words[i:i + width]) for i in range(len(words) - width + 1)}
+    hashes = np.array([_shingle_hash(shingle) for shingle in shingles], dtype='<u8')
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    # Bit i is set when more than half of the shingles have it set
+    majority = bits.sum(axis=0, dtype=np.int64) * 2 > len(hashes)
+    return int(np.packbits(majority, bitorder='little').view('<u8')[0])
+
+
+def distance(a, b):
+    return ((a ^ b) & _MASK).bit_count()
+
+
+def _signed(value):
+    return value - (1 << BITS) if value >= 1 << (BITS - 1) else value
+
+
+def bands(value):
+    return [(value >> (band * BAND_BITS)) & ((1 << BAND_BITS) - 1) for band in range(BANDS)]
+
+
+def probes(band):
+    """`band` and every value one bit away from it."""
+    return [band, *(band ^ (1 << bit) for bit in range(BAND_BITS))]
+
+
+def _fingerprint(note):
+    value = simhash(f'{note.title}\n{note.content}')
+    if value is None:
+        return None
+    return NoteFingerprint(
+        note_id=note.pk, user_id=note.user_id, simhash=_signed(value),
+        **{f'band{i}': band for i, band in enumerate(bands(value))},
+    )
+
+
+def store_fingerprint(note):
+    """Write (or, for a note without words, remove) `note`'s fingerprint."""
+    fingerprint = _fingerprint(note)
+    if fingerprint is None:
+        NoteFingerprint.objects.filter(note_id=note.pk).delete()
+        return
+    NoteFingerprint.objects.update_or_create(note_id=note.pk, defaults={
+        field.attname: getattr(fingerprint, field.attname)
+        for field in NoteFingerprint._meta.concrete_fields if not field.primary_key
+    })
+
+
+def fingerprint_missing(batch_size=500, user_id=None):
+    """
+    Fingerprint notes that have none, `batch_size` at a time. Yields the
+    number written per batch.
+    """
+    notes = Note.objects.filter(fingerprint__isnull=True).only('id', 'user_id', 'title', 'content').order_by('pk')
+    if user_id is not None:
+        notes = notes.filter(user_id=user_id)
+    last_pk = 0
+    while True:
+        batch = list(notes.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return
+        last_pk = batch[-1].pk
+        rows = [fingerprint for fingerprint in map(_fingerprint, batch) if fingerprint is not None]
+        NoteFingerprint.objects.bulk_create(rows, ignore_conflicts=True)
+        yield len(rows)
+
+
+# ---------------------------------------------------
+# Finding duplicates
+# ---------------------------------------------------
+
+def near_duplicates(note):
+    """The owner's other notes within MAX_DISTANCE bits of `note`, closest first."""
+    try:
+        value = note.fingerprint.simhash & _MASK
+    except NoteFingerprint.DoesNotExist:
+        return []
+    same_band = Q()
+    for i, band in enumerate(bands(value)):
+        same_band |= Q(**{f'band{i}__in': probes(band)})
+    candidates = (NoteFingerprint.objects.filter(same_band, user_id=note.user_id)
+                  .exclude(note_id=note.pk).values_list('note_id', 'simhash'))
+    close = {note_id: distance(value, other) for note_id, other in candidates if distance(value, other) <= MAX_DISTANCE}
+    notes = Note.objects.in_bulk(close)
+    return sorted(notes.values(), key=lambda other: (close[other.pk], other.pk))
+
+
+def duplicate_groups(user_id):
+    """
+    The user's near-duplicate notes as lists of note ids (oldest first),
+    largest group first. Notes are grouped transitively.
+    """
+    rows = list(NoteFingerprint.objects.filter(user_id=user_id).values_list('note_id', 'simhash'))
+    parent = {note_id: note_id for note_id, _ in rows}
+
+    def root(note_id):
+        while parent[note_id] != note_id:
+            parent[note_id] = parent[parent[note_id]]
+            note_id = parent[note_id]
+        return note_id
+
+    # Only rows whose bands are within one bit of each other are compared
+    for band in range(BANDS):
+        buckets = {}
+        for note_id, value in rows:
+            buckets.setdefault(bands(value & _MASK)[band], []).append((note_id, value))
+        for note_id, value in rows:
+            for probe in probes(bands(value & _MASK)[band]):
+                for other_id, other in buckets.get(probe, ()):
+                    if other_id > note_id and distance(value, other) <= MAX_DISTANCE:
+                        parent[root(other_id)] = root(note_id)
+
+    groups = {}
+    for note_id in parent:
+        groups.setdefault(root(note_id), []).append(note_id)
+    return sorted((sorted(group) for group in groups.values() if len(group) > 1), key=lambda g: (-len(g), g[0]))
+
+
+# ---------------------------------------------------
+# Merging
+# ---------------------------------------------------
+
+def merge_notes(keep, others):
+    """
+    Fold `others` into `keep`: its tags gain theirs (as many as fit), an
+    empty subject takes the first one they have, and they are deleted. Title
+    and content of `keep` are left as they are.
+    """
+    with transaction.atomic():
+        tags = {}
+        for note in [keep, *others]:
+            for tag in note.get_tags_list():
+                if tag:
+                    tags.setdefault(tag.casefold(), tag)
+        merged, max_length = [], Note._meta.get_field('tags').max_length
+        for tag in tags.values():
+            if len(', '.join([*merged, tag])) <= max_length:
+                merged.append(tag)
+        keep.tags = ', '.join(merged)
+        if not keep.subject:
+            keep.subject = next((note.subject for note in others if note.subject), '')
+        keep.save(update_fields=['tags', 'subject', 'updated_at'])
+        for note in others:
+            note.delete()
@@ -0,0 +1,298 @@
+"""
+Server-sent events: push task changes and due reminders to open dashboards.
+
+`stunotesapp/asgi.py` routes ``settings.EVENTS_URL`` to `sse_application`, a
+plain ASGI endpoint rather than a Django view: Django 4.2 does not notice a
+client disconnecting while a streaming response is open, and an idle stream
+should cost no more than a queue and a coroutine.
+
+Fan-out goes through `hub`, an in-process pub/sub keyed by user id. Events are
+published with `publish()` from any thread (signal handlers run in sync
+code). With several worker processes, set ``EVENTS_BROKER_URL`` to a relay
+started with ``manage.py run_event_broker``: every worker then publishes to
+the relay and receives every event back, a local stand-in for Redis pub/sub.
+
+Due reminders are checked every ``EVENTS_REMINDER_POLL_SECONDS``, only for
+users with an open stream, and marked sent once pushed.
+"""
+import asyncio
+import json
+import logging
+import socket
+import threading
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEARTBEAT_SECONDS = 25
+DEFAULT_REMINDER_POLL_SECONDS = 30
+DEFAULT_QUEUE_SIZE = 100
+
+_CLOSED = object()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class Subscription:
+    """One open stream: a bounded queue on the event loop that owns it."""
+
+    def __init__(self, user_id, loop, maxsize):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def deliver(self, event):
+        # Runs on self.loop. A stalled client loses its oldest events; the
+        # dashboard re-syncs through /api/sync/ on the next task event anyway.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class EventHub:
+    """In-process pub/sub: user id -> open subscriptions."""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._tasks = []
+
+    def subscribe(self, user_id):
+        """Open a subscription; must be called from the serving event loop."""
+        loop = asyncio.get_running_loop()
+        self._start_background(loop)
+        subscription = Subscription(user_id, loop, _setting('EVENTS_QUEUE_SIZE', DEFAULT_QUEUE_SIZE))
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def user_ids(self):
+        with self._lock:
+            return list(self._subscriptions)
+
+    def count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def dispatch(self, user_id, event):
+        """Hand `event` to every local subscription of `user_id` (thread-safe)."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+
+    def _start_background(self, loop):
+        # Once per serving loop: the reminder check and, if configured, the relay listener
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._tasks = [loop.create_task(_reminder_loop(self))]
+        if _setting('EVENTS_BROKER_URL', ''):
+            self._tasks.append(loop.create_task(_broker_listener(self)))
+
+
+hub = EventHub()
+
+
+# ---------------------------------------------------
+# Publishing
+# ---------------------------------------------------
+
+def _broker_address():
+    parts = urlsplit(_setting('EVENTS_BROKER_URL', ''))
+    return parts.hostname or '127.0.0.1', parts.port or 8765
+
+
+class BrokerPublisher:
+    """Sends events to the relay over one persistent connection per process."""
+
+    def __init__(self):
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        line = (json.dumps(message, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._sock = socket.create_connection(_broker_address(), timeout=2)
+                    self._sock.sendall(line)
+                    return True
+                except OSError:
+                    if self._sock is not None:
+                        self._sock.close()
+                    self._sock = None
+        return False
+
+
+_publisher = BrokerPublisher()
+
+
+def publish(user_id, event_type, data):
+    """Push an event to `user_id`'s open streams, in this process or via the relay."""
+    message = {'user': user_id, 'type': event_type, 'data': data}
+    if _setting('EVENTS_BROKER_URL', ''):
+        if _publisher.send(message):
+            return
+        logger.warning("Event relay unreachable; delivering %s event locally only", event_type)
+    hub.dispatch(user_id, message)
+
+
+async def _broker_listener(event_hub):
+    """Feed events from the relay into the local hub, reconnecting on failure."""
+    delay = 1
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(*_broker_address())
+            delay = 1
+            while line := await reader.readline():
+                message = json.loads(line)
+                event_hub.dispatch(message['user'], message)
+            writer.close()
+        except (OSError, ValueError) as exc:
+            logger.warning("Event relay connection lost: %s", exc)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 30)
+
+
+# ---------------------------------------------------
+# Due reminders
+# ---------------------------------------------------
+
+def claim_due_reminders(user_ids, limit=500):
+    """
+    Mark due, unsent reminders of `user_ids` as sent and return them.
+    Rows locked by another worker are skipped, so each reminder is pushed once.
+    """
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    from .models import Reminder
+
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic():
+        due = list(
+            Reminder.objects.select_for_update(skip_locked=skip_locked, of=('self',))
+            .filter(is_sent=False, remind_time__lte=timezone.now(), task__user_id__in=user_ids)
+            .select_related('task')[:limit]
+        )
+        if due:
+            Reminder.objects.filter(pk__in=[reminder.pk for reminder in due]).update(is_sent=True)
+    return due
+
+
+async def _reminder_loop(event_hub):
+    from asgiref.sync import sync_to_async
+
+    while True:
+        await asyncio.sleep(_setting('EVENTS_REMINDER_POLL_SECONDS', DEFAULT_REMINDER_POLL_SECONDS))
+        user_ids = event_hub.user_ids()
+        if not user_ids:
+            continue
+        try:
+            due = await sync_to_async(claim_due_reminders)(user_ids)
+        except Exception:
+            logger.exception("Reminder check failed")
+            continue
+        for reminder in due:
+            publish(reminder.task.user_id, 'reminder', {
+                'id': reminder.id,
+                'task_id': reminder.task_id,
+                'task_title': reminder.task.title,
+                'remind_time': reminder.remind_time.isoformat(),
+            })
+
+
+# ---------------------------------------------------
+# ASGI endpoint
+# ---------------------------------------------------
+
+def format_event(message):
+    payload = json.dumps(message['data'], separators=(',', ':'))
+    return f"event: {message['type']}\ndata: {payload}\n\n".encode('utf-8')
+
+
+def _session_user_id(session_key):
+    """The active user behind a session cookie, or None (same checks as request.user)."""
+    from importlib import import_module
+    from types import SimpleNamespace
+
+    from django.contrib.auth import get_user
+
+    session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    user = get_user(SimpleNamespace(session=session))
+    return user.pk if user.is_authenticated and user.is_active else None
+
+
+def _cookie(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key == b'cookie':
+            morsel = SimpleCookie(value.decode('latin-1')).get(name)
+            if morsel is not None:
+                return morsel.value
+    return None
+
+
+async def _respond(send, status, body=b''):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def sse_application(scope, receive, send):
+    """ASGI app streaming the logged-in user's events as text/event-stream."""
+    from asgiref.sync import sync_to_async
+
+    if scope['method'] != 'GET':
+        return await _respond(send, 405)
+    session_key = _cookie(scope, settings.SESSION_COOKIE_NAME)
+    user_id = await sync_to_async(_session_user_id)(session_key) if session_key else None
+    if user_id is None:
+        # EventSource gives up on a non-200 response instead of retrying
+        return await _respond(send, 403, b'Not logged in.')
+
+    subscription = hub.subscribe(user_id)
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        subscription.deliver(_CLOSED)
+
+    watcher = asyncio.create_task(watch_disconnect())
+    heartbeat = _setting('EVENTS_HEARTBEAT_SECONDS', DEFAULT_HEARTBEAT_SECONDS)
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        await send({'type': 'http.response.body', 'body': b'retry: 10000\n\n', 'more_body': True})
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle connection
+                await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+                continue
+            if message is _CLOSED:
+                break
+            await send({'type': 'http.response.body', 'body': format_event(message), 'more_body': True})
+    finally:
+        hub.unsubscribe(subscription)
+        watcher.cancel()
@@ -0,0 +1,102 @@
+"""
+Subject facets: per-user and global subject counts for tasks and notes.
+
+The dashboard's subject filter and the admin's subject sidebar used to run
+``SELECT DISTINCT subject`` over the whole task/note table. `SubjectFacet`
+keeps one row per (user, kind, subject) plus a global row per (kind,
+subject), and the signal handlers in notes/signals.py move the counts on
+every save and delete. Reading a facet list is then an index range scan over
+a table with one row per distinct subject.
+
+Writes that skip model signals have to keep the counts in step themselves:
+the account purge calls `release_user`. Anything else (bulk_create,
+QuerySet.update) can be repaired with ``manage.py rebuild_subject_facets``.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Note, SubjectFacet, Task
+
+KINDS = {'task': Task, 'note': Note}
+
+
+def kind_of(model):
+    return 'task' if issubclass(model, Task) else 'note'
+
+
+# ---------------------------------------------------
+# Maintenance
+# ---------------------------------------------------
+
+def _bump(user_id, kind, subject, delta):
+    rows = SubjectFacet.objects.filter(user_id=user_id, kind=kind, subject=subject)
+    if rows.update(count=F('count') + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            SubjectFacet.objects.create(user_id=user_id, kind=kind, subject=subject, count=delta)
+    except IntegrityError:
+        # Created concurrently
+        rows.update(count=F('count') + delta)
+
+
+def adjust(kind, user_id, subject, delta):
+    """Add `delta` to the user's and the global count of `subject`."""
+    if not subject:
+        return
+    for owner in (user_id, None):
+        _bump(owner, kind, subject, delta)
+    SubjectFacet.objects.filter(kind=kind, subject=subject, count__lte=0).delete()
+
+
+def move(kind, before, after):
+    """Move one row's contribution from ``(user_id, subject)`` `before` to `after`."""
+    if before == after:
+        return
+    if before is not None:
+        adjust(kind, *before, -1)
+    if after is not None:
+        adjust(kind, *after, 1)
+
+
+def release_user(user_id):
+    """Take a user's counts out of the global totals and drop their rows."""
+    with transaction.atomic():
+        for facet in SubjectFacet.objects.filter(user_id=user_id):
+            _bump(None, facet.kind, facet.subject, -facet.count)
+        SubjectFacet.objects.filter(user_id=user_id).delete()
+        SubjectFacet.objects.filter(user__isnull=True, count__lte=0).delete()
+
+
+def rebuild_subject_facets():
+    """Recompute every facet from the task and note tables. Returns rows written."""
+    rows = []
+    for kind, model in KINDS.items():
+        per_user = (model.objects.exclude(subject='').values('user_id', 'subject')
+                    .annotate(n=Count('pk')).order_by())
+        totals = {}
+        for row in per_user:
+            rows.append(SubjectFacet(user_id=row['user_id'], kind=kind, subject=row['subject'], count=row['n']))
+            totals[row['subject']] = totals.get(row['subject'], 0) + row['n']
+        rows.extend(SubjectFacet(kind=kind, subject=subject, count=n) for subject, n in totals.items())
+    with transaction.atomic():
+        SubjectFacet.objects.all().delete()
+        SubjectFacet.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+# ---------------------------------------------------
+# Reading
+# ---------------------------------------------------
+
+def user_subjects(user, kind='note'):
+    """The user's subjects for `kind`, alphabetically (a values_list queryset)."""
+    return (SubjectFacet.objects.filter(user=user, kind=kind)
+            .order_by('subject').values_list('subject', flat=True))
+
+
+def global_counts(kind):
+    """``(subject, count)`` pairs across all users, alphabetically."""
+    return (SubjectFacet.objects.filter(user__isnull=True, kind=kind)
+            .order_by('subject').values_list('subject', 'count'))
+
@@ -0,0 +1,111 @@
+"""
+Compressed text storage for large note bodies.
+
+`CompressedTextField` is a str in Python and bytes in the database. Values of
+at least NOTE_CONTENT_COMPRESS_MIN_BYTES (UTF-8) are compressed with
+NOTE_CONTENT_COMPRESSION when that makes them smaller; everything else is
+stored as plain UTF-8. A one-byte header records which, so rows written under
+any setting stay readable after it changes.
+
+Methods:
+    zlib   stdlib, the default
+    zstd   faster and usually smaller; needs the optional `zstandard` package
+    off    store plain UTF-8 (still readable by every mode)
+
+Compressed values can't be searched with SQL (``content__icontains``), so
+search over such fields has to happen outside the database.
+"""
+import importlib
+import importlib.util
+import zlib
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+
+RAW, ZLIB, ZSTD = b'\x00', b'\x01', b'\x02'
+METHODS = ('zlib', 'zstd', 'off')
+DEFAULT_MIN_BYTES = 1024
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def _zstd():
+    if importlib.util.find_spec('zstandard') is None:
+        raise ImproperlyConfigured("NOTE_CONTENT_COMPRESSION=zstd requires the zstandard package.")
+    return importlib.import_module('zstandard')
+
+
+def compress_text(value, method=None, min_bytes=None):
+    """Encode `value` for storage: header byte + payload."""
+    method = method or getattr(settings, 'NOTE_CONTENT_COMPRESSION', 'zlib')
+    if min_bytes is None:
+        min_bytes = getattr(settings, 'NOTE_CONTENT_COMPRESS_MIN_BYTES', DEFAULT_MIN_BYTES)
+    if method not in METHODS:
+        raise ImproperlyConfigured(
+            f"Unknown NOTE_CONTENT_COMPRESSION {method!r}; choose one of {', '.join(METHODS)}."
+        )
+    raw = value.encode('utf-8')
+    if method == 'off' or len(raw) < min_bytes:
+        return RAW + raw
+    if method == 'zstd':
+        packed = ZSTD + _zstd().ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    else:
+        packed = ZLIB + zlib.compress(raw, ZLIB_LEVEL)
+    # Already-dense text (e.g. pasted base64) can come out bigger
+    return packed if len(packed) < len(raw) + 1 else RAW + raw
+
+
+def decompress_text(data):
+    data = bytes(data)
+    if not data:
+        return ''
+    header, payload = data[:1], data[1:]
+    if header == ZLIB:
+        payload = zlib.decompress(payload)
+    elif header == ZSTD:
+        payload = _zstd().ZstdDecompressor().decompress(payload)
+    return payload.decode('utf-8')
+
+
+class CompressedTextField(models.BinaryField):
+    """A text field stored compressed once it is large enough (see module docstring)."""
+    description = "Text (compressed when large)"
+
+    def __init__(self, *args, **kwargs):
+        # BinaryField is not editable by default; this one is edited as text
+        kwargs.setdefault('editable', True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if kwargs.get('editable') is True:
+            del kwargs['editable']
+        else:
+            kwargs['editable'] = False
+        return name, path, args, kwargs
+
+    def get_default(self):
+        # Field's default ('' or None), not BinaryField's b''
+        return models.Field.get_default(self)
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else decompress_text(value)
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return decompress_text(value)
+        return value
+
+    def get_prep_value(self, value):
+        if isinstance(value, str):
+            return compress_text(value)
+        return value
+
+    def value_to_string(self, obj):
+        # Serialized (dumpdata) as the text itself
+        return self.value_from_object(obj)
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{'widget': forms.Textarea, **kwargs})
@@ -1,8 +1,15 @@
 from django import forms
+from django.urls import reverse_lazy
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from .models import User, Task, Note, Reminder
 from .models import AdminRequest
 from django.contrib.auth.forms import PasswordChangeForm
+
+
+def autocomplete_attrs(field):
+    """Widget attrs hooking an input up to static/notes/js/autocomplete.js."""
+    return {'data-autocomplete': field, 'data-autocomplete-url': reverse_lazy('notes:autocomplete')}
+
 # ----------------------------
 # User Forms
 # ----------------------------
@@ -25,20 +32,37 @@ class CustomUserChangeForm(UserChangeForm):
 class TaskForm(forms.ModelForm):
     class Meta:
         model = Task
-        fields = ['title', 'description', 'subject', 'due_date', 'priority', 'status']
+        fields = [
+            'title', 'description', 'subject', 'due_date', 'priority', 'status',
+            'recurrence', 'recurrence_interval', 'recurrence_until', 'recurrence_count',
+        ]
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Enter task title'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Add details'}),
-            'subject': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Subject (optional)'}),
+            'subject': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Subject (optional)', **autocomplete_attrs('subject')}),
             'due_date': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local', 'min': ''}),
             'priority': forms.Select(attrs={'class': 'form-select'}),
             'status': forms.Select(attrs={'class': 'form-select'}),
+            'recurrence': forms.Select(attrs={'class': 'form-select'}),
+            'recurrence_interval': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
+            'recurrence_until': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
+            'recurrence_count': forms.NumberInput(attrs={'class': 'form-control', 'min': 1, 'placeholder': 'Any'}),
         }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Left blank (or not shown) it means "every 1 day/week/month"
+        if 'recurrence_interval' in self.fields:
+            self.fields['recurrence_interval'].required = False
     
     def clean_due_date(self):
-        """Validate that due_date is not in the past"""
+        """Validate that a new due_date is not in the past"""
         from django.utils import timezone
         due_date = self.cleaned_data.get('due_date')
+        # A started series keeps its first date; occurrences may be overdue
+        instance = self.instance
+        if 'due_date' not in self.changed_data or instance.series_id or (instance.pk and instance.recurrence):
+            return due_date
         if due_date:
             now = timezone.now()
             # Compare dates (ignore microseconds for comparison)
@@ -46,6 +70,29 @@ class TaskForm(forms.ModelForm):
                 raise forms.ValidationError("Due date cannot be in the past. Please select today or a future date.")
         return due_date
 
+    def clean(self):
+        """A repeating task starts at its due date and needs one."""
+        cleaned_data = super().clean()
+        if 'recurrence_interval' in cleaned_data and not cleaned_data['recurrence_interval']:
+            cleaned_data['recurrence_interval'] = 1
+        if not cleaned_data.get('recurrence'):
+            return cleaned_data
+        due_date = cleaned_data.get('due_date')
+        if not due_date:
+            self.add_error('due_date', "A repeating task needs a due date for its first occurrence.")
+        until = cleaned_data.get('recurrence_until')
+        if due_date and until and until < due_date:
+            self.add_error('recurrence_until', "The series cannot end before its first occurrence.")
+        if cleaned_data.get('recurrence_count') == 0:
+            self.add_error('recurrence_count', "A series needs at least one occurrence.")
+        return cleaned_data
+
+
+class OccurrenceForm(TaskForm):
+    """Edits one occurrence of a repeating task; the rule stays on the series."""
+    class Meta(TaskForm.Meta):
+        fields = ['title', 'description', 'subject', 'due_date', 'priority', 'status']
+
 
 # ----------------------------
 # Note Form
@@ -59,7 +106,8 @@ class NoteForm(forms.ModelForm):
         fields = ['title', 'content', 'subject', 'tags']
         widgets = {
             'content': forms.Textarea(attrs={'rows': 5}),
-            'tags': forms.TextInput(attrs={'placeholder': 'Comma-separated tags'}),
+            'subject': forms.TextInput(attrs=autocomplete_attrs('subject')),
+            'tags': forms.TextInput(attrs={'placeholder': 'Comma-separated tags', **autocomplete_attrs('tag')}),
         }
 
 
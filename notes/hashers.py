@@ -0,0 +1,88 @@
+"""
+Password hashing policy.
+
+`PASSWORD_HASH_POLICY` (env) picks which hasher new passwords use and how
+expensive it is; `password_hashers()` turns that into the PASSWORD_HASHERS
+setting. The chosen hasher goes first and every other supported hasher
+stays in the list, so existing hashes keep verifying. Django's ModelBackend
+rehashes a password with the preferred hasher on the next successful login
+whenever the algorithm or its cost parameters differ (`must_update`), which
+is how stored hashes follow the policy without a migration.
+
+Policies:
+    default   Django's PBKDF2-SHA256 (600k iterations in Django 4.2)
+    pbkdf2    PBKDF2-SHA256 with PASSWORD_PBKDF2_ITERATIONS, never fewer than
+              Django's own count; stored hashes are only ever rehashed up
+    scrypt    scrypt with PASSWORD_SCRYPT_WORK_FACTOR (memory-hard, stdlib only)
+    argon2    Argon2id; needs the optional `argon2-cffi` package
+"""
+import importlib.util
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, ScryptPasswordHasher
+from django.core.exceptions import ImproperlyConfigured
+
+DEFAULT_PBKDF2_ITERATIONS = PBKDF2PasswordHasher.iterations
+DEFAULT_SCRYPT_WORK_FACTOR = 2 ** 14
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with the iteration count raised from settings.
+    Same algorithm name as Django's, so hashes are interchangeable."""
+
+    @property
+    def iterations(self):
+        return max(DEFAULT_PBKDF2_ITERATIONS, getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', 0))
+
+    def must_update(self, encoded):
+        # A hash made at a higher cost is kept, not rewritten cheaper
+        return self.decode(encoded)['iterations'] < self.iterations
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """scrypt with the work factor (N) taken from settings."""
+
+    @property
+    def work_factor(self):
+        return getattr(settings, 'PASSWORD_SCRYPT_WORK_FACTOR', DEFAULT_SCRYPT_WORK_FACTOR)
+
+
+# Every hasher we can still verify, in no particular order of preference
+VERIFY_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+POLICIES = {
+    'default': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'pbkdf2': 'notes.hashers.TunedPBKDF2PasswordHasher',
+    'scrypt': 'notes.hashers.TunedScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+}
+
+
+# Tuned hasher -> the Django hasher using the same algorithm name
+REPLACES = {
+    'notes.hashers.TunedPBKDF2PasswordHasher': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'notes.hashers.TunedScryptPasswordHasher': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+}
+
+
+def password_hashers(policy='default'):
+    """Build the PASSWORD_HASHERS list for a policy name."""
+    try:
+        preferred = POLICIES[policy]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"Unknown PASSWORD_HASH_POLICY {policy!r}; choose one of {', '.join(POLICIES)}."
+        )
+    if policy == 'argon2' and importlib.util.find_spec('argon2') is None:
+        raise ImproperlyConfigured("PASSWORD_HASH_POLICY=argon2 requires the argon2-cffi package.")
+
+    # Django looks hashers up by algorithm name, so a tuned hasher replaces
+    # the stock one with the same name instead of sitting next to it.
+    replaced = {preferred, REPLACES.get(preferred)}
+    return [preferred] + [path for path in VERIFY_HASHERS if path not in replaced]
@@ -0,0 +1,235 @@
+"""
+iCalendar (ICS) feed of a user's due dates, for calendar apps to subscribe to.
+
+A user turns the feed on from the settings page, which gives them a secret
+URL (`User.calendar_token`; resetting it invalidates the old URL). The feed
+lists what the calendar page shows: active tasks with a due date, recurring
+series as RRULEs (so nothing is expanded; stored occurrences are excluded
+with EXDATE and listed as tasks of their own) and the reminders of tasks
+that are not completed.
+
+Calendar apps poll a feed every few minutes and it rarely changes between
+polls. `feed_state` reads, in one query, the latest `updated_at` of the
+user's tasks and reminders and the latest task or reminder tombstone
+(deletions, notes/signals.py). The newest of these is the Last-Modified and, with FEED_VERSION, the ETag, so an unchanged feed
+is answered 304 Not Modified after that one query. Otherwise the calendar
+is streamed as it is generated, and the finished body is kept in the
+default cache under its ETag for the next client that asks.
+"""
+import hashlib
+import secrets
+from datetime import timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Reminder, SyncTombstone, Task, User
+
+# Bump when the output for the same rows changes; every ETag changes with it
+FEED_VERSION = 1
+CONTENT_TYPE = 'text/calendar; charset=utf-8'
+PRODID = '-//StuNotes//Tasks and reminders//EN'
+DEFAULT_CACHE_TTL = 3600
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024
+CHUNK_BYTES = 16 * 1024
+
+_FREQUENCIES = {'daily': 'DAILY', 'weekly': 'WEEKLY', 'monthly': 'MONTHLY'}
+_PRIORITIES = {'high': 1, 'medium': 5, 'low': 9}
+
+
+def new_token():
+    return secrets.token_urlsafe(32)
+
+
+# ---------------------------------------------------
+# Validators
+# ---------------------------------------------------
+
+def feed_state(token):
+    """
+    ``(user_id, last_modified)`` of the feed with `token`, or None if no
+    active user has it. `last_modified` is None while the user has never had
+    a task.
+    """
+    latest_task = Task.objects.filter(user=OuterRef('pk')).order_by('-updated_at').values('updated_at')[:1]
+    latest_reminder = (Reminder.objects.filter(task__user=OuterRef('pk'))
+                       .order_by('-updated_at').values('updated_at')[:1])
+    latest_deletion = (SyncTombstone.objects.filter(user=OuterRef('pk'), kind__in=('task', 'reminder'))
+                       .order_by('-deleted_at').values('deleted_at')[:1])
+    row = (User.objects.filter(calendar_token=token, is_active=True)
+           .values_list('pk', Subquery(latest_task), Subquery(latest_reminder), Subquery(latest_deletion)).first())
+    if row is None:
+        return None
+    user_id, *stamps = row
+    return user_id, max(filter(None, stamps), default=None)
+
+
+def etag(user_id, last_modified, base_url):
+    """Strong ETag of the feed as of `last_modified`, served from `base_url`."""
+    stamp = last_modified.isoformat() if last_modified else ''
+    key = f'{FEED_VERSION}\0{user_id}\0{stamp}\0{base_url}\0{settings.TIME_ZONE}'
+    return '"%s"' % hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
+
+# ---------------------------------------------------
+# Generation
+# ---------------------------------------------------
+
+def _escape(text):
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\r', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """`line` folded at 75 octets (RFC 5545 section 3.1), CRLF-terminated."""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + '\r\n'
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and data[end] & 0xC0 == 0x80:  # inside a UTF-8 sequence
+            end -= 1
+        parts.append(data[start:end].decode('utf-8'))
+        start, limit = end, 74  # continuation lines begin with a space
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _local(value):
+    return timezone.localtime(value).strftime('%Y%m%dT%H%M%S')
+
+
+def _component(name, lines):
+    return ''.join(_fold(line) for line in (f'BEGIN:{name}', *lines, f'END:{name}'))
+
+
+def _timezone(moment):
+    # One fixed offset: exact for zones without DST; clients that know the
+    # IANA name (most do) apply its own rules instead
+    zone = settings.TIME_ZONE
+    offset = int(moment.astimezone(ZoneInfo(zone)).utcoffset().total_seconds()) // 60
+    sign, minutes = '+' if offset >= 0 else '-', abs(offset)
+    utc_offset = f'{sign}{minutes // 60:02d}{minutes % 60:02d}'
+    standard = _component('STANDARD', [
+        'DTSTART:19700101T000000', f'TZOFFSETFROM:{utc_offset}', f'TZOFFSETTO:{utc_offset}',
+    ])
+    return _fold('BEGIN:VTIMEZONE') + _fold(f'TZID:{zone}') + standard + _fold('END:VTIMEZONE')
+
+
+def _task_lines(task, base_url):
+    lines = [
+        f'UID:task-{task.pk}@stunotes',
+        f'DTSTAMP:{_utc(task.updated_at)}',
+        f'LAST-MODIFIED:{_utc(task.updated_at)}',
+        f'SUMMARY:{_escape(task.title)}',
+        f'PRIORITY:{_PRIORITIES.get(task.priority, 0)}',
+        f'URL:{base_url}{reverse("notes:edit_task", args=[task.pk]).lstrip("/")}',
+    ]
+    if task.description:
+        lines.append(f'DESCRIPTION:{_escape(task.description)}')
+    if task.subject:
+        lines.append(f'CATEGORIES:{_escape(task.subject)}')
+    return lines
+
+
+def _rrule(series):
+    parts = [f'FREQ={_FREQUENCIES[series.recurrence]}', f'INTERVAL={series.recurrence_interval or 1}']
+    day = timezone.localtime(series.due_date).day
+    if series.recurrence == 'monthly' and day > 28:
+        # Series on the 29th-31st fall on the last day of shorter months
+        parts.append(f'BYMONTHDAY={",".join(str(d) for d in range(28, day + 1))};BYSETPOS=-1')
+    if series.recurrence_count is not None:
+        parts.append(f'COUNT={series.recurrence_count}')
+    elif series.recurrence_until is not None:
+        parts.append(f'UNTIL={_utc(series.recurrence_until)}')
+    return 'RRULE:' + ';'.join(parts)
+
+
+def iter_calendar(user_id, base_url):
+    """Yield the user's calendar (`base_url` ends in '/') one component at a time."""
+    zone = settings.TIME_ZONE
+    yield _fold('BEGIN:VCALENDAR') + _fold('VERSION:2.0') + _fold(f'PRODID:{PRODID}')
+    yield _fold('CALSCALE:GREGORIAN') + _fold('METHOD:PUBLISH') + _fold('X-WR-CALNAME:StuNotes')
+
+    # Series are few; each carries the dates of its stored occurrences
+    series_list = list(Task.objects.filter(user_id=user_id, due_date__isnull=False).series()
+                       .exclude(status='completed').order_by('pk'))
+    if series_list:
+        stored = {}
+        for series_id, value in (Task.objects.filter(series__in=series_list, occurrence_date__isnull=False)
+                                 .order_by('occurrence_date').values_list('series_id', 'occurrence_date')):
+            stored.setdefault(series_id, []).append(value)
+        yield _timezone(series_list[0].due_date)
+        for series in series_list:
+            lines = _task_lines(series, base_url)
+            lines[1:1] = [f'DTSTART;TZID={zone}:{_local(series.due_date)}', _rrule(series)]
+            lines += [f'EXDATE;TZID={zone}:{_local(value)}' for value in stored.get(series.pk, ())]
+            yield _component('VEVENT', lines)
+
+    tasks = Task.objects.filter(user_id=user_id, due_date__isnull=False).active().order_by('due_date', 'pk')
+    for task in tasks.iterator(chunk_size=500):
+        lines = _task_lines(task, base_url)
+        lines.insert(1, f'DTSTART:{_utc(task.due_date)}')
+        yield _component('VEVENT', lines)
+
+    reminders = (Reminder.objects.filter(task__user_id=user_id).exclude(task__status='completed')
+                 .order_by('remind_time', 'pk').values_list('pk', 'remind_time', 'updated_at', 'task_id', 'task__title', 'task__updated_at'))
+    for pk, remind_time, changed, task_id, title, task_changed in reminders.iterator(chunk_size=500):
+        yield _component('VEVENT', [
+            f'UID:reminder-{pk}@stunotes',
+            f'DTSTART:{_utc(remind_time)}',
+            f'DTSTAMP:{_utc(max(changed, task_changed))}',
+            f'SUMMARY:{_escape(f"Reminder: {title}")}',
+            f'URL:{base_url}{reverse("notes:edit_task", args=[task_id]).lstrip("/")}',
+        ])
+    yield _fold('END:VCALENDAR')
+
+
+# ---------------------------------------------------
+# Server-side cache
+# ---------------------------------------------------
+
+def _cache_key(user_id, tag):
+    return f'ical:{user_id}:{tag.strip(chr(34))}'
+
+
+def cached_calendar(user_id, tag):
+    """The body stored for this ETag, or None."""
+    return cache.get(_cache_key(user_id, tag))
+
+
+def _chunks(parts):
+    pending, size = [], 0
+    for part in parts:
+        data = part.encode('utf-8')
+        pending.append(data)
+        size += len(data)
+        if size >= CHUNK_BYTES:
+            yield b''.join(pending)
+            pending, size = [], 0
+    yield b''.join(pending)
+
+
+def stream_calendar(user_id, tag, base_url):
+    """
+    Yield the calendar as bytes in chunks of about CHUNK_BYTES and, once it
+    is complete, cache the body under `tag` unless it is too big.
+    """
+    max_bytes = getattr(settings, 'CALENDAR_FEED_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES)
+    body, size = [], 0
+    for chunk in _chunks(iter_calendar(user_id, base_url)):
+        size += len(chunk)
+        if body is not None:
+            body = body + [chunk] if size <= max_bytes else None
+        yield chunk
+    if body is not None:
+        cache.set(_cache_key(user_id, tag), b''.join(body),
+                  timeout=getattr(settings, 'CALENDAR_FEED_CACHE_TTL', DEFAULT_CACHE_TTL))
@@ -0,0 +1,59 @@
+"""
+Per-process caches of structures built from one user's rows.
+
+`UserCache` keeps the most recently used users' entries in process memory
+and rebuilds an entry when it is stale. An entry is stale when the user's
+version key in the default cache has changed since it was built (writers
+call `invalidate`, see notes/signals.py) or when it is older than the TTL.
+With the local-memory cache a version bump is only seen by the process that
+made it, so the TTL bounds how long other processes serve an old entry.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class UserCache:
+    """
+    `build(user_id)` results, kept for up to `max_entries` users (least
+    recently used dropped first). Both limits are read from settings on use.
+    """
+
+    def __init__(self, name, build, max_entries_setting, default_max_entries, ttl_setting, default_ttl):
+        self.name = name
+        self.build = build
+        self._max_entries = (max_entries_setting, default_max_entries)
+        self._ttl = (ttl_setting, default_ttl)
+        self._entries = OrderedDict()  # user id -> (version, built at, value)
+        self._lock = threading.Lock()
+
+    def _version_key(self, user_id):
+        return f'{self.name}:version:{user_id}'
+
+    def invalidate(self, user_id):
+        """Make every process rebuild the user's entry on its next lookup."""
+        cache.set(self._version_key(user_id), time.time_ns(), timeout=None)
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def get(self, user_id):
+        version = cache.get(self._version_key(user_id))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == version and now - entry[1] < getattr(settings, *self._ttl):
+                self._entries.move_to_end(user_id)
+                return entry[2]
+
+        # Built outside the lock; a write that lands meanwhile bumps the
+        # version past the one recorded here, so the entry is rebuilt again
+        value = self.build(user_id)
+        with self._lock:
+            self._entries[user_id] = (version, now, value)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > getattr(settings, *self._max_entries):
+                self._entries.popitem(last=False)
+        return value
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notes.archive import DEFAULT_BATCH_SIZE, archivable, archive_completed_tasks
+
+
+class Command(BaseCommand):
+    help = "Move tasks completed more than TASK_ARCHIVE_AFTER_DAYS ago to the archive table, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--time-budget', type=float, default=None,
+                            help="Stop after this many seconds (remaining work is resumed next run).")
+
+    def handle(self, *args, **options):
+        if archivable() is None:
+            self.stdout.write("Archival is off (TASK_ARCHIVE_AFTER_DAYS = 0).")
+            return
+        start = time.perf_counter()
+        archived = archive_completed_tasks(batch_size=options['batch_size'], time_budget=options['time_budget'])
+        elapsed = time.perf_counter() - start
+        remaining = archivable().count()
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} task(s) in {elapsed:.1f} s; {remaining} still to archive."
+        ))
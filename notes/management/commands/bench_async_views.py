@@ -0,0 +1,120 @@
+"""
+Compare latency of the sync (WSGI) and async (ASGI) dashboard/profile views
+under concurrent load:
+
+    python manage.py bench_async_views --requests 200 --concurrency 20
+
+A throwaway admin and student with some tasks/notes are created and removed
+afterwards. Point it at a disposable database, and run with DEBUG=true
+unless static files have been collected (templates resolve {% static %}).
+"""
+
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import include, path
+
+from notes import async_views, views
+from notes.models import Note, Task, User
+
+BENCH_PAGES = ['home', 'admin_dashboard', 'profile_view']
+
+# Both variants mounted side by side; notes.urls stays included so templates can reverse names
+urlpatterns = [
+    path('bench/sync/home/', views.home),
+    path('bench/async/home/', async_views.home),
+    path('bench/sync/admin_dashboard/', views.admin_dashboard),
+    path('bench/async/admin_dashboard/', async_views.admin_dashboard),
+    path('bench/sync/profile_view/', views.profile_view),
+    path('bench/async/profile_view/', async_views.profile_view),
+    path('', include('notes.urls')),
+]
+
+
+def _summary(latencies, wall):
+    latencies = sorted(latencies)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    return (
+        f"mean {statistics.mean(latencies) * 1000:7.1f} ms  "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+        f"p95 {p95 * 1000:7.1f} ms  "
+        f"{len(latencies) / wall:7.1f} req/s"
+    )
+
+
+class Command(BaseCommand):
+    help = "Benchmark sync (WSGI) vs async (ASGI) dashboard/profile views under concurrent load."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--tasks', type=int, default=200, help="Tasks/notes seeded for the bench student.")
+
+    def handle(self, *args, **options):
+        admin = User.objects.create_user(
+            email='bench-admin@stunotes.local', username='bench-admin@stunotes.local',
+            full_name='Bench Admin', password='bench-pass', is_staff=True, is_superuser=True,
+        )
+        student = User.objects.create_user(
+            email='bench-student@stunotes.local', username='bench-student@stunotes.local',
+            full_name='Bench Student', password='bench-pass',
+        )
+        try:
+            Task.objects.bulk_create(
+                Task(user=student, title=f"Task {i}", subject=f"Subject {i % 7}") for i in range(options['tasks'])
+            )
+            Note.objects.bulk_create(
+                Note(user=student, title=f"Note {i}", content="lorem ipsum " * 50, subject=f"Subject {i % 7}")
+                for i in range(options['tasks'])
+            )
+            with override_settings(ROOT_URLCONF=__name__, ALLOWED_HOSTS=['*']):
+                for page in BENCH_PAGES:
+                    user = admin if page == 'admin_dashboard' else student
+                    self._bench_page(page, user, options['requests'], options['concurrency'])
+        finally:
+            admin.delete()
+            student.delete()
+
+    def _bench_page(self, page, user, total, concurrency):
+        login = Client()
+        login.force_login(user)
+        cookies = login.cookies
+
+        def sync_one(_):
+            client = Client()
+            client.cookies = cookies
+            start = time.perf_counter()
+            response = client.get(f'/bench/sync/{page}/', secure=True)
+            assert response.status_code == 200, response.status_code
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            sync_latencies = list(pool.map(sync_one, range(total)))
+        sync_wall = time.perf_counter() - start
+
+        async def async_run():
+            sem = asyncio.Semaphore(concurrency)
+            client = AsyncClient()
+            client.cookies = cookies
+
+            async def one():
+                async with sem:
+                    begin = time.perf_counter()
+                    response = await client.get(f'/bench/async/{page}/', secure=True)
+                    assert response.status_code == 200, response.status_code
+                    return time.perf_counter() - begin
+
+            return await asyncio.gather(*[one() for _ in range(total)])
+
+        start = time.perf_counter()
+        async_latencies = asyncio.run(async_run())
+        async_wall = time.perf_counter() - start
+
+        self.stdout.write(f"{page} ({total} requests, concurrency {concurrency})")
+        self.stdout.write(f"  WSGI  {_summary(sync_latencies, sync_wall)}")
+        self.stdout.write(f"  ASGI  {_summary(async_latencies, async_wall)}")
@@ -0,0 +1,114 @@
+"""
+Build and lookup times of the subject/tag suggestion index
+(notes/autocomplete.py) for users with many distinct values:
+
+    python manage.py bench_autocomplete --values 100 1000 5000
+
+For each size a throwaway user gets that many distinct subjects (as facet
+rows) and tags (spread over notes, five per note), and is removed
+afterwards. Lookups use 1-4 character prefixes of the user's values and go
+through `suggest`, version check included, with the index already built;
+the `request` column is the whole /api/autocomplete/ round trip through the
+test client for comparison. Point it at a disposable database.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from notes import autocomplete
+from notes.models import Note, SubjectFacet, User
+
+SYLLABLES = ['al', 'bio', 'chem', 'da', 'eco', 'for', 'geo', 'hist', 'in', 'lab', 'ma', 'no',
+             'or', 'phy', 'qu', 'ro', 'sta', 'the', 'ur', 'vec', 'wri', 'xe', 'zo']
+
+
+def _values(rng, count):
+    values = set()
+    while len(values) < count:
+        words = [''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(rng.randint(1, 3))]
+        values.add(' '.join(words).title())
+    return sorted(values)
+
+
+def _percentiles_us(times):
+    times = sorted(times)
+    return (statistics.median(times) * 1e6, times[int(len(times) * 0.99)] * 1e6)
+
+
+class Command(BaseCommand):
+    help = "Benchmark the subject/tag prefix index behind /api/autocomplete/."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--values', type=int, nargs='+', default=[100, 1000, 5000],
+                            help="Distinct subjects and tags per bench user.")
+        parser.add_argument('--lookups', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(
+            f"{'values':>7} {'build':>9} {'keys':>7} {'lookup p50':>11} {'p99':>9} {'request p50':>12}"
+        )
+        for count in options['values']:
+            user = User.objects.create_user(
+                email=f'bench-autocomplete-{count}@stunotes.local',
+                username=f'bench-autocomplete-{count}@stunotes.local',
+                full_name='Bench Autocomplete', password='bench-pass',
+            )
+            try:
+                self._bench_user(user, count, rng, options['lookups'])
+            finally:
+                autocomplete.invalidate(user.id)
+                user.delete()
+
+    def _bench_user(self, user, count, rng, lookups):
+        subjects, tags = _values(rng, count), _values(rng, count)
+        SubjectFacet.objects.bulk_create(
+            (SubjectFacet(user=user, kind=rng.choice(['task', 'note']), subject=subject, count=rng.randint(1, 50))
+             for subject in subjects),
+            batch_size=1000,
+        )
+        Note.objects.bulk_create(
+            (Note(user=user, title=f"Note {i}", content="", tags=', '.join(tags[i:i + 5]))
+             for i in range(0, count, 5)),
+            batch_size=1000,
+        )
+
+        builds = []
+        for _ in range(5):
+            start = time.perf_counter()
+            indexes = autocomplete.build_indexes(user.id)
+            builds.append(time.perf_counter() - start)
+        keys = sum(len(index._keys) for index in indexes.values())
+
+        sources = {'subject': subjects, 'tag': tags}
+        queries = []
+        for _ in range(lookups):
+            field = rng.choice(autocomplete.FIELDS)
+            queries.append((field, rng.choice(sources[field])[:rng.randint(1, 4)]))
+        autocomplete.get_indexes(user.id)
+        times = []
+        for field, prefix in queries:
+            start = time.perf_counter()
+            autocomplete.suggest(user.id, field, prefix)
+            times.append(time.perf_counter() - start)
+        p50, p99 = _percentiles_us(times)
+
+        client = Client()
+        client.force_login(user)
+        requests = []
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for field, prefix in queries[:200]:
+                start = time.perf_counter()
+                response = client.get('/api/autocomplete/', {'field': field, 'q': prefix}, secure=True)
+                requests.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.status_code
+        request_p50 = statistics.median(requests) * 1000
+
+        self.stdout.write(
+            f"{count:7d} {statistics.median(builds) * 1000:6.1f} ms {keys:7d}"
+            f" {p50:8.1f} us {p99:6.1f} us {request_p50:9.2f} ms"
+        )
@@ -0,0 +1,84 @@
+"""
+Cost of a calendar app polling the iCalendar feed (notes/ical.py):
+
+    python manage.py bench_calendar_feed --tasks 500
+
+A throwaway user gets that many tasks with due dates, one reminder per
+fourth task and a few recurring series. Reported (median of --rounds):
+
+- generate: the feed after a change, streamed and generated from the rows
+- cached: the same feed fetched again without validators, served from the
+  default cache
+- not modified: a poll with If-None-Match that the feed has not changed
+  since, answered 304
+
+The user is removed afterwards; point it at a disposable database.
+"""
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from notes import ical
+from notes.models import Reminder, Task, User
+
+EMAIL = 'bench-calendar@bench.stunotes.local'
+
+
+class Command(BaseCommand):
+    help = "Benchmark generated, cached and not-modified calendar feed responses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=500)
+        parser.add_argument('--rounds', type=int, default=20)
+
+    def handle(self, *args, **options):
+        User.objects.filter(email=EMAIL).delete()
+        user = User.objects.create(username=EMAIL, email=EMAIL, full_name='Calendar bench', password='!',
+                                   calendar_token=ical.new_token())
+        now = timezone.now()
+        try:
+            tasks = Task.objects.bulk_create(
+                (Task(user=user, title=f"Bench task {i}", description="Chapter 3, exercises 1-12",
+                      subject=f"Subject {i % 7}", due_date=now + timedelta(hours=i)) for i in range(options['tasks'])),
+                batch_size=500,
+            )
+            Reminder.objects.bulk_create(
+                (Reminder(task=task, remind_time=task.due_date - timedelta(hours=1)) for task in tasks[::4]),
+                batch_size=500,
+            )
+            for freq in ('daily', 'weekly', 'monthly'):
+                Task.objects.create(user=user, title=f"Bench {freq}", due_date=now, recurrence=freq)
+
+            client = Client()
+            url = f'/calendar/feed/{user.calendar_token}.ics'
+
+            def fetch(**headers):
+                start = time.perf_counter()
+                response = client.get(url, secure=True, HTTP_ACCEPT_ENCODING='identity', **headers)
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+                return response, body, (time.perf_counter() - start) * 1000
+
+            with override_settings(ALLOWED_HOSTS=['*']):
+                generate, cached, not_modified = [], [], []
+                for _ in range(options['rounds']):
+                    cache.clear()
+                    response, body, ms = fetch()
+                    generate.append(ms)
+                    response, _, ms = fetch()
+                    cached.append((ms, not response.streaming))
+                    response, _, ms = fetch(HTTP_IF_NONE_MATCH=response['ETag'])
+                    assert response.status_code == 304, response.status_code
+                    not_modified.append(ms)
+        finally:
+            user.delete()
+
+        self.stdout.write(f"{options['tasks']} tasks, feed of {len(body) / 1024:.0f} KiB")
+        self.stdout.write(f"generate      {statistics.median(generate):8.2f} ms")
+        note = "" if all(hit for _, hit in cached) else "  (over CALENDAR_FEED_CACHE_MAX_BYTES, generated again)"
+        self.stdout.write(f"cached        {statistics.median(ms for ms, _ in cached):8.2f} ms{note}")
+        self.stdout.write(f"not modified  {statistics.median(not_modified):8.2f} ms")
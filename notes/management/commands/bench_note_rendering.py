@@ -0,0 +1,72 @@
+"""
+Cost of Markdown note rendering (notes/rendering.py) on the All Notes page:
+
+    python manage.py bench_note_rendering --notes 500
+
+Uses the note corpus of bench_note_storage. Reported:
+
+- parse all: rendering every note's Markdown once, what each page view
+  would cost without stored renderings
+- first view: /notes/ while no rendering is stored (renders and stores all)
+- later views: /notes/ served from the stored renderings (median)
+
+A throwaway user and notes are created and removed afterwards; point it at
+a disposable database, and run with DEBUG=true unless static files have
+been collected.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from notes.management.commands.bench_note_storage import corpus
+from notes.models import Note, RenderedNote, User
+from notes.rendering import render_markdown
+
+EMAIL = 'bench-rendering@bench.stunotes.local'
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+class Command(BaseCommand):
+    help = "Benchmark the All Notes page with and without stored Markdown renderings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, default=500)
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        bodies = corpus(options['notes'], options['seed'])
+        User.objects.filter(email=EMAIL).delete()
+        user = User.objects.create(username=EMAIL, email=EMAIL, full_name='Rendering bench', password='!')
+        try:
+            Note.objects.bulk_create(
+                (Note(user=user, title=f"Bench {i}", content=body) for i, body in enumerate(bodies)),
+                batch_size=500,
+            )
+            _, parse_ms = _timed(lambda: [render_markdown(body) for body in bodies])
+
+            client = Client()
+            client.force_login(user)
+
+            def view():
+                response = client.get('/notes/', secure=True, HTTP_ACCEPT_ENCODING='identity')
+                assert response.status_code == 200, response.status_code
+
+            with override_settings(ALLOWED_HOSTS=['*']):
+                _, first_ms = _timed(view)
+                stored = RenderedNote.objects.filter(note__user=user).count()
+                later = [_timed(view)[1] for _ in range(options['rounds'])]
+        finally:
+            user.delete()
+
+        self.stdout.write(f"{len(bodies)} notes, {stored} renderings stored on first view")
+        self.stdout.write(f"parse all    {parse_ms:8.1f} ms")
+        self.stdout.write(f"first view   {first_ms:8.1f} ms")
+        self.stdout.write(f"later views  {statistics.median(later):8.1f} ms")
@@ -0,0 +1,151 @@
+"""
+Storage size and reconstruction time of note revision history (notes/revisions.py):
+
+    python manage.py bench_note_revisions --notes 5 --edits 500 --lines 400
+
+Each note gets `--edits` saves of typical editing (a few lines changed,
+inserted or removed somewhere, occasionally appended to), recorded through
+`record_revision` as the edit view does. Reports bytes stored against
+keeping a full copy per revision, time to record a revision, time to
+rebuild random revisions, and checks every rebuilt revision is exact.
+Then applies a retention policy and checks the history still rebuilds.
+
+A throwaway user and notes are created and removed afterwards; point it at a
+disposable database.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+from django.db.models.functions import Length
+from django.test import override_settings
+
+from notes import revisions
+from notes.models import Note, NoteRevision, User
+
+EMAIL = 'bench-revisions@bench.stunotes.local'
+WORDS = ('lecture', 'exam', 'chapter', 'theorem', 'proof', 'summary', 'example', 'definition',
+         'question', 'answer', 'review', 'formula', 'lab', 'essay', 'source', 'argument')
+
+
+def _line(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 14))) + '\n'
+
+
+def _edit(content, rng):
+    lines = content.splitlines(keepends=True)
+    kind = rng.random()
+    if kind < 0.5 and lines:  # reword a few lines
+        at = rng.randrange(len(lines))
+        for i in range(at, min(len(lines), at + rng.randint(1, 3))):
+            lines[i] = _line(rng)
+    elif kind < 0.75:  # insert a paragraph
+        at = rng.randint(0, len(lines))
+        lines[at:at] = [_line(rng) for _ in range(rng.randint(1, 5))]
+    elif kind < 0.9 and len(lines) > 10:  # cut a few lines
+        at = rng.randrange(len(lines) - 3)
+        del lines[at:at + rng.randint(1, 3)]
+    else:  # append
+        lines.extend(_line(rng) for _ in range(rng.randint(1, 4)))
+    return ''.join(lines)
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.2f} ms"
+
+
+class Command(BaseCommand):
+    help = "Benchmark note revision storage size and reconstruction time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, default=5)
+        parser.add_argument('--edits', type=int, default=500, help="Saves per note.")
+        parser.add_argument('--lines', type=int, default=400, help="Initial note length in lines.")
+        parser.add_argument('--reads', type=int, default=200, help="Random revisions rebuilt per note.")
+        parser.add_argument('--snapshot-interval', type=int, default=None,
+                            help="Override NOTE_REVISION_SNAPSHOT_INTERVAL for the run.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        User.objects.filter(email=EMAIL).delete()
+        user = User.objects.create(username=EMAIL, email=EMAIL, full_name='Revision bench', password='!')
+        overrides = {}
+        if options['snapshot_interval']:
+            overrides['NOTE_REVISION_SNAPSHOT_INTERVAL'] = options['snapshot_interval']
+        try:
+            with override_settings(**overrides):
+                self._bench(user, options)
+        finally:
+            user.delete()
+
+    def _bench(self, user, options):
+        rng = random.Random(options['seed'])
+        history = {}
+        record_times = []
+        for i in range(options['notes']):
+            content = ''.join(_line(rng) for _ in range(options['lines']))
+            note = Note.objects.create(user=user, title=f"Bench note {i}", content=content)
+            versions = []
+            for _ in range(options['edits']):
+                start = time.perf_counter()
+                revision = revisions.record_revision(note)
+                record_times.append(time.perf_counter() - start)
+                versions.append((revision.number, note.content))
+                note.content = _edit(note.content, rng)
+                note.save(update_fields=['content', 'updated_at'])
+            history[note.pk] = versions
+
+        total = sum(len(versions) for versions in history.values())
+        full_bytes = sum(len(content) for versions in history.values() for _, content in versions)
+        stored = NoteRevision.objects.filter(note__user=user)
+        stored_bytes = stored.aggregate(size=Sum(Length('data')))['size'] or 0
+        snapshots = stored.filter(is_snapshot=True).count()
+        average = full_bytes / total
+
+        self.stdout.write(
+            f"{options['notes']} notes x {options['edits']} revisions, "
+            f"average note {average / 1024:.1f} KiB, snapshot every "
+            f"{revisions._snapshot_interval()} revisions"
+        )
+        self.stdout.write(f"  full copies:  {full_bytes / 1024:10.1f} KiB")
+        self.stdout.write(
+            f"  stored:       {stored_bytes / 1024:10.1f} KiB  "
+            f"({stored_bytes / full_bytes:.1%}; {snapshots} snapshots, {total - snapshots} deltas)"
+        )
+        self.stdout.write(
+            f"  record:       median {_ms(statistics.median(record_times))}, max {_ms(max(record_times))}"
+        )
+
+        read_times = self._check_reads(history, rng, options['reads'])
+        self.stdout.write(
+            f"  rebuild:      median {_ms(statistics.median(read_times))}, "
+            f"p99 {_ms(sorted(read_times)[int(len(read_times) * 0.99) - 1])}, max {_ms(max(read_times))}"
+        )
+
+        # Retention: keep the newest quarter of each history
+        keep = max(1, options['edits'] // 4)
+        with override_settings(NOTE_REVISION_MAX_PER_NOTE=keep, NOTE_REVISION_MAX_AGE_DAYS=0):
+            start = time.perf_counter()
+            removed = revisions.compact_revisions()
+            elapsed = time.perf_counter() - start
+        kept = {note_id: versions[-keep:] for note_id, versions in history.items()}
+        self._check_reads(kept, rng, options['reads'])
+        stored_bytes = stored.aggregate(size=Sum(Length('data')))['size'] or 0
+        self.stdout.write(
+            f"  compaction to {keep} per note: removed {removed} in {_ms(elapsed)}, "
+            f"{stored_bytes / 1024:.1f} KiB left, history still exact"
+        )
+        self.stdout.write(self.style.SUCCESS("All rebuilt revisions matched."))
+
+    def _check_reads(self, history, rng, reads):
+        times = []
+        for note_id, versions in history.items():
+            for number, expected in rng.sample(versions, min(reads, len(versions))):
+                start = time.perf_counter()
+                content = revisions.revision_content(note_id, number)
+                times.append(time.perf_counter() - start)
+                if content != expected:
+                    raise CommandError(f"Revision {number} of note {note_id} did not rebuild correctly.")
+        return times
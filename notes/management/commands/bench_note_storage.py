@@ -0,0 +1,147 @@
+"""
+Database size and read/write cost of note bodies under each
+NOTE_CONTENT_COMPRESSION mode (see notes/fields.py):
+
+    python manage.py bench_note_storage --notes 2000
+
+The corpus mimics student notes: sizes are log-normal (most a few hundred
+bytes to a few KiB, a long tail of pasted lecture material), made of
+headings, prose, bullet lists, formulas, links and the odd code block.
+For each mode the same corpus is written, then read back the way
+`notes_list` and `edit_note` read it (whole rows, bodies decoded).
+
+A throwaway user and notes are created and removed afterwards; point it at a
+disposable database.
+"""
+import importlib.util
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.db.models.functions import Length
+from django.test import override_settings
+
+from notes.fields import METHODS
+from notes.models import Note, User
+
+EMAIL = 'bench-storage@bench.stunotes.local'
+VOCABULARY = (
+    'the of and to in is for that on with as by this are be from at an which it or was can we '
+    'energy force mass velocity equation theorem proof lemma function derivative integral limit '
+    'matrix vector cell protein enzyme membrane market demand supply equilibrium policy history '
+    'revolution empire treaty poem author narrative argument evidence hypothesis experiment data '
+    'sample variance mean model algorithm complexity graph node memory process thread lecture exam'
+).split()
+
+
+def _sentence(rng):
+    words = [rng.choice(VOCABULARY) for _ in range(rng.randint(6, 22))]
+    return ' '.join(words).capitalize() + rng.choice('..?!;')
+
+
+def _block(rng):
+    kind = rng.random()
+    if kind < 0.45:
+        return ' '.join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+    if kind < 0.65:
+        return '\n'.join(f"- {_sentence(rng)}" for _ in range(rng.randint(2, 7)))
+    if kind < 0.75:
+        return f"## {_sentence(rng)[:-1].title()}"
+    if kind < 0.85:
+        symbols = 'xyzabn'
+        return ' '.join(f"{rng.choice(symbols)}_{rng.randint(0, 9)} = {rng.randint(1, 99)}{rng.choice('+-*/')}"
+                        f"{rng.choice(symbols)}^{rng.randint(2, 4)}" for _ in range(rng.randint(1, 4)))
+    if kind < 0.93:
+        token = ''.join(rng.choices(string.ascii_letters + string.digits, k=12))
+        return f"Source: https://example.edu/{rng.choice(VOCABULARY)}/{token}"
+    lines = [f"    {rng.choice(VOCABULARY)}_{i} = {rng.choice(VOCABULARY)}({rng.randint(0, 100)})"
+             for i in range(rng.randint(3, 12))]
+    return '\n'.join(lines)
+
+
+def corpus(count, seed=1):
+    rng = random.Random(seed)
+    bodies = []
+    for _ in range(count):
+        target = int(min(rng.lognormvariate(7.2, 1.2), 200_000))  # median ~1.5 KiB
+        parts, size = [], 0
+        while size < target:
+            block = _block(rng)
+            parts.append(block)
+            size += len(block) + 2
+        bodies.append('\n\n'.join(parts))
+    return bodies
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:8.1f} ms"
+
+
+class Command(BaseCommand):
+    help = "Benchmark note body storage size and read/write time per NOTE_CONTENT_COMPRESSION mode."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, default=2000)
+        parser.add_argument('--rounds', type=int, default=5, help="Full reads timed per mode.")
+        parser.add_argument('--min-bytes', type=int, default=None,
+                            help="Override NOTE_CONTENT_COMPRESS_MIN_BYTES for the run.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        bodies = corpus(options['notes'], options['seed'])
+        raw_bytes = sum(len(body.encode('utf-8')) for body in bodies)
+        sizes = sorted(len(body) for body in bodies)
+        self.stdout.write(
+            f"{len(bodies)} notes, {raw_bytes / 1024:.0f} KiB of text "
+            f"(median {sizes[len(sizes) // 2]} B, p95 {sizes[int(len(sizes) * 0.95)]} B, max {sizes[-1]} B)"
+        )
+        self.stdout.write(f"{'mode':<6} {'stored':>12} {'ratio':>7} {'write':>11} {'read all':>11} {'open one':>11}")
+
+        User.objects.filter(email=EMAIL).delete()
+        user = User.objects.create(username=EMAIL, email=EMAIL, full_name='Storage bench', password='!')
+        try:
+            for method in METHODS:
+                if method == 'zstd' and importlib.util.find_spec('zstandard') is None:
+                    self.stdout.write(f"{method:<6} skipped (zstandard not installed)")
+                    continue
+                settings = {'NOTE_CONTENT_COMPRESSION': method}
+                if options['min_bytes'] is not None:
+                    settings['NOTE_CONTENT_COMPRESS_MIN_BYTES'] = options['min_bytes']
+                with override_settings(**settings):
+                    self._bench(user, method, bodies, raw_bytes, options['rounds'])
+        finally:
+            user.delete()
+
+    def _bench(self, user, method, bodies, raw_bytes, rounds):
+        notes = Note.objects.filter(user=user)
+        start = time.perf_counter()
+        Note.objects.bulk_create(
+            (Note(user=user, title=f"Bench {i}", content=body) for i, body in enumerate(bodies)),
+            batch_size=500,
+        )
+        write = time.perf_counter() - start
+        stored = notes.aggregate(size=Sum(Length('content')))['size'] or 0
+
+        # notes_list: every row with its body
+        reads = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            loaded = [note.content for note in notes.order_by('-created_at')]
+            reads.append(time.perf_counter() - start)
+        assert sorted(loaded) == sorted(bodies), "bodies did not round-trip"
+
+        # edit_note: one row by primary key, for the largest notes
+        largest = list(notes.order_by(Length('content').desc()).values_list('pk', flat=True)[:50])
+        start = time.perf_counter()
+        for pk in largest:
+            Note.objects.get(pk=pk).content
+        open_one = (time.perf_counter() - start) / len(largest)
+
+        self.stdout.write(
+            f"{method:<6} {stored / 1024:9.0f} KiB {stored / raw_bytes:6.1%} "
+            f"{_ms(write)} {_ms(statistics.median(reads))} {_ms(open_one)}"
+        )
+        notes.delete()
@@ -0,0 +1,56 @@
+"""
+Per-login CPU cost of each password hashing policy (see notes/hashers.py):
+
+    python manage.py bench_password_hashing --rounds 20
+
+Also checks that a hash made under Django's default policy is flagged for
+rehashing (and upgraded) on the first login under each policy.
+"""
+import importlib.util
+import time
+
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from notes.hashers import POLICIES, password_hashers
+
+
+class Command(BaseCommand):
+    help = "Measure per-login CPU cost under each PASSWORD_HASH_POLICY."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=10)
+        parser.add_argument('--policy', action='append', choices=list(POLICIES),
+                            help="Policy to benchmark (repeatable). Defaults to all available.")
+
+    def handle(self, *args, **options):
+        policies = options['policy'] or list(POLICIES)
+        password = 'correct horse battery staple'
+
+        with override_settings(PASSWORD_HASHERS=password_hashers('default')):
+            legacy_hash = make_password(password)
+
+        self.stdout.write(f"{'policy':<10} {'cpu/login':>11} {'wall/login':>11}  rehash from default  hasher")
+        for policy in policies:
+            if policy == 'argon2' and importlib.util.find_spec('argon2') is None:
+                self.stdout.write(f"{policy:<10} skipped (argon2-cffi not installed)")
+                continue
+
+            with override_settings(PASSWORD_HASHERS=password_hashers(policy)):
+                encoded = make_password(password)
+
+                cpu_start, wall_start = time.process_time(), time.perf_counter()
+                for _ in range(options['rounds']):
+                    assert check_password(password, encoded)
+                cpu = (time.process_time() - cpu_start) / options['rounds']
+                wall = (time.perf_counter() - wall_start) / options['rounds']
+
+                # What ModelBackend does on login: verify, then rehash via the setter
+                upgraded = []
+                check_password(password, legacy_hash, setter=lambda raw: upgraded.append(make_password(raw)))
+                rehash = 'yes' if upgraded else 'no (already current)'
+
+                self.stdout.write(
+                    f"{policy:<10} {cpu * 1000:9.1f}ms {wall * 1000:9.1f}ms  {rehash:<20} {get_hasher().algorithm}"
+                )
@@ -0,0 +1,104 @@
+"""
+Cost of related-note suggestions (notes/related.py) for users with many
+notes:
+
+    python manage.py bench_related_notes --notes 100 500 2000
+
+For each size a throwaway user gets that many notes, written from a few
+topic vocabularies so that related notes exist, and is removed afterwards.
+Reported per size:
+
+- vectorize: tokenizing one note into its stored vector (done on save)
+- rescan: tokenizing all the user's notes, what every query would cost
+  without stored vectors
+- build: loading the stored vectors into the user's TF-IDF matrix
+- query p50/p99: top-5 related notes for a note, matrix already built
+
+Point it at a disposable database.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from notes import related
+from notes.models import Note, User
+
+TOPICS = 12
+WORDS_PER_TOPIC = 150
+SHARED_WORDS = 2000
+
+
+def _word(rng):
+    return ''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(3, 9)))
+
+
+def _median_ms(func, rounds):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+class Command(BaseCommand):
+    help = "Benchmark related-note vectorizing, matrix builds and similarity queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, nargs='+', default=[100, 500, 2000],
+                            help="Notes per bench user.")
+        parser.add_argument('--words', type=int, default=300, help="Words per note body.")
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        shared = [_word(rng) for _ in range(SHARED_WORDS)]
+        topics = [[_word(rng) for _ in range(WORDS_PER_TOPIC)] for _ in range(TOPICS)]
+        self.stdout.write(
+            f"{'notes':>6} {'vectorize':>10} {'rescan':>10} {'build':>9} {'query p50':>10} {'p99':>9}"
+        )
+        for count in options['notes']:
+            user = User.objects.create_user(
+                email=f'bench-related-{count}@stunotes.local', username=f'bench-related-{count}@stunotes.local',
+                full_name='Bench Related', password='bench-pass',
+            )
+            try:
+                self._bench_user(user, count, rng, shared, topics, options)
+            finally:
+                related.invalidate(user.id)
+                user.delete()
+
+    def _bench_user(self, user, count, rng, shared, topics, options):
+        notes = []
+        for i in range(count):
+            topic = topics[i % TOPICS]
+            words = [rng.choice(topic) if rng.random() < 0.3 else rng.choice(shared) for _ in range(options['words'])]
+            notes.append(Note(user=user, title=' '.join(rng.sample(topic, 3)), content=' '.join(words),
+                              tags=', '.join(rng.sample(topic, 2))))
+        # Without signals: the first build vectorizes them
+        Note.objects.bulk_create(notes, batch_size=500)
+        related.build_matrix(user.id)
+
+        sample = notes[0]
+        vectorize_ms = _median_ms(lambda: related.term_counts(sample.title, sample.content, sample.tags), 20)
+        rescan_ms = _median_ms(lambda: [related.term_counts(n.title, n.content, n.tags) for n in notes], 3)
+        build_ms = _median_ms(lambda: related.build_matrix(user.id), 5)
+
+        matrix = related.get_matrix(user.id)
+        note_ids = [note.pk for note in notes]
+        times = []
+        for _ in range(options['queries']):
+            note_id = rng.choice(note_ids)
+            start = time.perf_counter()
+            matrix.similar(note_id)
+            times.append(time.perf_counter() - start)
+        times.sort()
+        p50, p99 = statistics.median(times) * 1000, times[int(len(times) * 0.99)] * 1000
+
+        self.stdout.write(
+            f"{count:6d} {vectorize_ms:7.2f} ms {rescan_ms:7.1f} ms {build_ms:6.1f} ms"
+            f" {p50:7.3f} ms {p99:6.3f} ms"
+        )
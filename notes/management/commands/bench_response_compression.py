@@ -0,0 +1,109 @@
+"""
+Bytes on the wire and CPU time of HTML minification and gzip/brotli
+compression (notes/compression.py) for the main pages:
+
+    python manage.py bench_response_compression --rounds 20
+
+Each page is rendered with the middleware's work switched off, then the
+minifier and both encoders are timed on that HTML, the way the middleware
+applies them. Sizes are reported for the raw page, after minification, and
+after minification plus gzip or brotli.
+
+A throwaway admin and student with some tasks/notes are created and removed
+afterwards. Point it at a disposable database, and run with DEBUG=true
+unless static files have been collected (templates resolve {% static %}).
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from notes.compression import brotli, compress_bytes, minify_html
+from notes.models import Note, Task, User
+
+PAGES = [
+    ('landing', '/', None),
+    ('login', '/login/', None),
+    ('home', '/home/', 'student'),
+    ('calendar', '/calendar/', 'student'),
+    ('notes', '/notes/', 'student'),
+    ('profile', '/profile/', 'student'),
+    ('settings', '/settings/', 'student'),
+    ('admin', '/admin-dashboard/', 'admin'),
+]
+
+
+def _median_ms(func, rounds):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times) * 1000
+
+
+class Command(BaseCommand):
+    help = "Benchmark HTML minification and gzip/brotli response compression per page."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=20)
+        parser.add_argument('--tasks', type=int, default=100, help="Tasks/notes seeded for the bench student.")
+
+    def handle(self, *args, **options):
+        users = {
+            'admin': User.objects.create_user(
+                email='bench-admin@stunotes.local', username='bench-admin@stunotes.local',
+                full_name='Bench Admin', password='bench-pass', is_staff=True, is_superuser=True,
+            ),
+            'student': User.objects.create_user(
+                email='bench-student@stunotes.local', username='bench-student@stunotes.local',
+                full_name='Bench Student', password='bench-pass',
+            ),
+        }
+        try:
+            student, now = users['student'], timezone.now()
+            Task.objects.bulk_create(
+                Task(user=student, title=f"Task {i}", subject=f"Subject {i % 7}",
+                     due_date=now + timezone.timedelta(hours=i * 5))
+                for i in range(options['tasks'])
+            )
+            Note.objects.bulk_create(
+                Note(user=student, title=f"Note {i}", content="lorem ipsum " * 50, subject=f"Subject {i % 7}")
+                for i in range(options['tasks'])
+            )
+            self.stdout.write(
+                f"{'page':<9} {'raw':>8} {'minified':>9} {'gzip':>8} {'br':>8}"
+                f" {'render':>9} {'minify':>8} {'gzip':>8} {'br':>8}"
+            )
+            with override_settings(ALLOWED_HOSTS=['*'], RESPONSE_MINIFY_HTML=False):
+                for name, url, role in PAGES:
+                    self._bench_page(name, url, users.get(role), options['rounds'])
+        finally:
+            for user in users.values():
+                user.delete()
+        if brotli is None:
+            self.stdout.write("brotli is not installed; br columns show gzip.")
+
+    def _bench_page(self, name, url, user, rounds):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+
+        def render():
+            response = client.get(url, secure=True, HTTP_ACCEPT_ENCODING='identity')
+            assert response.status_code == 200, (url, response.status_code)
+            return response.content
+
+        raw, render_ms = _median_ms(render, rounds)
+        html = raw.decode('utf-8')
+        minified, minify_ms = _median_ms(lambda: minify_html(html).encode('utf-8'), rounds)
+        gzipped, gzip_ms = _median_ms(lambda: compress_bytes(minified, 'gzip'), rounds)
+        brotli_encoding = 'br' if brotli is not None else 'gzip'
+        brotlied, br_ms = _median_ms(lambda: compress_bytes(minified, brotli_encoding), rounds)
+
+        self.stdout.write(
+            f"{name:<9} {len(raw):8d} {len(minified):9d} {len(gzipped):8d} {len(brotlied):8d}"
+            f" {render_ms:6.1f} ms {minify_ms:5.2f} ms {gzip_ms:5.2f} ms {br_ms:5.2f} ms"
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from notes.models import User
+from notes.thumbnails import generate_profile_thumbnails
+
+
+class Command(BaseCommand):
+    help = "Generate avatar thumbnails for users who uploaded a profile picture before thumbnails existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Rebuild thumbnails for every user with a picture.")
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(profile_pic='').exclude(profile_pic__isnull=True)
+        if not options['all']:
+            users = users.filter(profile_pic_thumbs={})
+
+        built = failed = 0
+        for user in users.iterator():
+            try:
+                generate_profile_thumbnails(user)
+                user.save(update_fields=['profile_pic_thumbs'])
+                built += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"{user.email}: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(f"Built thumbnails for {built} user(s), {failed} failed."))
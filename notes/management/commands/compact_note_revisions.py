@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from notes.revisions import compact_revisions
+
+
+class Command(BaseCommand):
+    help = "Apply the note revision retention policy (NOTE_REVISION_MAX_PER_NOTE / _MAX_AGE_DAYS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help="Notes compacted per pass.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while removed := compact_revisions(limit=options['limit']):
+            total += removed
+        self.stdout.write(self.style.SUCCESS(f"Removed {total} revision(s)."))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from notes.duplicates import duplicate_groups, fingerprint_missing
+from notes.models import NoteFingerprint, User
+
+
+class Command(BaseCommand):
+    help = "Fingerprint notes saved without one, in batches, and report near-duplicate notes per user."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Notes fingerprinted per batch.")
+        parser.add_argument('--user', help="Only this user's notes (email).")
+
+    def handle(self, *args, **options):
+        user_id = None
+        if options['user']:
+            user_id = User.objects.values_list('pk', flat=True).get(email=options['user'])
+
+        written = 0
+        for count in fingerprint_missing(batch_size=options['batch_size'], user_id=user_id):
+            written += count
+            self.stdout.write(f"Fingerprinted {written} note(s)...")
+
+        owners = NoteFingerprint.objects.values('user_id').annotate(n=Count('pk')).filter(n__gt=1).order_by('user_id')
+        if user_id is not None:
+            owners = owners.filter(user_id=user_id)
+        emails = dict(User.objects.filter(pk__in=[row['user_id'] for row in owners]).values_list('pk', 'email'))
+        groups = notes = 0
+        for row in owners:
+            found = duplicate_groups(row['user_id'])
+            if found:
+                size = sum(len(group) for group in found)
+                groups, notes = groups + len(found), notes + size
+                self.stdout.write(f"{emails.get(row['user_id'])}: {len(found)} group(s), {size} note(s)")
+        self.stdout.write(self.style.SUCCESS(
+            f"Fingerprinted {written} note(s); {groups} duplicate group(s) covering {notes} note(s)."
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from notes.account_deletion import DEFAULT_BATCH_SIZE, purge_pending_deletions
+from notes.models import AccountDeletion
+
+
+class Command(BaseCommand):
+    help = "Purge the data of accounts scheduled for deletion, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--time-budget', type=float, default=None,
+                            help="Stop after this many seconds (remaining work is resumed next run).")
+
+    def handle(self, *args, **options):
+        purged = purge_pending_deletions(batch_size=options['batch_size'], time_budget=options['time_budget'])
+        remaining = AccountDeletion.objects.filter(status__in=['pending', 'running']).count()
+        failed = AccountDeletion.objects.filter(status='failed').count()
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {purged} account(s); {remaining} still queued, {failed} failed."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from notes.related import rebuild_note_vectors
+
+
+class Command(BaseCommand):
+    help = "Recompute every note's related-notes term vector (after note content was changed without save())."
+
+    def handle(self, *args, **options):
+        rows = rebuild_note_vectors()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} note vector(s)."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from notes.facets import rebuild_subject_facets
+
+
+class Command(BaseCommand):
+    help = "Recompute the subject facet counts from the task and note tables (after bulk writes that skip signals)."
+
+    def handle(self, *args, **options):
+        rows = rebuild_subject_facets()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} subject facet row(s)."))
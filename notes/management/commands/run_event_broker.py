@@ -0,0 +1,47 @@
+"""
+Local relay for server-sent events across ASGI worker processes:
+
+    python manage.py run_event_broker --port 8765
+    EVENTS_BROKER_URL=tcp://127.0.0.1:8765 gunicorn -c gunicorn_asgi.conf.py stunotesapp.asgi:application
+
+Every connected worker both publishes and listens; each newline-delimited
+event received is written to all connections. A stand-in for Redis pub/sub
+on a single host.
+"""
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Relay server-sent events between ASGI workers on this host."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        asyncio.run(self._serve(options['host'], options['port']))
+
+    async def _serve(self, host, port):
+        writers = set()
+
+        async def handle_connection(reader, writer):
+            writers.add(writer)
+            try:
+                while line := await reader.readline():
+                    for peer in list(writers):
+                        try:
+                            peer.write(line)
+                        except (ConnectionError, RuntimeError):
+                            writers.discard(peer)
+            except ConnectionError:
+                pass  # worker went away
+            finally:
+                writers.discard(writer)
+                writer.close()
+
+        server = await asyncio.start_server(handle_connection, host, port)
+        self.stdout.write(f"Event relay listening on {host}:{port}")
+        async with server:
+            await server.serve_forever()
@@ -0,0 +1,209 @@
+"""
+Soak test for the server-sent events endpoint (notes/events.py):
+
+    python manage.py soak_event_stream --subscribers 5000 --users 500 --events 2000
+
+Opens thousands of concurrent streams against the real ASGI endpoint
+(in-memory ASGI transport, authenticated with session cookies), then:
+
+- measures memory per idle connection and CPU used while idle (heartbeats only);
+- publishes task events from worker threads, as views do, and checks that every
+  subscriber of the target user received each one, reporting delivery latency;
+- pushes due reminders through the reminder check;
+- disconnects everyone and checks that no subscription is left behind.
+
+With --broker the events go through a relay started with run_event_broker.
+
+Throwaway users, sessions, tasks and reminders are created and removed
+afterwards; point it at a disposable database.
+"""
+import asyncio
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.utils import timezone
+
+from notes import events
+from notes.models import Reminder, Task, User
+
+EMAIL_DOMAIN = 'soak.stunotes.local'
+
+
+class Connection:
+    """Client side of one in-memory ASGI stream."""
+
+    def __init__(self, cookie):
+        self.cookie = cookie
+        self.disconnect = asyncio.Event()
+        self.status = None
+        self.events = []
+        self.heartbeats = 0
+
+    async def receive(self):
+        await self.disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+            return
+        body = message.get('body', b'')
+        if body.startswith(b': keep-alive'):
+            self.heartbeats += 1
+        elif body.startswith(b'event:'):
+            received = time.perf_counter()
+            lines = body.decode('utf-8').splitlines()
+            event_type = lines[0][len('event: '):]
+            data = json.loads(lines[1][len('data: '):])
+            self.events.append((event_type, data, received))
+
+    def scope(self):
+        return {
+            'type': 'http', 'method': 'GET', 'path': settings.EVENTS_URL or '/events/',
+            'headers': [(b'cookie', f'{settings.SESSION_COOKIE_NAME}={self.cookie}'.encode('latin-1'))],
+        }
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[max(0, int(len(values) * pct) - 1)]
+
+
+class Command(BaseCommand):
+    help = "Soak-test the server-sent events endpoint with thousands of concurrent subscribers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=5000)
+        parser.add_argument('--users', type=int, default=500, help="Subscribers are spread over this many users.")
+        parser.add_argument('--events', type=int, default=2000, help="Task events published during the run.")
+        parser.add_argument('--idle', type=float, default=5.0, help="Seconds to hold all connections idle.")
+        parser.add_argument('--heartbeat', type=int, default=2, help="Heartbeat interval used for the run.")
+        parser.add_argument('--broker', default='',
+                            help="Publish through a running relay (e.g. tcp://127.0.0.1:8765) instead of in-process.")
+
+    def handle(self, *args, **options):
+        if options['users'] > options['subscribers']:
+            raise CommandError("--users cannot exceed --subscribers.")
+        # Leftovers from an interrupted run
+        User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+        users, cookies = self._create_users(options['users'])
+        try:
+            with override_settings(
+                EVENTS_HEARTBEAT_SECONDS=options['heartbeat'],
+                EVENTS_REMINDER_POLL_SECONDS=1,
+                EVENTS_BROKER_URL=options['broker'],
+            ):
+                asyncio.run(self._soak(users, cookies, options))
+        finally:
+            session_store = import_module(settings.SESSION_ENGINE).SessionStore
+            for cookie in cookies:
+                session_store(cookie).delete()
+            User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+
+    def _create_users(self, count):
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+        User.objects.bulk_create(
+            User(username=f'soak-{i}@{EMAIL_DOMAIN}', email=f'soak-{i}@{EMAIL_DOMAIN}',
+                 full_name=f'Soak {i}', password='!')
+            for i in range(count)
+        )
+        users = list(User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').order_by('pk'))
+        cookies = []
+        for user in users:
+            session = session_store()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.create()
+            cookies.append(session.session_key)
+        return users, cookies
+
+    async def _soak(self, users, cookies, options):
+        total = options['subscribers']
+        owners = [i % len(users) for i in range(total)]
+        connections = [Connection(cookies[owner]) for owner in owners]
+
+        # ---- connect
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        streams = [asyncio.create_task(events.sse_application(c.scope(), c.receive, c.send)) for c in connections]
+        while events.hub.count() < total:
+            if any(stream.done() for stream in streams):
+                raise CommandError("A stream closed during connect (authentication failed?).")
+            await asyncio.sleep(0.05)
+        connect_time = time.perf_counter() - start
+        per_connection = (tracemalloc.get_traced_memory()[0] - baseline) / total
+        tracemalloc.stop()
+        self.stdout.write(f"Connected {total} streams for {len(users)} users in {connect_time:.2f}s")
+        self.stdout.write(f"  memory per idle connection: {per_connection / 1024:.1f} KiB")
+
+        # ---- idle
+        cpu_start = time.process_time()
+        await asyncio.sleep(options['idle'])
+        idle_cpu = time.process_time() - cpu_start
+        heartbeats = sum(c.heartbeats for c in connections)
+        self.stdout.write(
+            f"  idle {options['idle']:.0f}s: {idle_cpu * 1000:.0f} ms CPU, {heartbeats} heartbeats sent"
+        )
+
+        # ---- task events, published from threads like the post_save handler
+        loop = asyncio.get_running_loop()
+        subscribers_of = {}
+        for owner in owners:
+            subscribers_of[users[owner].pk] = subscribers_of.get(users[owner].pk, 0) + 1
+        targets = [random.choice(users).pk for _ in range(options['events'])]
+        expected = sum(subscribers_of[user_id] for user_id in targets)
+
+        def publish(n):
+            events.publish(targets[n], 'task', {'id': n, 'sent': time.perf_counter()})
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            await asyncio.gather(*[loop.run_in_executor(pool, publish, n) for n in range(len(targets))])
+        while sum(len(c.events) for c in connections) < expected and time.perf_counter() - start < 30:
+            await asyncio.sleep(0.05)
+        delivered = [received - data['sent'] for c in connections for kind, data, received in c.events if kind == 'task']
+        self.stdout.write(f"Published {len(targets)} task events: {len(delivered)}/{expected} deliveries")
+        if delivered:
+            self.stdout.write(
+                f"  latency p50 {statistics.median(delivered) * 1000:.1f} ms, "
+                f"p99 {_percentile(delivered, 0.99) * 1000:.1f} ms, max {max(delivered) * 1000:.1f} ms"
+            )
+
+        # ---- due reminders
+        reminder_users = users[:min(len(users), 100)]
+        await asyncio.to_thread(self._seed_reminders, reminder_users)
+        expected_reminders = sum(subscribers_of[user.pk] for user in reminder_users)
+        start = time.perf_counter()
+        reminders = 0
+        while reminders < expected_reminders and time.perf_counter() - start < 10:
+            await asyncio.sleep(0.2)
+            reminders = sum(1 for c in connections for kind, _, _ in c.events if kind == 'reminder')
+        self.stdout.write(f"Reminders: {reminders}/{expected_reminders} deliveries")
+
+        # ---- disconnect
+        for connection in connections:
+            connection.disconnect.set()
+        await asyncio.wait_for(asyncio.gather(*streams), timeout=30)
+        self.stdout.write(f"Disconnected; {events.hub.count()} subscriptions left open")
+
+        ok = len(delivered) == expected and reminders == expected_reminders and events.hub.count() == 0
+        if not ok:
+            raise CommandError("Soak test failed.")
+        self.stdout.write(self.style.SUCCESS("Soak test passed."))
+
+    def _seed_reminders(self, users):
+        due = timezone.now() - timedelta(minutes=1)
+        tasks = Task.objects.bulk_create(Task(user=user, title=f"Soak task {user.pk}") for user in users)
+        Reminder.objects.bulk_create(Reminder(task=task, remind_time=due) for task in tasks)
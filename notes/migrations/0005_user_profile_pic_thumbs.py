@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0004_adminrequest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_pic_thumbs',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
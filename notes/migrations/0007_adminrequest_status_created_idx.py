@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-19 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0006_accountdeletion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adminrequest',
+            index=models.Index(fields=['status', 'created_at'], name='adminreq_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Moves Note.content to a compressed binary column (notes/fields.py).
+
+from django.db import migrations, models
+
+import notes.fields
+
+BATCH_SIZE = 500
+
+
+def _copy(apps, source, target):
+    Note = apps.get_model('notes', 'Note')
+    last_pk = 0
+    while True:
+        batch = list(Note.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', source)[:BATCH_SIZE])
+        if not batch:
+            break
+        for note in batch:
+            setattr(note, target, getattr(note, source))
+        Note.objects.bulk_update(batch, [target])
+        last_pk = batch[-1].pk
+
+
+def compress_content(apps, schema_editor):
+    _copy(apps, 'content', 'content_data')
+
+
+def decompress_content(apps, schema_editor):
+    _copy(apps, 'content_data', 'content')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0011_note_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='content_data',
+            field=notes.fields.CompressedTextField(default=''),
+            preserve_default=False,
+        ),
+        migrations.RunPython(compress_content, decompress_content),
+        # Lets the reverse migration re-add the old column to existing rows
+        migrations.AlterField(
+            model_name='note',
+            name='content',
+            field=models.TextField(default=''),
+        ),
+        migrations.RemoveField(
+            model_name='note',
+            name='content',
+        ),
+        migrations.RenameField(
+            model_name='note',
+            old_name='content_data',
+            new_name='content',
+        ),
+    ]
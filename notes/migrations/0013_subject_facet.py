@@ -0,0 +1,54 @@
+# Generated by Django 4.2 on 2026-10-19 14:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_facets(apps, schema_editor):
+    # Same as notes.facets.rebuild_subject_facets, against the historical models
+    SubjectFacet = apps.get_model('notes', 'SubjectFacet')
+    rows = []
+    for kind, model_name in (('task', 'Task'), ('note', 'Note')):
+        model = apps.get_model('notes', model_name)
+        per_user = (model.objects.exclude(subject='').values('user_id', 'subject')
+                    .annotate(n=models.Count('pk')).order_by())
+        totals = {}
+        for row in per_user:
+            rows.append(SubjectFacet(user_id=row['user_id'], kind=kind, subject=row['subject'], count=row['n']))
+            totals[row['subject']] = totals.get(row['subject'], 0) + row['n']
+        rows.extend(SubjectFacet(kind=kind, subject=subject, count=n) for subject, n in totals.items())
+    SubjectFacet.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0012_note_compressed_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('task', 'Task'), ('note', 'Note')], max_length=10)),
+                ('subject', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'notes_subject_facet',
+                'ordering': ['kind', 'subject'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='subjectfacet',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('user', 'kind', 'subject'), name='subject_facet_unique_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='subjectfacet',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('kind', 'subject'), name='subject_facet_unique_global'),
+        ),
+        migrations.RunPython(populate_facets, migrations.RunPython.noop),
+    ]
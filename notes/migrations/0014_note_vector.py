@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-19 14:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0013_subject_facet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteVector',
+            fields=[
+                ('note', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='vector', serialize=False, to='notes.note')),
+                ('terms', models.BinaryField()),
+                ('counts', models.BinaryField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'notes_note_vector',
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2 on 2026-10-19 15:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0014_note_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteFingerprint',
+            fields=[
+                ('note', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='notes.note')),
+                ('simhash', models.BigIntegerField()),
+                ('band0', models.PositiveIntegerField()),
+                ('band1', models.PositiveIntegerField()),
+                ('band2', models.PositiveIntegerField()),
+                ('band3', models.PositiveIntegerField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'notes_note_fingerprint',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notefingerprint',
+            index=models.Index(fields=['user', 'band0'], name='note_fp_user_band0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notefingerprint',
+            index=models.Index(fields=['user', 'band1'], name='note_fp_user_band1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notefingerprint',
+            index=models.Index(fields=['user', 'band2'], name='note_fp_user_band2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notefingerprint',
+            index=models.Index(fields=['user', 'band3'], name='note_fp_user_band3_idx'),
+        ),
+    ]
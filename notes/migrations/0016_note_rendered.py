@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-19 15:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+import notes.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0015_note_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderedNote',
+            fields=[
+                ('note', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rendered', serialize=False, to='notes.note')),
+                ('content_hash', models.CharField(max_length=32)),
+                ('html', notes.fields.CompressedTextField()),
+            ],
+            options={
+                'db_table': 'notes_note_rendered',
+            },
+        ),
+    ]
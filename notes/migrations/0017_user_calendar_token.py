@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0016_note_rendered'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='calendar_token',
+            field=models.CharField(blank=True, default=None, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-19 18:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0018_task_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminder',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='synctombstone',
+            name='kind',
+            field=models.CharField(choices=[('task', 'Task'), ('note', 'Note'), ('reminder', 'Reminder')], max_length=10),
+        ),
+    ]
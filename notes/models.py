@@ -1,7 +1,16 @@
+from datetime import datetime, time, timedelta
+
 from django.db import models
+from django.db.models import BooleanField, Case, Q, Value, When
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
+from .fields import CompressedTextField
+
+# Shared avatar shown when a user has no (or a missing) profile picture
+DEFAULT_PROFILE_PIC_URL = "https://res.cloudinary.com/dgpuex4bh/image/upload/v1764851245/default-profile_kmmw8n.png"
+
+
 class User(AbstractUser):
     """Extended User model for StuNotes with full_name and email as login"""
     
@@ -12,6 +21,7 @@ class User(AbstractUser):
     # Optional profile fields
     bio = models.TextField(max_length=500, blank=True)  # Short biography
     profile_pic = models.ImageField(upload_to='profile_pics/', blank=True, null=True)  # Profile image - blank/null means use default
+    profile_pic_thumbs = models.JSONField(default=dict, blank=True)  # Precomputed thumbnails: {"64": {"name": ..., "url": ...}}
     
     # User interface preference
     THEME_CHOICES = [
@@ -20,6 +30,8 @@ class User(AbstractUser):
     ]
     theme = models.CharField(max_length=20, choices=THEME_CHOICES, default='light')  # Light or dark mode
     notifications_enabled = models.BooleanField(default=True)  # Whether notifications are enabled
+    # Secret in the URL of the user's iCalendar feed (notes/ical.py); null = feed off
+    calendar_token = models.CharField(max_length=64, unique=True, null=True, blank=True, default=None)
     
     # Admin configuration
     is_admin_only = models.BooleanField(
@@ -63,8 +75,63 @@ class User(AbstractUser):
             pass
 
         # Fallback to static default user icon
-        from django.conf import settings
-        return "https://res.cloudinary.com/dgpuex4bh/image/upload/v1764851245/default-profile_kmmw8n.png"
+        return DEFAULT_PROFILE_PIC_URL
+
+    def profile_pic_thumb_url(self, size=64):
+        """
+        Return the URL of the stored thumbnail closest to `size` pixels.
+        Uses the URLs saved at upload time, so no storage call is made.
+        Users who uploaded before thumbnails existed fall back to `profile_pic_url`.
+        """
+        from .thumbnails import pick_size, default_thumb_url
+
+        if not self.profile_pic or not getattr(self.profile_pic, 'name', None):
+            return default_thumb_url(DEFAULT_PROFILE_PIC_URL, pick_size(size))
+
+        thumbs = self.profile_pic_thumbs or {}
+        chosen = pick_size(size, thumbs.keys())
+        if chosen is not None:
+            return thumbs[str(chosen)]['url']
+        return self.profile_pic_url
+
+
+class TaskQuerySet(models.QuerySet):
+    """
+    Due-date queries for tasks, evaluated in the database.
+    Each method takes an optional `now` so a view can pass one timestamp to
+    all of its queries and get consistent counts and lists.
+    """
+    ACTIVE_STATUSES = ('pending', 'in_progress')
+
+    def active(self):
+        # Tasks that still need doing. Recurring series are rules, not tasks:
+        # their occurrences are expanded per window by notes/recurrence.py.
+        return self.filter(status__in=self.ACTIVE_STATUSES, recurrence='')
+
+    def series(self):
+        # Tasks carrying a recurrence rule
+        return self.exclude(recurrence='')
+
+    def overdue(self, now=None):
+        return self.active().filter(due_date__lt=now or timezone.now())
+
+    def due_today(self, now=None):
+        # Today's [start, end) in the current timezone, so due_date's index applies
+        day = timezone.localdate(now or timezone.now())
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        return self.active().filter(due_date__gte=start, due_date__lt=start + timedelta(days=1))
+
+    def upcoming(self, hours=24, now=None):
+        now = now or timezone.now()
+        return self.active().filter(due_date__gte=now, due_date__lte=now + timedelta(hours=hours))
+
+    def with_is_overdue(self, now=None):
+        """Annotate `is_overdue` so templates don't compute it per row."""
+        return self.annotate(is_overdue=Case(
+            When(Q(due_date__lt=now or timezone.now()) & ~Q(status='completed'), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ))
 
 
 class Task(models.Model):
@@ -83,6 +150,14 @@ class Task(models.Model):
         ('in_progress', 'In Progress'),
         ('completed', 'Completed'),
     ]
+
+    # Recurrence rule (RRULE FREQ); empty for a one-off task
+    RECURRENCE_CHOICES = [
+        ('', 'Does not repeat'),
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+    ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tasks')  # Owner of the task
     title = models.CharField(max_length=200)  # Task title
@@ -93,28 +168,63 @@ class Task(models.Model):
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='pending')  # Task status
     created_at = models.DateTimeField(default=timezone.now)  # Task creation timestamp
     updated_at = models.DateTimeField(auto_now=True)  # Last update timestamp
+
+    # Recurring series: due_date is the first occurrence (DTSTART). Defaults
+    # keep these unchanged when a form that doesn't show them is submitted.
+    recurrence = models.CharField(max_length=10, choices=RECURRENCE_CHOICES, blank=True, default='')
+    recurrence_interval = models.PositiveSmallIntegerField(default=1)  # Every N days/weeks/months
+    recurrence_until = models.DateTimeField(null=True, blank=True, default=None)  # Last possible occurrence
+    recurrence_count = models.PositiveIntegerField(null=True, blank=True, default=None)  # Number of occurrences
+    # Set on an occurrence that was completed or edited and so stored as its own row
+    series = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='occurrences')
+    occurrence_date = models.DateTimeField(null=True, blank=True)  # The series date this row replaces
+
+    objects = TaskQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']  # Default ordering: newest first
         db_table = 'notes_task'  # Custom database table name
+        indexes = [
+            # overdue / due_today / upcoming: a user's active tasks by due date
+            models.Index(fields=['user', 'status', 'due_date'], name='task_user_status_due_idx'),
+            # Delta sync: a user's tasks changed since a cursor
+            models.Index(fields=['user', 'updated_at'], name='task_user_updated_idx'),
+            # Archival (notes/archive.py): completed tasks by last change
+            models.Index(fields=['updated_at'], condition=Q(status='completed'), name='task_completed_updated_idx'),
+        ]
+        constraints = [
+            # One stored row per occurrence of a series
+            models.UniqueConstraint(fields=['series', 'occurrence_date'], name='task_unique_occurrence'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.user.username}"  # Show task title and owner
     
     @property
     def is_overdue(self):
-        # Returns True if the task is past due and not completed
+        # Use the value annotated by TaskQuerySet.with_is_overdue() when present
+        if '_is_overdue' in self.__dict__:
+            return self._is_overdue
+        # Otherwise: True if the task is past due and not completed
         if self.due_date and self.status != 'completed':
             return timezone.now() > self.due_date
         return False
 
+    @is_overdue.setter
+    def is_overdue(self, value):
+        self._is_overdue = value
+
+    @property
+    def is_recurring(self):
+        return bool(self.recurrence)
+
 
 class Note(models.Model):
     """Note model for storing student notes"""
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notes')  # Owner of the note
     title = models.CharField(max_length=200)  # Note title
-    content = models.TextField()  # Main note content
+    content = CompressedTextField()  # Main note content; compressed when large (notes/fields.py)
     subject = models.CharField(max_length=100, blank=True)  # Optional subject/course
     tags = models.CharField(max_length=255, blank=True, help_text="Comma-separated tags")  # Optional tags
     created_at = models.DateTimeField(default=timezone.now)  # Note creation timestamp
@@ -123,6 +233,10 @@ class Note(models.Model):
     class Meta:
         ordering = ['-created_at']  # Default ordering: newest first
         db_table = 'notes_note'  # Custom database table name
+        indexes = [
+            # Delta sync: a user's notes changed since a cursor
+            models.Index(fields=['user', 'updated_at'], name='note_user_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.user.username}"  # Show note title and owner
@@ -141,6 +255,7 @@ class Reminder(models.Model):
     remind_time = models.DateTimeField()  # When the reminder should trigger
     is_sent = models.BooleanField(default=False)  # Whether the reminder has been sent
     created_at = models.DateTimeField(default=timezone.now)  # Creation timestamp
+    updated_at = models.DateTimeField(auto_now=True)  # Last change (calendar feed, notes/ical.py)
     
     class Meta:
         ordering = ['remind_time']  # Order reminders by upcoming time
@@ -173,6 +288,230 @@ class AdminRequest(models.Model):
     class Meta:
         ordering = ["-created_at"]
         db_table = "notes_admin_request"
+        indexes = [
+            # Review queue: pending requests, newest first (keyset paginated)
+            models.Index(fields=["status", "created_at"], name="adminreq_status_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"AdminRequest({self.requester.email}, {self.status})"
+
+
+class AccountDeletion(models.Model):
+    """
+    A scheduled account deletion. The user is deactivated right away; the
+    purge job (notes/account_deletion.py) then removes their rows in batches
+    and records progress here.
+    """
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    user = models.OneToOneField(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="deletion")
+    email = models.EmailField()  # Kept after the user row is gone
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    total_rows = models.PositiveIntegerField(default=0)  # Related rows counted when scheduled
+    deleted_rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        db_table = "notes_account_deletion"
+
+    def __str__(self):
+        return f"AccountDeletion({self.email}, {self.status})"
+
+    @property
+    def progress(self):
+        # Percentage of related rows purged so far
+        if self.status == "done":
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(100, int(self.deleted_rows * 100 / self.total_rows))
+
+
+class SyncTombstone(models.Model):
+    """
+    Marker left behind when a task, note or reminder is deleted, so the
+    delta-sync endpoint (notes/sync.py) can tell clients to drop it and the
+    calendar feed (notes/ical.py) sees the change. Pruned after
+    SYNC_TOMBSTONE_RETENTION_DAYS.
+    """
+    KIND_CHOICES = [
+        ("task", "Task"),
+        ("note", "Note"),
+        ("reminder", "Reminder"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "notes_sync_tombstone"
+        indexes = [
+            models.Index(fields=["user", "deleted_at"], name="tombstone_user_deleted_idx"),
+        ]
+
+    def __str__(self):
+        return f"SyncTombstone({self.kind} {self.object_id})"
+
+
+class NoteRevision(models.Model):
+    """
+    One saved version of a note (see notes/revisions.py). Every
+    NOTE_REVISION_SNAPSHOT_INTERVAL-th revision stores the full content; the
+    ones in between store a line delta against the revision before them.
+    """
+    note = models.ForeignKey(Note, on_delete=models.CASCADE, related_name="revisions")
+    number = models.PositiveIntegerField()  # 1, 2, 3, ... per note
+    title = models.CharField(max_length=200)
+    is_snapshot = models.BooleanField(default=False)
+    data = models.TextField()  # Full content (snapshot) or JSON delta
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["note", "number"]
+        db_table = "notes_note_revision"
+        constraints = [
+            models.UniqueConstraint(fields=["note", "number"], name="note_revision_unique_number"),
+        ]
+
+    def __str__(self):
+        return f"NoteRevision({self.note_id} #{self.number})"
+
+
+class SubjectFacet(models.Model):
+    """
+    How many of a user's tasks or notes use each subject, kept up to date on
+    save/delete (see notes/facets.py). Rows without a user hold the totals
+    across all users. Feeds subject pickers and admin filters without a
+    DISTINCT scan of the task/note tables.
+    """
+    KIND_CHOICES = [
+        ("task", "Task"),
+        ("note", "Note"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    subject = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["kind", "subject"]
+        db_table = "notes_subject_facet"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "kind", "subject"], condition=Q(user__isnull=False),
+                name="subject_facet_unique_user",
+            ),
+            models.UniqueConstraint(
+                fields=["kind", "subject"], condition=Q(user__isnull=True),
+                name="subject_facet_unique_global",
+            ),
+        ]
+
+    def __str__(self):
+        return f"SubjectFacet({self.kind} {self.subject!r}: {self.count})"
+
+
+class NoteVector(models.Model):
+    """
+    A note's term counts for related-note suggestions (see notes/related.py),
+    kept up to date on save. `terms` holds the hashed terms as uint32 and
+    `counts` their counts as uint16, both little-endian and in term order.
+    """
+    note = models.OneToOneField(Note, on_delete=models.CASCADE, primary_key=True, related_name="vector")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    terms = models.BinaryField()
+    counts = models.BinaryField()
+
+    class Meta:
+        db_table = "notes_note_vector"
+
+    def __str__(self):
+        return f"NoteVector({self.note_id}: {len(self.terms) // 4} terms)"
+
+
+class NoteFingerprint(models.Model):
+    """
+    A note's 64-bit SimHash for near-duplicate detection (see
+    notes/duplicates.py), kept up to date on save. `simhash` holds the
+    fingerprint as a signed 64-bit integer; `band0`-`band3` are its four
+    16-bit slices, low bits first, each indexed per user for candidate
+    lookups.
+    """
+    note = models.OneToOneField(Note, on_delete=models.CASCADE, primary_key=True, related_name="fingerprint")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    simhash = models.BigIntegerField()
+    band0 = models.PositiveIntegerField()
+    band1 = models.PositiveIntegerField()
+    band2 = models.PositiveIntegerField()
+    band3 = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = "notes_note_fingerprint"
+        indexes = [
+            models.Index(fields=["user", "band0"], name="note_fp_user_band0_idx"),
+            models.Index(fields=["user", "band1"], name="note_fp_user_band1_idx"),
+            models.Index(fields=["user", "band2"], name="note_fp_user_band2_idx"),
+            models.Index(fields=["user", "band3"], name="note_fp_user_band3_idx"),
+        ]
+
+    def __str__(self):
+        return f"NoteFingerprint({self.note_id}: {self.simhash & 0xFFFFFFFFFFFFFFFF:016x})"
+
+
+class RenderedNote(models.Model):
+    """
+    A note's content rendered from Markdown to sanitized HTML (see
+    notes/rendering.py), with the hash of the content it was rendered from.
+    A hash that no longer matches the note's content means it is re-rendered.
+    """
+    note = models.OneToOneField(Note, on_delete=models.CASCADE, primary_key=True, related_name="rendered")
+    content_hash = models.CharField(max_length=32)
+    html = CompressedTextField()
+
+    class Meta:
+        db_table = "notes_note_rendered"
+
+    def __str__(self):
+        return f"RenderedNote({self.note_id}: {self.content_hash})"
+
+
+class ArchivedTask(models.Model):
+    """
+    A task completed long ago, moved out of `notes_task` so the dashboard's
+    queries don't scan it (see notes/archive.py). Keeps the task's id;
+    `completed_at` is the task's last `updated_at`.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    subject = models.CharField(max_length=100, blank=True)
+    priority = models.CharField(max_length=10, choices=Task.PRIORITY_CHOICES, default="medium")
+    due_date = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    completed_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "notes_task_archive"
+        indexes = [
+            # Completed-task history: a user's tasks, most recently completed first
+            models.Index(fields=["user", "completed_at"], name="task_archive_user_done_idx"),
+        ]
 
     def __str__(self):
-        return f"AdminRequest({self.requester.email}, {self.status})"
\ No newline at end of file
+        return f"ArchivedTask({self.id}: {self.title})"
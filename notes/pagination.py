@@ -0,0 +1,123 @@
+"""
+Keyset ("seek") pagination, and estimated counts for the admin.
+
+OFFSET pagination makes the database walk and discard every row before the
+requested page. A keyset page instead continues from the last row shown:
+
+    WHERE (created_at, id) < (:last_created_at, :last_id)
+    ORDER BY created_at DESC, id DESC
+    LIMIT :page_size
+
+which an index on the ordering column answers directly, however deep the
+page. The position is passed between pages as an opaque ``cursor`` string.
+
+Admin changelists page with OFFSET, but their exact ``COUNT(*)`` is what
+gets slow on large Postgres tables. `EstimatedCountPaginator` uses the
+planner's row estimate instead once that is above ADMIN_ESTIMATED_COUNT_THRESHOLD.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+DEFAULT_PAGE_SIZE = 25
+DEFAULT_ESTIMATE_THRESHOLD = 10_000
+
+
+def encode_cursor(obj, field='created_at'):
+    raw = f"{getattr(obj, field).isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Return ``(datetime, pk)`` for a cursor, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        value, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(value), int(pk)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def keyset_page(queryset, cursor=None, field='created_at', page_size=DEFAULT_PAGE_SIZE):
+    """
+    Newest-first page of `queryset` after `cursor`.
+    Returns ``(rows, next_cursor)``; `next_cursor` is None on the last page.
+    """
+    queryset = queryset.order_by(f'-{field}', '-pk')
+    position = decode_cursor(cursor)
+    if position is not None:
+        value, pk = position
+        queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+
+    # One extra row tells us whether another page follows
+    rows = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(rows[page_size - 1], field) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
+
+
+# ---------------------------------------------------
+# Estimated counts (admin changelists)
+# ---------------------------------------------------
+
+def _table_estimate(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        row = cursor.fetchone()
+    # -1 until the table is first vacuumed/analyzed
+    return int(row[0]) if row and row[0] >= 0 else None
+
+
+def _plan_estimate(connection, queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimate_count(queryset):
+    """
+    Planner estimate of ``queryset.count()`` on PostgreSQL: the table's
+    ``pg_class.reltuples`` when unfiltered, else the EXPLAIN row estimate.
+    None on other databases.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    queryset = queryset.order_by()
+    if not queryset.query.where and not queryset.query.distinct:
+        estimate = _table_estimate(connection, queryset.model._meta.db_table)
+        if estimate is not None:
+            return estimate
+    return _plan_estimate(connection, queryset)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose `count` is the planner estimate for large querysets.
+
+    Exact below ADMIN_ESTIMATED_COUNT_THRESHOLD, and always on databases
+    without estimates (SQLite). `estimated` tells templates the count is
+    approximate; an estimate that runs long only leaves the last page short.
+    """
+    estimated = False
+
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, QuerySet):
+            threshold = getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', DEFAULT_ESTIMATE_THRESHOLD)
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and threshold and estimate >= threshold:
+                self.estimated = True
+                return estimate
+        return super().count
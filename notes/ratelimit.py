@@ -0,0 +1,103 @@
+"""
+Sliding-window rate limiting for the password-hashing endpoints.
+
+Login, registration, admin user creation and password changes all run a
+deliberately slow password hash. `check_rate_limit` is called before any of
+that work and rejects the request once a client IP or an account email has
+used up its budget for the scope.
+
+Counts live in the default cache (local memory unless CACHES points to a
+file or shared backend). Each key keeps a counter per fixed window and the
+estimate is weighted across the current and previous window, which gives a
+sliding window for two cache reads per key.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# scope -> {key type: (max requests, window in seconds)}
+DEFAULT_RATE_LIMITS = {
+    'login': {'ip': (20, 300), 'email': (5, 300)},
+    'register': {'ip': (5, 3600), 'email': (3, 3600)},
+    'add_user': {'ip': (30, 3600), 'email': (30, 3600)},
+    'password_change': {'ip': (10, 300), 'email': (5, 300)},
+}
+
+
+def get_client_ip(request):
+    """
+    Client address. Behind RATELIMIT_PROXY_COUNT trusted proxies it is the
+    X-Forwarded-For entry the outermost one added, counted from the right:
+    entries left of it come from the client and can be anything.
+    """
+    hops = getattr(settings, 'RATELIMIT_PROXY_COUNT', 0)
+    if hops:
+        forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+        if len(forwarded) >= hops and forwarded[-hops]:
+            return forwarded[-hops]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _limits(scope):
+    return getattr(settings, 'RATE_LIMITS', DEFAULT_RATE_LIMITS).get(scope, {})
+
+
+def _base_key(scope, kind, value):
+    digest = hashlib.sha1(value.strip().lower().encode('utf-8')).hexdigest()
+    return f'rl:{scope}:{kind}:{digest}'
+
+
+def _estimate(base, window, now):
+    """Sliding-window estimate of requests in the last `window` seconds."""
+    current = int(now // window)
+    counts = cache.get_many([f'{base}:{current}', f'{base}:{current - 1}'])
+    elapsed = (now % window) / window
+    return counts.get(f'{base}:{current - 1}', 0) * (1 - elapsed) + counts.get(f'{base}:{current}', 0)
+
+
+def _increment(base, window, now):
+    key = f'{base}:{int(now // window)}'
+    # The previous window is still read for one more period, hence 2 * window
+    cache.add(key, 0, timeout=2 * window)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(key, 1, timeout=2 * window)
+
+
+def _keys(request, scope, email):
+    idents = {'ip': get_client_ip(request), 'email': email or ''}
+    for kind, (limit, window) in _limits(scope).items():
+        if idents.get(kind):
+            yield _base_key(scope, kind, idents[kind]), limit, window
+
+
+def check_rate_limit(request, scope, email=None):
+    """
+    Record one attempt for `scope` and return True if it is allowed.
+    Rejected attempts are not counted, so a blocked client's window drains.
+    """
+    if not getattr(settings, 'RATELIMIT_ENABLED', True):
+        return True
+
+    now = time.time()
+    keys = list(_keys(request, scope, email))
+    for base, limit, window in keys:
+        if _estimate(base, window, now) >= limit:
+            return False
+    for base, limit, window in keys:
+        _increment(base, window, now)
+    return True
+
+
+def reset_rate_limit(request, scope, email=None):
+    """Forget the email's attempts for `scope` (e.g. after a successful login)."""
+    now = time.time()
+    for kind, (limit, window) in _limits(scope).items():
+        if kind == 'email' and email:
+            base = _base_key(scope, kind, email)
+            current = int(now // window)
+            cache.delete_many([f'{base}:{current}', f'{base}:{current - 1}'])
@@ -0,0 +1,204 @@
+"""
+Recurring tasks.
+
+A series is a `Task` with a recurrence rule (RRULE-style FREQ daily/weekly/
+monthly, INTERVAL, UNTIL, COUNT); its `due_date` is the first occurrence.
+Occurrences are never stored up front. `expand_occurrences` computes the
+ones falling inside the window a page displays, jumping straight to the
+first occurrence in the window, so the cost is O(occurrences shown) however
+long the series has been running.
+
+An occurrence only gets its own `Task` row (`series` + `occurrence_date`)
+when it is completed or edited (`materialize_occurrence`). Expansion skips
+occurrences that have a row, and those rows show up like any other task.
+
+Dates are stepped in local wall-clock time, so a 09:00 weekly task stays at
+09:00 across DST changes. Monthly rules on the 29th-31st fall on the last
+day of shorter months.
+"""
+import calendar
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Task
+
+
+def _local_naive(value):
+    return timezone.make_naive(value) if timezone.is_aware(value) else value
+
+
+def _add_months(start, months):
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return start.replace(year=year, month=month, day=day)
+
+
+def nth_occurrence(series, n):
+    """Date of the n-th (0-based) occurrence, ignoring COUNT/UNTIL."""
+    start = _local_naive(series.due_date)
+    step = series.recurrence_interval or 1
+    if series.recurrence == 'daily':
+        naive = start + timedelta(days=n * step)
+    elif series.recurrence == 'weekly':
+        naive = start + timedelta(weeks=n * step)
+    else:
+        naive = _add_months(start, n * step)
+    return timezone.make_aware(naive)
+
+
+def _first_index_at_or_after(series, moment):
+    """Index of the first occurrence >= moment, computed without iterating."""
+    start = _local_naive(series.due_date)
+    target = _local_naive(moment)
+    if target <= start:
+        return 0
+    step = series.recurrence_interval or 1
+    if series.recurrence in ('daily', 'weekly'):
+        period = timedelta(days=step if series.recurrence == 'daily' else 7 * step)
+        n = -(-(target - start) // period)  # ceiling division
+    else:
+        n = ((target.year - start.year) * 12 + target.month - start.month) // step
+    # Calendar arithmetic can land one occurrence early (DST, month ends)
+    while nth_occurrence(series, n) < moment:
+        n += 1
+    return n
+
+
+def _in_rule(series, n, value):
+    if series.recurrence_count is not None and n >= series.recurrence_count:
+        return False
+    return series.recurrence_until is None or value <= series.recurrence_until
+
+
+def occurrences_between(series, start, end):
+    """Yield ``(index, date)`` for the series' occurrences in [start, end)."""
+    n = _first_index_at_or_after(series, start)
+    while True:
+        value = nth_occurrence(series, n)
+        if value >= end or not _in_rule(series, n, value):
+            return
+        yield n, value
+        n += 1
+
+
+class Occurrence:
+    """
+    A not-yet-stored occurrence of a series. Quacks like a `Task` for the
+    templates (title, due_date, status, is_overdue, ...).
+    """
+    is_occurrence = True
+    status = 'pending'
+    id = pk = None
+
+    def __init__(self, series, due_date, now):
+        self.series = series
+        self.series_id = series.pk
+        self.due_date = due_date
+        self.is_overdue = due_date < now
+
+    def __getattr__(self, name):
+        # title, description, subject, priority, user_id, ...
+        return getattr(self.series, name)
+
+    def get_status_display(self):
+        return 'Pending'
+
+    @property
+    def timestamp(self):
+        # Identifies the occurrence in URLs
+        return int(self.due_date.timestamp())
+
+
+def _series_in_window(user, start, end):
+    # Series still running that have started before the window ends and not
+    # ended before it starts; a series marked completed has no more occurrences
+    return (
+        Task.objects.filter(user=user, due_date__lt=end).series().exclude(status='completed')
+        .filter(Q(recurrence_until__isnull=True) | Q(recurrence_until__gte=start))
+    )
+
+
+def expand_occurrences(user, start, end, now=None):
+    """
+    The user's unstored occurrences in [start, end), sorted by date.
+    Two queries: the series overlapping the window and the stored
+    occurrences inside it.
+    """
+    now = now or timezone.now()
+    series_list = list(_series_in_window(user, start, end))
+    if not series_list:
+        return []
+    stored = set(
+        Task.objects.filter(series__in=series_list, occurrence_date__gte=start, occurrence_date__lt=end)
+        .values_list('series_id', 'occurrence_date')
+    )
+    occurrences = [
+        Occurrence(series, value, now)
+        for series in series_list
+        for _, value in occurrences_between(series, start, end)
+        if (series.pk, value) not in stored
+    ]
+    occurrences.sort(key=lambda occurrence: occurrence.due_date)
+    return occurrences
+
+
+def dashboard_occurrences(user, now=None, horizon=timedelta(days=31)):
+    """
+    The home page's occurrences, from a single expansion starting today:
+    today's, those due in the next 24 hours, and each series' next one
+    (within `horizon`) for the task list.
+    """
+    now = now or timezone.now()
+    day_start = timezone.make_aware(datetime.combine(timezone.localdate(now), time.min))
+    day_end = day_start + timedelta(days=1)
+    occurrences = expand_occurrences(user, day_start, max(day_end, now + horizon), now)
+    upcoming_end = now + timedelta(hours=24)
+    first = {}
+    for occurrence in occurrences:
+        first.setdefault(occurrence.series.pk, occurrence)
+    return {
+        'today': [o for o in occurrences if o.due_date < day_end],
+        'upcoming': [o for o in occurrences if now <= o.due_date <= upcoming_end],
+        'next': list(first.values()),
+    }
+
+
+def materialize_occurrence(series, value, **changes):
+    """Store the occurrence of `series` at `value` as its own task (idempotent)."""
+    task, created = Task.objects.get_or_create(
+        series=series,
+        occurrence_date=value,
+        defaults={
+            'user_id': series.user_id,
+            'title': series.title,
+            'description': series.description,
+            'subject': series.subject,
+            'priority': series.priority,
+            'due_date': value,
+            **changes,
+        },
+    )
+    if not created and changes:
+        for field, change in changes.items():
+            setattr(task, field, change)
+        task.save()
+    return task
+
+
+def occurrence_from_timestamp(series, timestamp):
+    """The series' occurrence at a URL timestamp, or None if there is none."""
+    if not series.is_recurring:
+        return None
+    try:
+        value = datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        return None
+    # URL timestamps are whole seconds; due dates may carry microseconds
+    n = _first_index_at_or_after(series, value - timedelta(seconds=1))
+    candidate = nth_occurrence(series, n)
+    if int(candidate.timestamp()) != int(timestamp) or not _in_rule(series, n, candidate):
+        return None
+    return candidate
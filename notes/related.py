@@ -0,0 +1,200 @@
+"""
+Related notes: TF-IDF cosine similarity between one user's notes.
+
+Saving a note tokenizes its title, content and tags into hashed term counts
+and stores them in the note's `NoteVector` row (notes/signals.py), so note
+bodies are never re-read or re-tokenized to answer a query. The first query
+for a user loads all their vectors into a `NoteMatrix`: sublinear TF-IDF
+weights, L2-normalized per note, in NumPy arrays laid out both per note
+(CSR) and per term (CSC, an inverted index). A query walks only the postings
+of the note's own terms and sums the products per note with np.bincount.
+
+Matrices are kept per process for `RELATED_NOTES_MAX_USERS` users (see
+notes/local_cache.py) and rebuilt from the stored vectors after a note
+write, or after `RELATED_NOTES_TTL` seconds without a shared cache.
+
+Notes written without signals (bulk_create, raw SQL) get their vector when
+the matrix is next built. Content changed with QuerySet.update() keeps its
+old vector until the note is saved again or ``manage.py
+rebuild_note_vectors`` runs.
+"""
+import re
+import zlib
+
+from django.db import transaction
+
+from .local_cache import UserCache
+from .models import Note, NoteVector
+
+DEFAULT_TOP_K = 5
+MAX_TOP_K = 20
+DEFAULT_MAX_USERS = 100
+DEFAULT_TTL = 300
+# Below this cosine similarity notes are not considered related
+MIN_SIMILARITY = 0.05
+
+# Title and tag terms count this many times as much as body terms
+HEADING_WEIGHT = 2
+MAX_TERM_LENGTH = 40
+MAX_COUNT = 0xFFFF  # uint16
+
+_TERM = re.compile(r'[^\W_]{2,}')
+STOP_WORDS = frozenset("""
+    a about above after again all also am an and any are as at be because been before being below between both
+    but by can could did do does doing down during each few for from further had has have having he her here hers
+    him his how if in into is it its just me more most my no nor not now of off on once only or other our ours out
+    over own same she should so some such than that the their them then there these they this those through to
+    too under until up very was we were what when where which while who whom why will with would you your yours
+""".split())
+
+
+# ---------------------------------------------------
+# Vectors
+# ---------------------------------------------------
+
+def _terms(text):
+    for term in _TERM.findall(text.casefold()):
+        if term not in STOP_WORDS and len(term) <= MAX_TERM_LENGTH:
+            yield zlib.crc32(term.encode('utf-8'))
+
+
+def term_counts(title, content, tags):
+    """Sorted hashed terms (uint32) and their counts (uint16) for a note."""
+    import numpy as np  # off the cold-start path
+
+    counts = {}
+    for text, weight in ((title, HEADING_WEIGHT), (content, 1), (tags, HEADING_WEIGHT)):
+        for term in _terms(text or ''):
+            counts[term] = counts.get(term, 0) + weight
+    terms = np.fromiter(sorted(counts), dtype='<u4', count=len(counts))
+    return terms, np.fromiter((min(counts[t], MAX_COUNT) for t in terms.tolist()), dtype='<u2', count=len(counts))
+
+
+def _vector(note):
+    terms, counts = term_counts(note.title, note.content, note.tags)
+    return NoteVector(note_id=note.pk, user_id=note.user_id, terms=terms.tobytes(), counts=counts.tobytes())
+
+
+def store_vector(note):
+    """Write `note`'s current term counts."""
+    vector = _vector(note)
+    NoteVector.objects.update_or_create(
+        note_id=note.pk, defaults={'user_id': vector.user_id, 'terms': vector.terms, 'counts': vector.counts},
+    )
+
+
+def rebuild_note_vectors(batch_size=500):
+    """Recompute every note's vector. Returns the number written."""
+    notes = Note.objects.only('id', 'user_id', 'title', 'content', 'tags').order_by('pk')
+    written, user_ids = 0, set()
+    with transaction.atomic():
+        NoteVector.objects.all().delete()
+        batch = []
+        for note in notes.iterator(chunk_size=batch_size):
+            batch.append(_vector(note))
+            user_ids.add(note.user_id)
+            if len(batch) >= batch_size:
+                written += len(NoteVector.objects.bulk_create(batch))
+                batch = []
+        written += len(NoteVector.objects.bulk_create(batch))
+    for user_id in user_ids:
+        invalidate(user_id)
+    return written
+
+
+# ---------------------------------------------------
+# Similarity
+# ---------------------------------------------------
+
+class NoteMatrix:
+    """One user's TF-IDF note vectors."""
+
+    def __init__(self, rows):
+        """`rows`: ``(note_id, terms, counts)`` with the packed arrays of `NoteVector`."""
+        import numpy as np
+
+        terms = [np.frombuffer(row[1], dtype='<u4') for row in rows]
+        counts = [np.frombuffer(row[2], dtype='<u2') for row in rows]
+        lengths = np.array([len(t) for t in terms], dtype=np.int64)
+        self.note_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.indptr[1:])
+
+        hashes = np.concatenate(terms) if terms else np.empty(0, dtype='<u4')
+        tf = np.concatenate(counts).astype(np.float32) if counts else np.empty(0, dtype=np.float32)
+        vocabulary, cols = np.unique(hashes, return_inverse=True)
+        self.cols = cols.astype(np.int32)
+        row_of = np.repeat(np.arange(len(rows), dtype=np.int32), lengths)
+
+        df = np.bincount(self.cols, minlength=len(vocabulary))
+        idf = (np.log((1 + len(rows)) / (1 + df)) + 1).astype(np.float32)
+        weights = (1 + np.log(tf)) * idf[self.cols]
+        norms = np.sqrt(np.bincount(row_of, weights=weights * weights, minlength=len(rows)))
+        self.weights = (weights / norms[row_of]).astype(np.float32)
+
+        order = np.argsort(self.cols, kind='stable')
+        self.posting_rows = row_of[order]
+        self.posting_weights = self.weights[order]
+        self.col_ptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(df, out=self.col_ptr[1:])
+
+    def __len__(self):
+        return len(self.note_ids)
+
+    def _row(self, note_id):
+        row = int(self.note_ids.searchsorted(note_id))
+        if row < len(self.note_ids) and self.note_ids[row] == note_id:
+            return row
+        return None
+
+    def similar(self, note_id, k=DEFAULT_TOP_K):
+        """``(note_id, score)`` for the `k` notes most similar to `note_id`, best first."""
+        import numpy as np
+
+        row = self._row(note_id)
+        if row is None:
+            return []
+        start, end = self.indptr[row], self.indptr[row + 1]
+        query_cols, query_weights = self.cols[start:end], self.weights[start:end]
+
+        # Positions of every posting of the query's terms, without a Python loop
+        starts, lengths = self.col_ptr[query_cols], np.diff(self.col_ptr)[query_cols]
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        postings = np.arange(lengths.sum()) + offsets
+        scores = np.bincount(
+            self.posting_rows[postings],
+            weights=self.posting_weights[postings] * np.repeat(query_weights, lengths),
+            minlength=len(self),
+        )
+        scores[row] = 0
+
+        candidates = np.flatnonzero(scores >= MIN_SIMILARITY)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(int(self.note_ids[i]), float(scores[i])) for i in candidates]
+
+
+def build_matrix(user_id):
+    """The user's `NoteMatrix`, vectorizing any notes that have no vector yet."""
+    missing = Note.objects.filter(user_id=user_id, vector__isnull=True).only('id', 'user_id', 'title', 'content', 'tags')
+    NoteVector.objects.bulk_create((_vector(note) for note in missing), ignore_conflicts=True)
+    rows = NoteVector.objects.filter(user_id=user_id).order_by('note_id').values_list('note_id', 'terms', 'counts')
+    return NoteMatrix(list(rows))
+
+
+_matrices = UserCache(
+    'related_notes', build_matrix,
+    'RELATED_NOTES_MAX_USERS', DEFAULT_MAX_USERS, 'RELATED_NOTES_TTL', DEFAULT_TTL,
+)
+get_matrix = _matrices.get
+invalidate = _matrices.invalidate
+
+
+def related_notes(note, k=DEFAULT_TOP_K):
+    """``(Note, score)`` pairs for the `k` of the owner's notes most like `note`."""
+    scored = get_matrix(note.user_id).similar(note.pk, k)
+    if not scored:
+        return []
+    notes = Note.objects.only('id', 'title', 'subject', 'updated_at').in_bulk([note_id for note_id, _ in scored])
+    return [(notes[note_id], score) for note_id, score in scored if note_id in notes]
@@ -0,0 +1,122 @@
+"""
+Markdown rendering of note content.
+
+Note bodies are written in Markdown (CommonMark plus tables and
+strikethrough). Single line breaks are kept, so notes written as plain text
+look as they did before. Raw HTML in a note is shown as text, and the output
+is passed through an allowlist sanitizer (nh3), so a note can't inject
+scripts, styles or event handlers into the page.
+
+Rendering costs time proportional to the note's size, so the HTML is stored
+in `RenderedNote` together with a hash of the content it came from. Saving a
+note re-renders it only when the content changed (notes/signals.py), and
+pages check the hash when they show a note: content changed without
+signals (QuerySet.update) is re-rendered on first view, everything else is
+served from the stored HTML. Load notes with ``select_related('rendered')``
+to fetch it in the same query, and pass a page's notes through
+`render_stale` first so missing renderings are written in one statement.
+"""
+import functools
+import hashlib
+
+from django.db import connections, router, transaction
+from django.utils.safestring import mark_safe
+
+from .models import RenderedNote
+
+# Bump when the output for the same content changes (parser options,
+# allowlist); every note is then re-rendered on its next view.
+RENDERER_VERSION = 1
+
+ALLOWED_TAGS = {
+    'a', 'p', 'br', 'hr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'strong', 'em', 's', 'del', 'code', 'pre',
+    'blockquote', 'ul', 'ol', 'li', 'table', 'thead', 'tbody', 'tr', 'th', 'td', 'img',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title'},
+    'img': {'src', 'alt', 'title'},
+    'ol': {'start'},
+    'th': {'style'},
+    'td': {'style'},
+}
+# Table column alignment is the only inline style markdown-it emits
+ALLOWED_STYLES = {'text-align'}
+URL_SCHEMES = {'http', 'https', 'mailto'}
+
+
+@functools.cache
+def _markdown():
+    # Imported on first use, off the cold-start path
+    from markdown_it import MarkdownIt
+    return MarkdownIt('commonmark', {'html': False, 'breaks': True}).enable(['table', 'strikethrough'])
+
+
+def render_markdown(text):
+    """Sanitized HTML for Markdown `text`."""
+    import nh3
+    return nh3.clean(
+        _markdown().render(text or ''),
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        filter_style_properties=ALLOWED_STYLES,
+        url_schemes=URL_SCHEMES,
+        link_rel='noopener noreferrer nofollow',
+    )
+
+
+def content_hash(text):
+    digest = hashlib.blake2b(f'{RENDERER_VERSION}\0{text or ""}'.encode('utf-8'), digest_size=16)
+    return digest.hexdigest()
+
+
+def _render(note, digest):
+    note.rendered, _ = RenderedNote.objects.update_or_create(
+        note_id=note.pk, defaults={'content_hash': digest, 'html': render_markdown(note.content)},
+    )
+    return note.rendered
+
+
+def store_rendering(note):
+    """Render `note` unless its stored HTML already matches its content."""
+    digest = content_hash(note.content)
+    current = RenderedNote.objects.filter(note_id=note.pk).values_list('content_hash', flat=True).first()
+    if current != digest:
+        _render(note, digest)
+
+
+def render_stale(notes):
+    """Render and store, in one batch, the `notes` whose rendering is missing or stale."""
+    stale = []
+    for note in notes:
+        digest = content_hash(note.content)
+        try:
+            fresh = note.rendered.content_hash == digest
+        except RenderedNote.DoesNotExist:
+            fresh = False
+        if not fresh:
+            note.rendered = RenderedNote(note_id=note.pk, content_hash=digest, html=render_markdown(note.content))
+            stale.append(note.rendered)
+    if not stale:
+        return
+    if connections[router.db_for_write(RenderedNote)].features.supports_update_conflicts_with_target:
+        RenderedNote.objects.bulk_create(
+            stale, batch_size=500, update_conflicts=True,
+            unique_fields=['note'], update_fields=['content_hash', 'html'],
+        )
+        return
+    # MySQL: no upsert on a named unique field; replace the rows instead
+    with transaction.atomic():
+        RenderedNote.objects.filter(note_id__in=[rendered.note_id for rendered in stale]).delete()
+        RenderedNote.objects.bulk_create(stale, batch_size=500, ignore_conflicts=True)
+
+
+def rendered_html(note):
+    """`note`'s content as safe HTML, rendering and storing it if stale."""
+    digest = content_hash(note.content)
+    try:
+        rendered = note.rendered
+    except RenderedNote.DoesNotExist:
+        rendered = None
+    if rendered is None or rendered.content_hash != digest:
+        rendered = _render(note, digest)
+    return mark_safe(rendered.html)
@@ -0,0 +1,193 @@
+"""
+Note revision history, stored compactly.
+
+Each save of a note records a `NoteRevision` (`record_revision`). The first
+revision, and every NOTE_REVISION_SNAPSHOT_INTERVAL-th one after the last
+snapshot, stores the full content. The others store a line delta against the
+revision before them: a JSON list whose items are either ``[start, end]``
+(copy those lines of the previous revision) or a string (insert this text).
+An edit to a long note costs about the size of the changed lines.
+
+`revision_content` rebuilds any revision from the nearest snapshot at or
+before it: two queries and at most SNAPSHOT_INTERVAL deltas to apply,
+however long the history is.
+
+Retention (`compact_revisions`, run by the cron endpoint and
+``manage.py compact_note_revisions``): a note keeps at most
+NOTE_REVISION_MAX_PER_NOTE revisions, and revisions older than
+NOTE_REVISION_MAX_AGE_DAYS are dropped except the latest. The oldest revision
+kept is rewritten as a snapshot so the remaining deltas still apply.
+"""
+import json
+from datetime import timedelta
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from .models import Note, NoteRevision
+
+DEFAULT_SNAPSHOT_INTERVAL = 20
+DEFAULT_MAX_PER_NOTE = 200
+DEFAULT_MAX_AGE_DAYS = 365
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ---------------------------------------------------
+# Deltas
+# ---------------------------------------------------
+
+def make_delta(old, new):
+    """Line delta turning `old` into `new`, as compact JSON."""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops = []
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:  # 'replace' or 'insert'; 'delete' just skips old lines
+            ops.append(''.join(new_lines[j1:j2]))
+    return json.dumps(ops, separators=(',', ':'))
+
+
+def apply_delta(old, delta):
+    old_lines = old.splitlines(keepends=True)
+    return ''.join(
+        ''.join(old_lines[op[0]:op[1]]) if isinstance(op, list) else op
+        for op in json.loads(delta)
+    )
+
+
+def _rebuild(chain):
+    # chain: a snapshot followed by the deltas up to the wanted revision
+    content = None
+    for revision in chain:
+        content = revision.data if revision.is_snapshot else apply_delta(content, revision.data)
+    return content
+
+
+def _chain(note_id, number=None):
+    """Revisions needed to rebuild `number` (default: the latest), oldest first."""
+    snapshots = NoteRevision.objects.filter(note_id=note_id, is_snapshot=True)
+    if number is not None:
+        snapshots = snapshots.filter(number__lte=number)
+    start = snapshots.aggregate(start=Max('number'))['start']
+    if start is None:
+        return []
+    revisions = NoteRevision.objects.filter(note_id=note_id, number__gte=start)
+    if number is not None:
+        revisions = revisions.filter(number__lte=number)
+    return list(revisions.order_by('number'))
+
+
+def revision_content(note_id, number):
+    """Content of revision `number` of a note, or None if it isn't kept."""
+    chain = _chain(note_id, number)
+    if not chain or chain[-1].number != number:
+        return None
+    return _rebuild(chain)
+
+
+# ---------------------------------------------------
+# Recording
+# ---------------------------------------------------
+
+def _snapshot_interval():
+    return max(1, _setting('NOTE_REVISION_SNAPSHOT_INTERVAL', DEFAULT_SNAPSHOT_INTERVAL))
+
+
+def record_revision(note, previous=None):
+    """
+    Record `note`'s current title and content as its next revision. Returns
+    the revision, or None if nothing changed since the last one.
+
+    `previous` is the note's ``(title, content, updated_at)`` before this
+    save; it becomes revision 1 when a note created before revisions existed
+    is edited for the first time.
+    """
+    with transaction.atomic():
+        # Serializes concurrent saves of the same note (revision numbers are unique)
+        Note.objects.select_for_update().filter(pk=note.pk).exists()
+        chain = _chain(note.pk)
+        if not chain and previous is not None and previous[:2] != (note.title, note.content):
+            chain = [NoteRevision.objects.create(
+                note=note, number=1, title=previous[0], is_snapshot=True, data=previous[1], created_at=previous[2],
+            )]
+        if not chain:
+            return NoteRevision.objects.create(note=note, number=1, title=note.title, is_snapshot=True, data=note.content)
+
+        last_content = _rebuild(chain)
+        last = chain[-1]
+        if last.title == note.title and last_content == note.content:
+            return None
+
+        number = last.number + 1
+        if number - chain[0].number >= _snapshot_interval():
+            is_snapshot, data = True, note.content
+        else:
+            delta = make_delta(last_content, note.content)
+            # A rewrite of most of the note is cheaper stored whole
+            is_snapshot, data = (True, note.content) if len(delta) >= len(note.content) else (False, delta)
+        return NoteRevision.objects.create(
+            note=note, number=number, title=note.title, is_snapshot=is_snapshot, data=data,
+        )
+
+
+# ---------------------------------------------------
+# Retention
+# ---------------------------------------------------
+
+def _compact_note(note_id, keep_from):
+    """Drop a note's revisions before `keep_from`, making `keep_from` a snapshot."""
+    with transaction.atomic():
+        first = NoteRevision.objects.select_for_update().filter(note_id=note_id, number=keep_from).first()
+        if first is None:
+            return 0
+        if not first.is_snapshot:
+            first.data = _rebuild(_chain(note_id, keep_from))
+            first.is_snapshot = True
+            first.save(update_fields=['data', 'is_snapshot'])
+        deleted, _ = NoteRevision.objects.filter(note_id=note_id, number__lt=keep_from).delete()
+    return deleted
+
+
+def compact_revisions(now=None, limit=500):
+    """
+    Apply the retention policy to up to `limit` notes that exceed it.
+    Returns the number of revisions removed.
+    """
+    max_per_note = _setting('NOTE_REVISION_MAX_PER_NOTE', DEFAULT_MAX_PER_NOTE)
+    max_age_days = _setting('NOTE_REVISION_MAX_AGE_DAYS', DEFAULT_MAX_AGE_DAYS)
+    if not max_per_note and not max_age_days:
+        return 0
+    cutoff = (now or timezone.now()) - timedelta(days=max_age_days) if max_age_days else None
+
+    over = Q()
+    if max_per_note:
+        over |= Q(count__gt=max_per_note)
+    if cutoff is not None:
+        over |= Q(oldest__lt=cutoff, count__gt=1)
+    candidates = (
+        NoteRevision.objects.values('note_id')
+        .annotate(count=Count('id'), oldest=Min('created_at'), latest=Max('number'))
+        .filter(over)
+        .order_by('note_id')[:limit]
+    )
+
+    removed = 0
+    for row in candidates:
+        keep_from = row['latest'] - max_per_note + 1 if max_per_note else 1
+        if cutoff is not None:
+            recent = (
+                NoteRevision.objects.filter(note_id=row['note_id'], created_at__gte=cutoff)
+                .aggregate(first=Min('number'))['first']
+            )
+            keep_from = max(keep_from, recent or row['latest'])
+        removed += _compact_note(row['note_id'], keep_from)
+    return removed
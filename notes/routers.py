@@ -0,0 +1,173 @@
+"""
+Read-replica routing.
+
+When a `replica` database is configured (DATABASE_REPLICA_URL), reads made
+while serving GET/HEAD/OPTIONS requests, and inside code marked with
+`read_only` / `replica_reads`, go to the replica. Writes, and reads anywhere
+else, use `default`.
+
+Replication lags, so reads follow the user's own writes:
+
+- once a request writes, the rest of it reads from the primary;
+- the response to that request sets a cookie that keeps the browser's
+  requests on the primary for REPLICA_STICKY_SECONDS, so the page a user is
+  redirected to after adding a note or ticking off a task shows the change.
+
+Without a replica the middleware is skipped and every query uses `default`.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.decorators import sync_and_async_middleware
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+STICKY_COOKIE = 'db_primary_until'
+DEFAULT_STICKY_SECONDS = 15
+READ_ONLY_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+
+
+class RoutingState:
+    """Where the current request (or `replica_reads` block) reads from."""
+    __slots__ = ('replica', 'pinned', 'wrote')
+
+    def __init__(self, replica=False, pinned=False):
+        self.replica = replica
+        self.pinned = pinned  # recent write by this browser (sticky cookie)
+        self.wrote = False
+
+    @property
+    def reads_replica(self):
+        return self.replica and not self.pinned and not self.wrote
+
+
+# Holds a mutable state object, so writes made in a sync_to_async thread
+# are seen by the request that started it
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+class ReplicaRouter:
+    """DATABASE_ROUTERS entry: reads per the routing state, writes to the primary."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is not None and state.reads_replica and replica_configured():
+            return REPLICA
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both aliases
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+# ---------------------------------------------------
+# Marking code paths
+# ---------------------------------------------------
+
+@contextmanager
+def replica_reads():
+    """
+    Read from the replica inside this block, in or outside a request.
+    Still reads from the primary after a write by this request or browser.
+    """
+    state = _state.get()
+    if state is None:
+        token = _state.set(RoutingState(replica=True))
+        try:
+            yield
+        finally:
+            _state.reset(token)
+        return
+    previous, state.replica = state.replica, True
+    try:
+        yield
+    finally:
+        state.replica = previous
+
+
+def read_only(func):
+    """Mark a (sync or async) view or function as safe to serve from the replica."""
+    if iscoroutinefunction(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with replica_reads():
+                return await func(*args, **kwargs)
+    else:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with replica_reads():
+                return func(*args, **kwargs)
+    return wrapper
+
+
+# ---------------------------------------------------
+# Middleware
+# ---------------------------------------------------
+
+def _pinned(request):
+    try:
+        return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _start(request):
+    state = RoutingState(replica=request.method in READ_ONLY_METHODS, pinned=_pinned(request))
+    return state, _state.set(state)
+
+
+def _finish(response, state):
+    if state.wrote:
+        seconds = sticky_seconds()
+        response.set_cookie(
+            STICKY_COOKIE, str(int(time.time()) + seconds), max_age=seconds,
+            httponly=True, samesite='Lax', secure=settings.SESSION_COOKIE_SECURE,
+        )
+    return response
+
+
+@sync_and_async_middleware
+def replica_routing_middleware(get_response):
+    """Sets the routing state for each request; must come before SessionMiddleware."""
+    if not replica_configured():
+        raise MiddlewareNotUsed
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            state, token = _start(request)
+            try:
+                response = await get_response(request)
+            finally:
+                _state.reset(token)
+            return _finish(response, state)
+    else:
+        def middleware(request):
+            state, token = _start(request)
+            try:
+                response = get_response(request)
+            finally:
+                _state.reset(token)
+            return _finish(response, state)
+    return middleware
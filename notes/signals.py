@@ -0,0 +1,149 @@
+"""
+Model signal handlers, connected in NotesConfig.ready().
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete, duplicates, events, facets, related, rendering
+from .models import Note, Reminder, Task, User
+from .sync import record_deletion
+
+
+def _deleting_user(origin):
+    # Rows removed as part of deleting their owner need no tombstone
+    # (and one would point at the user row being deleted)
+    model = getattr(origin, 'model', type(origin))
+    return model is User
+
+
+def _publish_task_event(user_id, data):
+    # After commit, so a client that re-syncs on the event sees the change
+    transaction.on_commit(lambda: events.publish(user_id, 'task', data))
+
+
+@receiver(post_save, sender=Task, dispatch_uid='notes_task_event')
+def task_saved(sender, instance, created, **kwargs):
+    _publish_task_event(instance.user_id, {
+        'id': instance.pk,
+        'title': instance.title,
+        'status': instance.status,
+        'created': created,
+    })
+
+
+@receiver(post_delete, sender=Task, dispatch_uid='notes_task_tombstone')
+def task_deleted(sender, instance, origin=None, **kwargs):
+    if not _deleting_user(origin):
+        record_deletion(instance, 'task')
+        _publish_task_event(instance.user_id, {'id': instance.pk, 'deleted': True})
+
+
+@receiver(post_delete, sender=Note, dispatch_uid='notes_note_tombstone')
+def note_deleted(sender, instance, origin=None, **kwargs):
+    if not _deleting_user(origin):
+        record_deletion(instance, 'note')
+
+
+# Subject facets (notes/facets.py)
+
+def _facet_key(instance):
+    return (instance.user_id, instance.subject)
+
+
+@receiver(pre_save, sender=Task, dispatch_uid='notes_task_facet_before')
+@receiver(pre_save, sender=Note, dispatch_uid='notes_note_facet_before')
+def subject_before_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'subject', 'user', 'user_id'} & set(update_fields):
+        instance._facet_before = False  # subject untouched
+    elif instance._state.adding or instance.pk is None:
+        instance._facet_before = None
+    else:
+        instance._facet_before = sender.objects.filter(pk=instance.pk).values_list('user_id', 'subject').first()
+
+
+@receiver(post_save, sender=Task, dispatch_uid='notes_task_facet_after')
+@receiver(post_save, sender=Note, dispatch_uid='notes_note_facet_after')
+def subject_after_save(sender, instance, **kwargs):
+    before = instance.__dict__.pop('_facet_before', None)
+    if before is not False:
+        facets.move(facets.kind_of(sender), before, _facet_key(instance))
+
+
+@receiver(pre_delete, sender=Task, dispatch_uid='notes_task_facet_before_delete')
+@receiver(pre_delete, sender=Note, dispatch_uid='notes_note_facet_before_delete')
+def subject_before_delete(sender, instance, **kwargs):
+    # While the row still exists, in case `subject` was deferred
+    instance._facet_before = _facet_key(instance)
+
+
+@receiver(post_delete, sender=Task, dispatch_uid='notes_task_facet_delete')
+@receiver(post_delete, sender=Note, dispatch_uid='notes_note_facet_delete')
+def subject_deleted(sender, instance, **kwargs):
+    before = instance.__dict__.pop('_facet_before', None) or _facet_key(instance)
+    facets.move(facets.kind_of(sender), before, None)
+
+
+# Subject/tag suggestions (notes/autocomplete.py)
+
+@receiver(post_save, sender=Task, dispatch_uid='notes_task_autocomplete')
+@receiver(post_save, sender=Note, dispatch_uid='notes_note_autocomplete')
+def suggestions_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'subject', 'tags', 'user', 'user_id'} & set(update_fields):
+        return
+    user_id = instance.user_id
+    transaction.on_commit(lambda: autocomplete.invalidate(user_id))
+
+
+@receiver(post_delete, sender=Task, dispatch_uid='notes_task_autocomplete_delete')
+@receiver(post_delete, sender=Note, dispatch_uid='notes_note_autocomplete_delete')
+def suggestions_deleted(sender, instance, origin=None, **kwargs):
+    if not _deleting_user(origin):
+        user_id = instance.user_id
+        transaction.on_commit(lambda: autocomplete.invalidate(user_id))
+
+
+# Related notes (notes/related.py)
+
+@receiver(post_save, sender=Note, dispatch_uid='notes_note_vector')
+def note_vector_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'title', 'content', 'tags', 'user', 'user_id'} & set(update_fields):
+        return
+    related.store_vector(instance)
+    user_id = instance.user_id
+    transaction.on_commit(lambda: related.invalidate(user_id))
+
+
+@receiver(post_delete, sender=Note, dispatch_uid='notes_note_vector_delete')
+def note_vector_deleted(sender, instance, origin=None, **kwargs):
+    if not _deleting_user(origin):
+        user_id = instance.user_id
+        transaction.on_commit(lambda: related.invalidate(user_id))
+
+
+# Near-duplicate detection (notes/duplicates.py)
+
+@receiver(post_save, sender=Note, dispatch_uid='notes_note_fingerprint')
+def note_fingerprint_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'title', 'content', 'user', 'user_id'} & set(update_fields):
+        return
+    duplicates.store_fingerprint(instance)
+
+
+# Markdown rendering (notes/rendering.py)
+
+@receiver(post_save, sender=Note, dispatch_uid='notes_note_rendering')
+def note_rendering_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'content' in update_fields:
+        rendering.store_rendering(instance)
+
+
+# Calendar feed (notes/ical.py): a deleted reminder changes the feed too
+
+@receiver(post_delete, sender=Reminder, dispatch_uid='notes_reminder_tombstone')
+def reminder_deleted(sender, instance, origin=None, **kwargs):
+    # Reminders deleted along with their task (or its owner) are covered by its tombstone
+    if origin is None or getattr(origin, 'model', type(origin)) is Reminder:
+        user_id = Task.objects.filter(pk=instance.task_id).values_list('user_id', flat=True).first()
+        if user_id is not None:
+            record_deletion(instance, 'reminder', user_id)
@@ -0,0 +1,154 @@
+"""
+Incremental ("changes since") sync for the dashboard.
+
+The home page is rendered with a sync cursor. The browser polls
+`sync_changes` with that cursor and gets back only the tasks and notes
+created or updated since then (by `updated_at`) plus the ids of the ones
+deleted since then (from `SyncTombstone`), along with a new cursor.
+
+Cursors are server timestamps. `updated_at` is set when a row is saved,
+which can be slightly before its transaction commits, so each query reaches
+back SYNC_OVERLAP before the cursor (more when polls read from a lagging
+replica, see notes/routers.py); clients apply changes idempotently, so
+seeing a row twice is harmless.
+
+Tombstones are kept for SYNC_TOMBSTONE_RETENTION_DAYS. A client whose
+cursor is older than that is told to reload the page instead.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from . import routers
+from .archive import archived_count
+from .models import Note, SyncTombstone, Task, TaskQuerySet
+
+SYNC_OVERLAP = timedelta(seconds=5)
+DEFAULT_TOMBSTONE_RETENTION_DAYS = 30
+
+
+def _retention():
+    return timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', DEFAULT_TOMBSTONE_RETENTION_DAYS))
+
+
+def _overlap():
+    # Polls may read from a replica lagging up to REPLICA_STICKY_SECONDS behind
+    if routers.replica_configured():
+        return SYNC_OVERLAP + timedelta(seconds=routers.sticky_seconds())
+    return SYNC_OVERLAP
+
+
+def encode_cursor(now):
+    return now.isoformat()
+
+
+def page_context(now):
+    """Template context the dashboard needs to start polling."""
+    return {
+        'sync_cursor': encode_cursor(now),
+        'sync_poll_seconds': getattr(settings, 'SYNC_POLL_SECONDS', 30),
+        'events_url': getattr(settings, 'EVENTS_URL', ''),
+    }
+
+
+def decode_cursor(cursor):
+    """Return the cursor's aware datetime, or None if it is malformed."""
+    try:
+        value = datetime.fromisoformat(cursor)
+    except (TypeError, ValueError):
+        return None
+    return value if timezone.is_aware(value) else None
+
+
+def serialize_task(task):
+    return {
+        'id': task.id,
+        'title': task.title,
+        'description': task.description,
+        'subject': task.subject,
+        'priority': task.priority,
+        'status': task.status,
+        'status_display': task.get_status_display(),
+        'due_date': task.due_date.isoformat() if task.due_date else None,
+        'is_overdue': task.is_overdue,
+        # A stored occurrence replaces the series' occurrence at that date on the page
+        'series_id': task.series_id,
+        'occurrence': int(task.occurrence_date.timestamp()) if task.occurrence_date else None,
+        'updated_at': task.updated_at.isoformat(),
+        'toggle_url': reverse('notes:toggle_task_status', args=[task.id]),
+        'delete_url': reverse('notes:delete_task', args=[task.id]),
+    }
+
+
+def serialize_note(note):
+    # Same shape as the add_note AJAX response, which the dashboard already renders
+    return {
+        'id': note.id,
+        'title': note.title,
+        'content': note.content,
+        'subject': note.subject or '',
+        'tags': note.tags or '',
+        'created_at': note.created_at.strftime('%b %d, %Y'),
+        'updated_at': note.updated_at.isoformat(),
+        'edit_url': reverse('notes:edit_note', args=[note.id]),
+        'delete_url': reverse('notes:delete_note', args=[note.id]),
+    }
+
+
+def dashboard_stats(user, now):
+    """The dashboard's stat cards, in one query per table."""
+    task_stats = Task.objects.filter(user=user).aggregate(
+        completed_tasks=Count('id', filter=Q(status='completed')),
+        pending_tasks=Count('id', filter=Q(status='pending')),
+        overdue_tasks=Count('id', filter=Q(status__in=TaskQuerySet.ACTIVE_STATUSES, due_date__lt=now)),
+    )
+    # Archived tasks (notes/archive.py) still count as completed
+    task_stats['completed_tasks'] += archived_count(user)
+    return {**task_stats, 'total_notes': Note.objects.filter(user=user).count()}
+
+
+def changes_since(user, since, now=None):
+    """
+    Everything that changed for `user` after `since` (an aware datetime).
+    Returns the response payload, including the cursor for the next call.
+    """
+    now = now or timezone.now()
+    if since < now - _retention():
+        # Tombstones for that period may already be pruned
+        return {'reset': True, 'cursor': encode_cursor(now)}
+
+    window_start = since - _overlap()
+    tasks = list(
+        Task.objects.filter(user=user, recurrence='', updated_at__gte=window_start)
+        .with_is_overdue(now).order_by('updated_at')
+    )
+    notes = list(Note.objects.filter(user=user, updated_at__gte=window_start).order_by('updated_at'))
+    deleted = {'task': [], 'note': []}
+    tombstones = (SyncTombstone.objects.filter(user=user, kind__in=deleted, deleted_at__gte=window_start)
+                  .values_list('kind', 'object_id'))
+    for kind, object_id in tombstones:
+        deleted[kind].append(object_id)
+
+    changed = bool(tasks or notes or deleted['task'] or deleted['note'])
+    return {
+        'reset': False,
+        'cursor': encode_cursor(now),
+        'tasks': {'updated': [serialize_task(t) for t in tasks], 'deleted': deleted['task']},
+        'notes': {'updated': [serialize_note(n) for n in notes], 'deleted': deleted['note']},
+        # Counts only cost queries when something actually changed
+        'stats': dashboard_stats(user, now) if changed else None,
+    }
+
+
+def record_deletion(instance, kind, user_id=None):
+    SyncTombstone.objects.create(user_id=user_id or instance.user_id, kind=kind, object_id=instance.pk)
+
+
+def prune_tombstones(now=None):
+    """Delete tombstones past the retention period. Returns the number removed."""
+    cutoff = (now or timezone.now()) - _retention()
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,15 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def avatar_url(user, size=64):
+    """
+    Thumbnail URL for a user's avatar, e.g. ``{{ user|avatar_url:80 }}``.
+    Pass the rendered size in pixels times two so high-DPI screens stay sharp.
+    """
+    try:
+        return user.profile_pic_thumb_url(int(size))
+    except (AttributeError, TypeError, ValueError):
+        return ''
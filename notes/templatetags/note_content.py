@@ -0,0 +1,15 @@
+from django import template
+
+from notes.rendering import rendered_html
+
+register = template.Library()
+
+
+@register.filter
+def note_html(note):
+    """
+    A note's content rendered from Markdown, e.g. ``{{ note|note_html }}``.
+    Served from the stored rendering while the content is unchanged (see
+    notes/rendering.py).
+    """
+    return rendered_html(note)
@@ -0,0 +1,42 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.template.loader import render_to_string
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+TAILWIND_CSS = 'notes/css/tailwind.css'
+
+
+def _tag(path):
+    if path.endswith('.css'):
+        return format_html('<link rel="stylesheet" href="{}">', static(path))
+    return format_html('<script src="{}" defer></script>', static(path))
+
+
+@register.simple_tag
+def static_bundle(bundle):
+    """
+    ``{% static_bundle 'notes/js/login.bundle.js' %}`` renders one tag for the
+    bundle built by collectstatic (see STATIC_BUNDLES), or one tag per member
+    file in DEBUG, where the bundle isn't built.
+    """
+    if settings.DEBUG:
+        members = settings.STATIC_BUNDLES[bundle]
+        return format_html_join('\n', '{}', ((_tag(member),) for member in members))
+    return _tag(bundle)
+
+
+@register.simple_tag
+def tailwind_stylesheet():
+    """
+    ``{% tailwind_stylesheet %}`` links the stylesheet compiled from
+    assets/css/input.css (``npm run build:prod``, run by build_files.sh). In
+    DEBUG, until it has been built, falls back to the Tailwind Play CDN, which
+    compiles the page's classes in the browser.
+    """
+    if settings.DEBUG and not finders.find(TAILWIND_CSS):
+        return render_to_string('includes/tailwind_config.html')
+    return _tag(TAILWIND_CSS)
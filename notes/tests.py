@@ -1,5 +1,45 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from html.parser import HTMLParser
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template import Context, Template
+from django.utils import timezone
+from django.urls import include, path, reverse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from notes import (
+    account_deletion, archive, async_views, autocomplete, compression, duplicates, events, facets, hashers, ical,
+    ratelimit, recurrence, related, rendering, revisions, routers, sync, thumbnails,
+)
+from notes.models import (
+    AccountDeletion, AdminRequest, ArchivedTask, Note, NoteFingerprint, NoteRevision, Reminder, RenderedNote,
+    SubjectFacet, Task, User,
+)
+from notes.fields import RAW, ZLIB, compress_text, decompress_text
+from notes.pagination import EstimatedCountPaginator, decode_cursor, estimate_count, keyset_page
+from notes.templatetags.avatar_tags import avatar_url
+from notes.thumbnails import THUMBNAIL_SIZES
+from stunotesapp import importtime
 
 
 print("Hello Everyone")
@@ -18,4 +58,1242 @@ print("Fixing fork issue again 3")
 print("hello world")
 print("testing request pull")
 print("Testing #2 request pull")
-print("ddsdsdsdsd")
\ No newline at end of file
+print("ddsdsdsdsd")
+
+
+class ColdStartBudgetTests(SimpleTestCase):
+    """Keep serverless cold starts cheap: see stunotesapp/importtime.py."""
+
+    def test_heavy_modules_deferred(self):
+        _, imports = importtime.measure(urls=True)
+        for module in importtime.DEFERRED_MODULES:
+            self.assertNotIn(module, imports, f"{module} should be imported lazily")
+
+    @skipUnless(os.environ.get('RUN_BENCHMARKS'), "wall-clock benchmark; set RUN_BENCHMARKS=1 to run")
+    def test_import_time_within_budget(self):
+        total_us, _ = importtime.measure(urls=True)
+        self.assertLessEqual(
+            total_us / 1000, importtime.IMPORT_BUDGET_MS,
+            "Cold-start import time is over budget; run `python -m stunotesapp.importtime --urls` to see why.",
+        )
+
+
+# Test client pages: plain HTTP, and static URLs without a collectstatic manifest
+page_settings = override_settings(
+    SECURE_SSL_REDIRECT=False, STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+)
+
+
+def make_user(email, **fields):
+    """A user with an unusable password, so no hashing cost in tests."""
+    return User.objects.create(username=email, email=email, full_name=email.split('@')[0], password='!', **fields)
+
+
+def temporary_media(test):
+    """Store profile pictures in a throwaway directory for the rest of `test`."""
+    root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, root, ignore_errors=True)
+    storage = FileSystemStorage(location=root, base_url='/media/')
+    patcher = mock.patch.object(User._meta.get_field('profile_pic'), 'storage', storage)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return storage
+
+
+def image_upload(name='me.png', size=(300, 200), color='teal'):
+    from PIL import Image
+
+    buf = BytesIO()
+    Image.new('RGB', size, color).save(buf, format='PNG')
+    return SimpleUploadedFile(name, buf.getvalue(), content_type='image/png')
+
+
+@page_settings
+class ProfileThumbnailTests(TestCase):
+    """Avatar thumbnails made at upload time (notes/thumbnails.py, templatetags/avatar_tags.py)."""
+
+    def setUp(self):
+        self.storage = temporary_media(self)
+        self.user = make_user('avatar@x.test')
+        self.client.force_login(self.user)
+
+    def upload(self, **fields):
+        data = {'full_name': "Ava Tar", 'email': 'avatar@x.test', 'bio': "", 'theme': 'light', **fields}
+        response = self.client.post(reverse('notes:edit_profile'), data)
+        self.assertEqual(response.status_code, 302)
+        self.user.refresh_from_db()
+        return self.user.profile_pic_thumbs
+
+    def test_upload_stores_every_size(self):
+        from PIL import Image
+
+        thumbs = self.upload(profile_pic=image_upload(size=(600, 300)))
+        self.assertEqual(sorted(thumbs, key=int), [str(size) for size in THUMBNAIL_SIZES])
+        for size, entry in thumbs.items():
+            self.assertTrue(entry['name'].startswith(thumbnails.THUMBNAIL_DIR))
+            self.assertEqual(entry['url'], self.storage.url(entry['name']))
+            with self.storage.open(entry['name']) as fh, Image.open(fh) as img:
+                self.assertEqual((img.format, img.size), ('JPEG', (int(size), int(size))))
+
+    def test_pick_size(self):
+        self.assertEqual([thumbnails.pick_size(n) for n in (10, 64, 80, 500)], [64, 64, 128, 256])
+        self.assertEqual(thumbnails.pick_size(80, ['256', '64']), 256)
+        self.assertIsNone(thumbnails.pick_size(80, []))
+
+    def test_avatar_url(self):
+        default = avatar_url(self.user, 80)
+        self.assertIn('/image/upload/c_fill,w_128,h_128/', default)
+        self.assertEqual(avatar_url(self.user, 'large'), '')
+
+        thumbs = self.upload(profile_pic=image_upload())
+        self.assertEqual(avatar_url(self.user, 80), thumbs['128']['url'])
+        self.assertEqual(avatar_url(self.user, 1000), thumbs['256']['url'])
+        # Uploaded before thumbnails existed: the original
+        User.objects.filter(pk=self.user.pk).update(profile_pic_thumbs={})
+        self.user.refresh_from_db()
+        self.assertEqual(avatar_url(self.user, 80), self.storage.url(self.user.profile_pic.name))
+
+    def test_changing_the_picture_removes_old_thumbnails(self):
+        first = self.upload(profile_pic=image_upload('one.png'))
+        second = self.upload(profile_pic=image_upload('two.png'))
+        self.assertFalse(any(self.storage.exists(entry['name']) for entry in first.values()))
+        self.assertTrue(all(self.storage.exists(entry['name']) for entry in second.values()))
+
+        self.assertEqual(self.upload(remove_profile_pic='1'), {})
+        self.assertFalse(self.user.profile_pic)
+        self.assertFalse(any(self.storage.exists(entry['name']) for entry in second.values()))
+
+    def test_backfill_command(self):
+        self.upload(profile_pic=image_upload())
+        User.objects.filter(pk=self.user.pk).update(profile_pic_thumbs={})
+        call_command('build_profile_thumbnails', stdout=StringIO())
+        self.user.refresh_from_db()
+        self.assertEqual(sorted(self.user.profile_pic_thumbs, key=int), [str(size) for size in THUMBNAIL_SIZES])
+
+
+@override_settings(RATELIMIT_ENABLED=True, RATELIMIT_PROXY_COUNT=0,
+                   RATE_LIMITS={'register': {'ip': (3, 60), 'email': (2, 60)}})
+class RateLimitTests(SimpleTestCase):
+    """Sliding-window throttling of the password-hashing endpoints (notes/ratelimit.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def request(self, forwarded=None, remote='203.0.113.7'):
+        extra = {'HTTP_X_FORWARDED_FOR': forwarded} if forwarded else {}
+        return self.factory.post('/register/', REMOTE_ADDR=remote, **extra)
+
+    def test_spoofed_forwarded_for_is_ignored_without_proxies(self):
+        request = self.request(forwarded='198.51.100.1')
+        self.assertEqual(ratelimit.get_client_ip(request), '203.0.113.7')
+        allowed = [ratelimit.check_rate_limit(self.request(forwarded=f'198.51.100.{i}'), 'register')
+                   for i in range(5)]
+        self.assertEqual(allowed, [True, True, True, False, False])
+
+    @override_settings(RATELIMIT_PROXY_COUNT=1)
+    def test_forwarded_for_uses_the_entry_the_proxy_added(self):
+        request = self.request(forwarded='198.51.100.1, 192.0.2.9', remote='10.0.0.1')
+        self.assertEqual(ratelimit.get_client_ip(request), '192.0.2.9')
+        allowed = [ratelimit.check_rate_limit(self.request(forwarded=f'198.51.100.{i}, 192.0.2.9'), 'register')
+                   for i in range(4)]
+        self.assertEqual(allowed, [True, True, True, False])
+        # Missing header: fall back to the connecting address
+        self.assertEqual(ratelimit.get_client_ip(self.request(remote='10.0.0.1')), '10.0.0.1')
+
+    def test_register_is_limited_per_email(self):
+        allowed = [ratelimit.check_rate_limit(self.request(remote=f'192.0.2.{i}'), 'register', email='A@x.test')
+                   for i in range(3)]
+        self.assertEqual(allowed, [True, True, False])
+        self.assertTrue(ratelimit.check_rate_limit(self.request(remote='192.0.2.50'), 'register', email='b@x.test'))
+
+    def test_window_slides(self):
+        clock = [600.0]
+        with mock.patch('notes.ratelimit.time.time', lambda: clock[0]):
+            for _ in range(3):
+                self.assertTrue(ratelimit.check_rate_limit(self.request(), 'register'))
+            self.assertFalse(ratelimit.check_rate_limit(self.request(), 'register'))
+            # Halfway into the next window the previous one still weighs 3 * 0.5
+            clock[0] = 690.0
+            self.assertTrue(ratelimit.check_rate_limit(self.request(), 'register'))
+            self.assertTrue(ratelimit.check_rate_limit(self.request(), 'register'))
+            self.assertFalse(ratelimit.check_rate_limit(self.request(), 'register'))
+            clock[0] = 780.0
+            self.assertTrue(ratelimit.check_rate_limit(self.request(), 'register'))
+
+
+class PasswordHashPolicyTests(TestCase):
+    """PASSWORD_HASH_POLICY and rehash on login (notes/hashers.py)."""
+
+    def test_policy_hasher_goes_first_and_replaces_its_namesake(self):
+        hasher_list = hashers.password_hashers('pbkdf2')
+        self.assertEqual(hasher_list[0], 'notes.hashers.TunedPBKDF2PasswordHasher')
+        self.assertNotIn('django.contrib.auth.hashers.PBKDF2PasswordHasher', hasher_list)
+        self.assertIn('django.contrib.auth.hashers.ScryptPasswordHasher', hasher_list)
+        with self.assertRaises(ImproperlyConfigured):
+            hashers.password_hashers('md5')
+
+    @override_settings(PASSWORD_HASHERS=hashers.password_hashers('pbkdf2'), PASSWORD_PBKDF2_ITERATIONS=1000)
+    @mock.patch.object(hashers, 'DEFAULT_PBKDF2_ITERATIONS', 500)
+    def test_login_rehashes_to_the_current_cost(self):
+        user = User.objects.create_user(email='hash@x.test', username='hash@x.test', password='s3cret-pass')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertEqual(authenticate(email='hash@x.test', password='s3cret-pass'), user)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertTrue(user.check_password('s3cret-pass'))
+
+    @override_settings(PASSWORD_HASHERS=hashers.password_hashers('pbkdf2'), PASSWORD_PBKDF2_ITERATIONS=260000)
+    def test_stronger_hash_is_not_rewritten_cheaper(self):
+        django_default = PBKDF2PasswordHasher().encode('s3cret-pass', PBKDF2PasswordHasher().salt())
+        user = make_user('strong@x.test')
+        User.objects.filter(pk=user.pk).update(password=django_default)
+        self.assertEqual(hashers.TunedPBKDF2PasswordHasher().iterations, PBKDF2PasswordHasher.iterations)
+        self.assertEqual(authenticate(email='strong@x.test', password='s3cret-pass'), user)
+        user.refresh_from_db()
+        self.assertEqual(user.password, django_default)
+
+
+class AccountDeletionTests(TestCase):
+    """Soft delete and batched purge of accounts (notes/account_deletion.py)."""
+
+    def setUp(self):
+        self.user = make_user('leaving@x.test')
+        tasks = [Task.objects.create(user=self.user, title=f"Task {i}") for i in range(3)]
+        Reminder.objects.create(task=tasks[0], remind_time=timezone.now())
+        Note.objects.create(user=self.user, title="Note", content="Body")
+        self.other = make_user('staying@x.test')
+        Task.objects.create(user=self.other, title="Kept")
+
+    def test_schedule_deactivates_and_keeps_the_rows(self):
+        deletion = account_deletion.schedule_account_deletion(self.user)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(deletion.status, 'pending')
+        self.assertGreaterEqual(deletion.total_rows, 5)
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 3)
+
+    def test_purge_resumes_after_the_deadline_and_removes_only_that_account(self):
+        deletion = account_deletion.schedule_account_deletion(self.user)
+        self.assertFalse(account_deletion.purge_account(deletion, batch_size=2, deadline=0))
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, 'running')
+
+        self.assertEqual(account_deletion.purge_pending_deletions(batch_size=2), 1)
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, 'done')
+        self.assertEqual(deletion.deleted_rows, deletion.total_rows)
+        self.assertFalse(User.objects.filter(email='leaving@x.test').exists())
+        self.assertFalse(Note.objects.filter(title="Note").exists())
+        self.assertEqual(list(Task.objects.values_list('title', flat=True)), ["Kept"])
+        self.assertEqual(AccountDeletion.objects.get().email, 'leaving@x.test')
+
+
+@page_settings
+class AdminRequestQueueTests(TestCase):
+    """Keyset-paginated review queue (notes/pagination.py, views.admin_requests_list)."""
+
+    def setUp(self):
+        self.admin = make_user('admin@x.test', is_staff=True, is_superuser=True)
+        created = timezone.now()
+        # Pairs share a timestamp, so pages must break ties on the id
+        self.requests = [
+            AdminRequest.objects.create(requester=make_user(f'r{i}@x.test'), reason="Please",
+                                        created_at=created - timedelta(minutes=i // 2))
+            for i in range(7)
+        ]
+
+    def test_keyset_pages_cover_every_row_once(self):
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(AdminRequest.objects.all(), cursor=cursor, page_size=3)
+            seen += [row.pk for row in rows]
+            if cursor is None:
+                break
+        expected = sorted(self.requests, key=lambda r: (r.created_at, r.pk), reverse=True)
+        self.assertEqual(seen, [r.pk for r in expected])
+
+    def test_malformed_cursor_starts_over(self):
+        self.assertIsNone(decode_cursor('not a cursor'))
+        rows, _ = keyset_page(AdminRequest.objects.all(), cursor='%%%', page_size=3)
+        self.assertEqual(len(rows), 3)
+
+    def test_batch_review_returns_to_the_encoded_cursor(self):
+        self.client.force_login(self.admin)
+        _, cursor = keyset_page(AdminRequest.objects.filter(status='pending'), page_size=3)
+        ids = [str(r.pk) for r in self.requests[:2]]
+        response = self.client.post(reverse('notes:batch_review_admin_requests'),
+                                    {'action': 'approve', 'request_ids': ids, 'cursor': cursor + '+/'})
+        self.assertEqual(response['Location'], reverse('notes:admin_requests_list') + '?cursor=' +
+                         cursor.replace('=', '%3D') + '%2B%2F')
+        self.assertEqual(AdminRequest.objects.filter(status='approved').count(), 2)
+        self.assertTrue(User.objects.get(email='r0@x.test').is_staff)
+
+        # Already reviewed requests are skipped
+        response = self.client.post(reverse('notes:batch_review_admin_requests'),
+                                    {'action': 'reject', 'request_ids': ids, 'cursor': cursor}, follow=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AdminRequest.objects.filter(status='rejected').count(), 0)
+
+
+class TaskDueQueryTests(TestCase):
+    """Overdue / due-today / upcoming evaluated in the database (TaskQuerySet)."""
+
+    def setUp(self):
+        self.user = make_user('due@x.test')
+        self.now = timezone.make_aware(datetime(2026, 3, 10, 12, 0))
+        hour = timedelta(hours=1)
+
+        def task(title, due, **fields):
+            return Task.objects.create(user=self.user, title=title, due_date=due, **fields)
+
+        self.late = task("Late", self.now - 30 * hour)
+        self.this_morning = task("This morning", self.now - 2 * hour)
+        self.tonight = task("Tonight", self.now + 6 * hour)
+        self.tomorrow = task("Tomorrow", self.now + 20 * hour)
+        self.done = task("Done", self.now - 30 * hour, status='completed')
+        self.series = task("Weekly", self.now - 30 * hour, recurrence='weekly')
+
+    def titles(self, queryset):
+        return sorted(queryset.values_list('title', flat=True))
+
+    def test_windows(self):
+        tasks = Task.objects.filter(user=self.user)
+        self.assertEqual(self.titles(tasks.overdue(now=self.now)), ["Late", "This morning"])
+        self.assertEqual(self.titles(tasks.due_today(now=self.now)), ["This morning", "Tonight"])
+        self.assertEqual(self.titles(tasks.upcoming(now=self.now)), ["Tomorrow", "Tonight"])
+        # Completed tasks and recurring series are never active
+        self.assertNotIn("Done", self.titles(tasks.active()))
+        self.assertEqual(self.titles(tasks.series()), ["Weekly"])
+
+    def test_annotated_is_overdue_matches_the_property(self):
+        annotated = {t.pk: t.is_overdue for t in Task.objects.filter(user=self.user).with_is_overdue(now=self.now)}
+        self.assertTrue(annotated[self.late.pk])
+        self.assertFalse(annotated[self.tonight.pk])
+        self.assertFalse(annotated[self.done.pk])
+        self.assertTrue(Task.objects.get(pk=self.late.pk).is_overdue)
+        self.assertFalse(Task.objects.get(pk=self.done.pk).is_overdue)
+
+
+@page_settings
+class DeltaSyncTests(TestCase):
+    """Changes-since sync for the dashboard (notes/sync.py)."""
+
+    def setUp(self):
+        self.user = make_user('sync@x.test')
+        self.kept = Task.objects.create(user=self.user, title="Kept")
+        self.gone = Task.objects.create(user=self.user, title="Gone")
+        self.since = timezone.now() - timedelta(minutes=30)
+        Task.objects.update(updated_at=self.since - timedelta(minutes=30))
+
+    def test_only_changes_after_the_cursor(self):
+        gone_id = self.gone.pk
+        self.kept.save()
+        self.gone.delete()
+        now = timezone.now()
+        payload = sync.changes_since(self.user, self.since, now=now)
+        self.assertFalse(payload['reset'])
+        self.assertEqual([t['id'] for t in payload['tasks']['updated']], [self.kept.pk])
+        self.assertEqual(payload['tasks']['deleted'], [gone_id])
+        self.assertEqual(payload['stats']['pending_tasks'], 1)
+        self.assertEqual(sync.decode_cursor(payload['cursor']), now)
+
+    def test_nothing_changed_costs_no_stats(self):
+        payload = sync.changes_since(self.user, self.since)
+        self.assertEqual(payload['tasks'], {'updated': [], 'deleted': []})
+        self.assertIsNone(payload['stats'])
+
+    def test_cursor_older_than_the_tombstones_resets(self):
+        payload = sync.changes_since(self.user, self.since - timedelta(days=60))
+        self.assertTrue(payload['reset'])
+
+    def test_endpoint_requires_a_valid_cursor(self):
+        self.client.force_login(self.user)
+        url = reverse('notes:sync_changes')
+        self.assertEqual(self.client.get(url, {'since': 'yesterday'}).status_code, 400)
+        response = self.client.get(url, {'since': sync.encode_cursor(self.since)})
+        self.assertEqual(response.json()['status'], 'ok')
+
+
+@mock.patch.object(events.EventHub, '_start_background', lambda hub, loop: None)
+class EventStreamTests(TestCase):
+    """Server-sent events endpoint and reminder claiming (notes/events.py)."""
+
+    def setUp(self):
+        self.user = make_user('events@x.test')
+        self.task = Task.objects.create(user=self.user, title="Essay")
+
+    def stream(self, cookie, publish=None):
+        """Run the ASGI endpoint until the first event, then disconnect; return (status, body)."""
+        sent, inbox = [], asyncio.Queue()
+
+        async def receive():
+            return await inbox.get()
+
+        async def send(message):
+            sent.append(message)
+            if b'event:' in message.get('body', b''):
+                inbox.put_nowait({'type': 'http.disconnect'})
+
+        async def run():
+            scope = {'type': 'http', 'method': 'GET', 'path': '/events/',
+                     'headers': [(b'cookie', cookie.encode('latin-1'))] if cookie else []}
+            app = asyncio.create_task(events.sse_application(scope, receive, send))
+            while publish and not app.done() and not events.hub.count():
+                await asyncio.sleep(0.01)
+            if publish:
+                events.publish(self.user.pk, *publish)
+            await asyncio.wait_for(app, 5)
+
+        async_to_sync(run)()
+        return sent[0]['status'], b''.join(m.get('body', b'') for m in sent[1:])
+
+    def test_anonymous_stream_is_refused(self):
+        status, _ = self.stream(None)
+        self.assertEqual(status, 403)
+
+    def test_published_event_reaches_the_stream_and_disconnect_unsubscribes(self):
+        self.client.force_login(self.user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={self.client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        status, body = self.stream(cookie, publish=('task', {'id': self.task.pk, 'deleted': True}))
+        self.assertEqual(status, 200)
+        self.assertIn(f'event: task\ndata: {{"id":{self.task.pk},"deleted":true}}\n\n'.encode(), body)
+        self.assertEqual(events.hub.count(), 0)
+
+    def test_due_reminders_are_claimed_once(self):
+        now = timezone.now()
+        due = Reminder.objects.create(task=self.task, remind_time=now - timedelta(minutes=1))
+        Reminder.objects.create(task=self.task, remind_time=now + timedelta(hours=1))
+        other = Task.objects.create(user=make_user('other@x.test'), title="Other")
+        Reminder.objects.create(task=other, remind_time=now - timedelta(minutes=1))
+
+        self.assertEqual([r.pk for r in events.claim_due_reminders([self.user.pk])], [due.pk])
+        self.assertEqual(events.claim_due_reminders([self.user.pk]), [])
+        self.assertTrue(Reminder.objects.get(pk=due.pk).is_sent)
+
+
+class RecurrenceTests(TestCase):
+    """Lazy expansion of recurring series (notes/recurrence.py)."""
+
+    def setUp(self):
+        self.user = make_user('repeat@x.test')
+
+    def local(self, *args):
+        return timezone.make_aware(datetime(*args))
+
+    def series(self, start, recurrence, **fields):
+        return Task.objects.create(user=self.user, title=f"{recurrence} series", due_date=start,
+                                   recurrence=recurrence, **fields)
+
+    def dates(self, start, end):
+        return [o.due_date for o in recurrence.expand_occurrences(self.user, start, end)]
+
+    def test_window_expansion_skips_ahead(self):
+        self.series(self.local(2020, 1, 6, 9), 'weekly', recurrence_interval=2)
+        self.assertEqual(self.dates(self.local(2026, 3, 1), self.local(2026, 4, 1)),
+                         [self.local(2026, 3, 9, 9), self.local(2026, 3, 23, 9)])
+
+    def test_monthly_on_the_31st_falls_on_the_last_day(self):
+        self.series(self.local(2026, 1, 31, 8), 'monthly')
+        self.assertEqual(self.dates(self.local(2026, 2, 1), self.local(2026, 5, 1)),
+                         [self.local(2026, 2, 28, 8), self.local(2026, 3, 31, 8), self.local(2026, 4, 30, 8)])
+
+    def test_count_and_until_end_the_series(self):
+        self.series(self.local(2026, 3, 1, 7), 'daily', recurrence_count=3)
+        self.series(self.local(2026, 3, 1, 20), 'daily', recurrence_until=self.local(2026, 3, 2, 23))
+        self.assertEqual(self.dates(self.local(2026, 3, 1), self.local(2026, 3, 10)), [
+            self.local(2026, 3, 1, 7), self.local(2026, 3, 1, 20), self.local(2026, 3, 2, 7),
+            self.local(2026, 3, 2, 20), self.local(2026, 3, 3, 7),
+        ])
+
+    def test_stored_occurrences_and_completed_series_are_not_expanded(self):
+        daily = self.series(self.local(2026, 3, 1, 9), 'daily')
+        recurrence.materialize_occurrence(daily, self.local(2026, 3, 2, 9), status='completed')
+        self.assertEqual(self.dates(self.local(2026, 3, 1), self.local(2026, 3, 4)),
+                         [self.local(2026, 3, 1, 9), self.local(2026, 3, 3, 9)])
+        daily.status = 'completed'
+        daily.save()
+        self.assertEqual(self.dates(self.local(2026, 3, 1), self.local(2026, 3, 4)), [])
+
+    def test_occurrence_from_timestamp(self):
+        weekly = self.series(self.local(2026, 3, 2, 9), 'weekly', recurrence_count=2)
+        second = self.local(2026, 3, 9, 9)
+        self.assertEqual(recurrence.occurrence_from_timestamp(weekly, int(second.timestamp())), second)
+        self.assertIsNone(recurrence.occurrence_from_timestamp(weekly, int(second.timestamp()) + 60))
+        self.assertIsNone(recurrence.occurrence_from_timestamp(weekly, int(self.local(2026, 3, 16, 9).timestamp())))
+
+    def form_data(self, task, **fields):
+        data = {'title': task.title, 'priority': task.priority, 'status': task.status,
+                'due_date': timezone.localtime(task.due_date).strftime('%Y-%m-%dT%H:%M')}
+        return {**data, **fields}
+
+    @page_settings
+    def test_started_series_can_be_edited(self):
+        weekly = self.series(self.local(2026, 3, 2, 9), 'weekly')
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('notes:edit_task', args=[weekly.pk]), self.form_data(
+            weekly, recurrence='weekly', recurrence_interval=1, recurrence_until='2026-04-01T09:00'))
+        self.assertRedirects(response, reverse('notes:home'), fetch_redirect_response=False)
+        weekly.refresh_from_db()
+        self.assertEqual(weekly.recurrence_until, self.local(2026, 4, 1, 9))
+        # A one-off task still can't be moved into the past
+        task = Task.objects.create(user=self.user, title="Essay", due_date=timezone.now() + timedelta(days=1))
+        response = self.client.post(reverse('notes:edit_task', args=[task.pk]),
+                                    self.form_data(task, due_date='2020-01-01T09:00'))
+        self.assertContains(response, "Due date cannot be in the past")
+
+    @page_settings
+    def test_overdue_occurrence_can_be_edited(self):
+        weekly = self.series(self.local(2026, 3, 2, 9), 'weekly')
+        value = self.local(2026, 3, 9, 9)
+        self.client.force_login(self.user)
+        url = reverse('notes:edit_occurrence', args=[weekly.pk, int(value.timestamp())])
+        response = self.client.post(url, {'title': "Lab (room 2)", 'priority': 'medium', 'status': 'pending',
+                                          'due_date': '2026-03-09T09:00'})
+        self.assertRedirects(response, reverse('notes:home'), fetch_redirect_response=False)
+        stored = Task.objects.get(series=weekly, occurrence_date=value)
+        self.assertEqual(stored.title, "Lab (room 2)")
+        response = self.client.post(reverse('notes:edit_task', args=[stored.pk]), self.form_data(stored, status='completed'))
+        self.assertRedirects(response, reverse('notes:home'), fetch_redirect_response=False)
+
+
+@override_settings(NOTE_REVISION_SNAPSHOT_INTERVAL=3)
+class NoteRevisionTests(TestCase):
+    """Snapshot + line-delta revision history (notes/revisions.py)."""
+
+    def setUp(self):
+        self.note = Note.objects.create(user=make_user('rev@x.test'), title="Log", content="")
+        self.versions = []
+
+    def edit(self, content):
+        self.note.content = content
+        self.note.save()
+        self.versions.append(content)
+        return revisions.record_revision(self.note)
+
+    def test_delta_round_trip(self):
+        old = "one\ntwo\nthree\n"
+        new = "zero\none\nthree\nfour"
+        self.assertEqual(revisions.apply_delta(old, revisions.make_delta(old, new)), new)
+        self.assertEqual(revisions.apply_delta(old, revisions.make_delta(old, "")), "")
+
+    def test_every_revision_rebuilds(self):
+        lines = [f"line {i}\n" for i in range(50)]
+        for i in range(7):
+            lines[i * 5] = f"edit {i}\n"
+            self.edit(''.join(lines))
+        stored = list(NoteRevision.objects.filter(note=self.note).order_by('number'))
+        self.assertEqual([r.is_snapshot for r in stored], [True, False, False, True, False, False, True])
+        self.assertLess(len(stored[1].data), len(self.versions[1]) // 4)
+        for number, content in enumerate(self.versions, start=1):
+            self.assertEqual(revisions.revision_content(self.note.pk, number), content)
+        # Saving without a change records nothing
+        self.assertIsNone(revisions.record_revision(self.note))
+
+    @override_settings(NOTE_REVISION_MAX_PER_NOTE=2, NOTE_REVISION_MAX_AGE_DAYS=0)
+    def test_compaction_keeps_the_latest_rebuildable(self):
+        for i in range(5):
+            self.edit(f"draft {i}\nshared line\n")
+        self.assertEqual(revisions.compact_revisions(), 3)
+        self.assertEqual(list(NoteRevision.objects.filter(note=self.note).values_list('number', flat=True)), [4, 5])
+        self.assertIsNone(revisions.revision_content(self.note.pk, 3))
+        self.assertEqual(revisions.revision_content(self.note.pk, 4), self.versions[3])
+        self.assertEqual(revisions.revision_content(self.note.pk, 5), self.versions[4])
+
+
+class CompressedTextFieldTests(TestCase):
+    """Note bodies stored compressed once large (notes/fields.py)."""
+
+    def test_encoding_by_size_and_method(self):
+        large = "Lecture notes, week 3. " * 100
+        self.assertEqual(compress_text("short", method='zlib')[:1], RAW)
+        self.assertEqual(compress_text(large, method='zlib')[:1], ZLIB)
+        self.assertEqual(compress_text(large, method='off')[:1], RAW)
+        for method in ('zlib', 'off'):
+            self.assertEqual(decompress_text(compress_text(large, method=method)), large)
+        with self.assertRaises(ImproperlyConfigured):
+            compress_text(large, method='lz4')
+
+    def test_text_that_would_grow_is_stored_raw(self):
+        self.assertEqual(compress_text("Quiz 4", method='zlib', min_bytes=1), RAW + b"Quiz 4")
+
+    def test_model_round_trip_across_settings(self):
+        user = make_user('big@x.test')
+        body = "Définition: entropie. " * 200
+        with self.settings(NOTE_CONTENT_COMPRESSION='zlib'):
+            packed = Note.objects.create(user=user, title="Packed", content=body)
+        with self.settings(NOTE_CONTENT_COMPRESSION='off'):
+            plain = Note.objects.create(user=user, title="Plain", content=body)
+            self.assertEqual(Note.objects.get(pk=packed.pk).content, body)
+        stored = dict(Note.objects.values_list('title', 'content'))
+        self.assertEqual(stored, {"Packed": body, "Plain": body})
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT title, content FROM notes_note")
+            raw = {title: bytes(data) for title, data in cursor.fetchall()}
+        self.assertEqual(raw["Packed"][:1], ZLIB)
+        self.assertLess(len(raw["Packed"]), len(raw["Plain"]) // 4)
+        self.assertEqual(plain.content, body)
+
+
+@mock.patch('notes.routers.replica_configured', lambda: True)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Read-replica routing and read-your-writes stickiness (notes/routers.py)."""
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def serve(self, request, write=False):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Task))
+            if write:
+                self.router.db_for_write(Task)
+                seen.append(self.router.db_for_read(Task))
+            return HttpResponse()
+
+        response = routers.replica_routing_middleware(view)(request)
+        return seen, response
+
+    def test_safe_requests_read_the_replica_until_they_write(self):
+        seen, response = self.serve(self.factory.get('/'), write=True)
+        self.assertEqual(seen, ['replica', 'default'])
+        self.assertIn(routers.STICKY_COOKIE, response.cookies)
+
+    def test_posts_and_sticky_browsers_read_the_primary(self):
+        seen, response = self.serve(self.factory.post('/'))
+        self.assertEqual(seen, ['default'])
+        self.assertNotIn(routers.STICKY_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[routers.STICKY_COOKIE] = str(time.time() + 10)
+        self.assertEqual(self.serve(request)[0], ['default'])
+        request.COOKIES[routers.STICKY_COOKIE] = str(time.time() - 10)
+        self.assertEqual(self.serve(request)[0], ['replica'])
+
+    def test_read_only_outside_requests(self):
+        self.assertEqual(self.router.db_for_read(Task), 'default')
+        with routers.replica_reads():
+            self.assertEqual(self.router.db_for_read(Task), 'replica')
+        self.assertEqual(routers.read_only(lambda: self.router.db_for_read(Task))(), 'replica')
+
+
+@page_settings
+class BaseLayoutTests(TestCase):
+    """Pages extend base.html and link the built stylesheets (notes/templatetags/static_bundles.py)."""
+
+    def test_signed_in_pages_link_tailwind_and_theme(self):
+        self.client.force_login(make_user('layout@x.test'))
+        for name in ('notes:home', 'notes:calendar', 'notes:notes_list'):
+            html = self.client.get(reverse(name)).content.decode()
+            self.assertIn('/static/notes/css/tailwind.css', html, name)
+            self.assertIn('/static/notes/css/theme.css', html, name)
+            self.assertNotIn('cdn.tailwindcss.com', html, name)
+
+    def test_pages_without_dark_theme_skip_theme_css(self):
+        html = self.client.get(reverse('notes:login')).content.decode()
+        self.assertIn('/static/notes/css/tailwind.css', html)
+        self.assertNotIn('theme.css', html)
+
+
+class StaticBundleTests(SimpleTestCase):
+    """collectstatic bundling, minification and hashed names (stunotesapp/static_storage.py)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, root, ignore_errors=True)
+        collected = override_settings(
+            DEBUG=False, STATIC_ROOT=root,
+            STATICFILES_STORAGE='stunotesapp.static_storage.MinifiedManifestStaticFilesStorage',
+        )
+        collected.enable()
+        cls.addClassCleanup(collected.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_bundle_is_built_minified_and_hashed(self):
+        from django.contrib.staticfiles.storage import staticfiles_storage
+
+        bundle = 'notes/js/login.bundle.js'
+        hashed = staticfiles_storage.stored_name(bundle)
+        self.assertRegex(hashed, r'^notes/js/login\.bundle\.[0-9a-f]{12}\.js$')
+        with staticfiles_storage.open(hashed) as fh:
+            text = fh.read().decode('utf-8')
+        members = []
+        for member in settings.STATIC_BUNDLES[bundle]:
+            with open(os.path.join(settings.BASE_DIR, 'static', member), encoding='utf-8') as fh:
+                members.append(fh.read())
+        self.assertLess(len(text), sum(map(len, members)) * 0.8)
+        self.assertNotIn('// Global loader management', text)
+        self.assertIn('getElementById("loader-overlay")', text.replace("'", '"'))
+        self.assertTrue(staticfiles_storage.exists(hashed + '.gz'))
+
+        with staticfiles_storage.open(staticfiles_storage.stored_name('notes/js/common.js')) as fh:
+            self.assertNotIn('\n  ', fh.read().decode('utf-8'))
+
+        tag = Template("{% load static_bundles %}{% static_bundle 'notes/js/login.bundle.js' %}").render(Context())
+        self.assertEqual(tag, f'<script src="{settings.STATIC_URL}{hashed}" defer></script>')
+
+    def test_debug_links_the_members(self):
+        with self.settings(DEBUG=True):
+            tags = Template("{% load static_bundles %}{% static_bundle 'notes/js/login.bundle.js' %}").render(Context())
+        self.assertEqual(tags.count('<script '), len(settings.STATIC_BUNDLES['notes/js/login.bundle.js']))
+
+
+@override_settings(RESPONSE_MINIFY_HTML=True, RESPONSE_COMPRESS_MIN_BYTES=200)
+class ResponseCompressionTests(SimpleTestCase):
+    """HTML minification and gzip/brotli compression (notes/compression.py)."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def optimize(self, response, accept='gzip'):
+        middleware = compression.response_compression_middleware(lambda request: response)
+        return middleware(self.factory.get('/', HTTP_ACCEPT_ENCODING=accept))
+
+    def test_minify_collapses_whitespace_between_tags_only(self):
+        html = (
+            '<!DOCTYPE html>\n  <div title="two  spaces\n and > a newline"   data-x=\'<  >\'>\n\n'
+            '   <!-- dropped -->\n   <p>  hi  there </p>\n</div>   <pre>  kept  \n  as is</pre>'
+            '<textarea name="t">  a\n\n  b</textarea>  <!--[if IE]><p>ie</p><![endif]-->'
+        )
+        self.assertEqual(compression.minify_html(html), (
+            '<!DOCTYPE html>\n<div title="two  spaces\n and > a newline"   data-x=\'<  >\'>\n'
+            '<p> hi  there </p>\n</div> <pre>  kept  \n  as is</pre>'
+            '<textarea name="t">  a\n\n  b</textarea> <!--[if IE]><p>ie</p><![endif]-->'
+        ))
+
+    def test_choose_encoding(self):
+        self.assertEqual(compression.choose_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(compression.choose_encoding('br;q=0.5, gzip'), 'gzip')
+        self.assertEqual(compression.choose_encoding('*;q=0, gzip;q=0'), None)
+        self.assertIsNone(compression.choose_encoding(''))
+
+    def test_html_is_minified_and_gzipped_with_a_weak_etag(self):
+        body = '<ul>\n' + '    <li class="row">Task</li>\n' * 40 + '</ul>'
+        response = HttpResponse(body)
+        response['ETag'] = '"v1"'
+        response = self.optimize(response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], 'W/"v1"')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content).decode(), compression.minify_html(body))
+
+    def test_small_no_transform_and_event_stream_responses_pass_through(self):
+        self.assertNotIn('Content-Encoding', self.optimize(HttpResponse('<p>tiny</p>')))
+        response = HttpResponse('x' * 1000, content_type='text/plain')
+        response['Cache-Control'] = 'no-transform'
+        self.assertNotIn('Content-Encoding', self.optimize(response))
+        stream = StreamingHttpResponse(iter([b'data: 1\n\n'] * 50), content_type='text/event-stream')
+        self.assertNotIn('Content-Encoding', self.optimize(stream))
+
+    def test_streaming_response_round_trips(self):
+        chunks = [f'BEGIN:VEVENT\r\nUID:{i}\r\nEND:VEVENT\r\n'.encode() for i in range(200)]
+        response = self.optimize(StreamingHttpResponse(iter(chunks), content_type='text/calendar'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b''.join(chunks))
+
+
+@page_settings
+class EstimatedCountTests(TestCase):
+    """Planner-estimated counts for admin changelists (notes/pagination.py)."""
+
+    def setUp(self):
+        self.user = make_user('count@x.test')
+        Task.objects.bulk_create(Task(user=self.user, title=f"T{i}") for i in range(5))
+
+    def test_exact_without_estimates(self):
+        self.assertIsNone(estimate_count(Task.objects.all()))
+        paginator = EstimatedCountPaginator(Task.objects.all(), 2)
+        self.assertEqual(paginator.count, 5)
+        self.assertFalse(paginator.estimated)
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1000)
+    def test_estimate_used_from_the_threshold(self):
+        with mock.patch('notes.pagination.estimate_count', return_value=250_000):
+            paginator = EstimatedCountPaginator(Task.objects.all(), 100)
+            self.assertEqual(paginator.count, 250_000)
+            self.assertTrue(paginator.estimated)
+            self.assertEqual(paginator.num_pages, 2500)
+        with mock.patch('notes.pagination.estimate_count', return_value=999):
+            self.assertEqual(EstimatedCountPaginator(Task.objects.all(), 100).count, 5)
+        with self.settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=0), \
+                mock.patch('notes.pagination.estimate_count', return_value=250_000):
+            self.assertEqual(EstimatedCountPaginator(Task.objects.all(), 100).count, 5)
+
+    def test_changelist_renders(self):
+        self.client.force_login(make_user('root@x.test', is_staff=True, is_superuser=True))
+        response = self.client.get('/admin/notes/task/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "5 tasks")
+
+
+class SubjectFacetTests(TestCase):
+    """Subject counts kept in step by signals (notes/facets.py)."""
+
+    def setUp(self):
+        self.alice = make_user('alice@x.test')
+        self.bob = make_user('bob@x.test')
+
+    def counts(self, user=None, kind='task'):
+        return dict(SubjectFacet.objects.filter(user=user, kind=kind).values_list('subject', 'count'))
+
+    def test_saves_and_deletes_move_the_counts(self):
+        math = Task.objects.create(user=self.alice, title="A", subject="Math")
+        Task.objects.create(user=self.alice, title="B", subject="Math")
+        Task.objects.create(user=self.bob, title="C", subject="Math")
+        Note.objects.create(user=self.alice, title="N", content="", subject="Physics")
+        self.assertEqual(self.counts(self.alice), {"Math": 2})
+        self.assertEqual(self.counts(), {"Math": 3})
+        self.assertEqual(list(facets.user_subjects(self.alice, 'note')), ["Physics"])
+
+        math.subject = "History"
+        math.save()
+        self.assertEqual(self.counts(self.alice), {"History": 1, "Math": 1})
+        Task.objects.filter(user=self.alice, subject="Math").get().delete()
+        self.assertEqual(self.counts(self.alice), {"History": 1})
+        self.assertEqual(list(facets.global_counts('task')), [("History", 1), ("Math", 1)])
+
+    def test_rebuild_and_release(self):
+        Task.objects.bulk_create([Task(user=self.alice, title="A", subject="Art"),
+                                  Task(user=self.bob, title="B", subject="Art")])
+        self.assertEqual(self.counts(), {})  # bulk_create skips signals
+        facets.rebuild_subject_facets()
+        self.assertEqual(self.counts(), {"Art": 2})
+        facets.release_user(self.bob.pk)
+        self.assertEqual(self.counts(), {"Art": 1})
+        self.assertEqual(self.counts(self.bob), {})
+
+
+@page_settings
+class AutocompleteTests(TestCase):
+    """Subject/tag suggestions from per-user prefix indexes (notes/autocomplete.py)."""
+
+    def test_prefix_index_ranks_and_matches_later_words(self):
+        index = autocomplete.PrefixIndex([
+            ("Biology", 5), ("Intro to Biology", 2), ("biology", 1), ("Bioethics", 3), ("Chemistry", 9),
+        ])
+        self.assertEqual(len(index), 4)
+        # Case variants merge under the most used spelling
+        self.assertEqual(index.complete("bio"), [("Biology", 6), ("Bioethics", 3), ("Intro to Biology", 2)])
+        self.assertEqual(index.complete("BIO", limit=1), [("Biology", 6)])
+        self.assertEqual(index.complete("to bio"), [("Intro to Biology", 2)])
+        self.assertEqual(index.complete("physics"), [])
+        self.assertEqual(index.complete(""), index.values[:10])
+
+    def test_endpoint_sees_new_subjects_after_a_write(self):
+        user = make_user('suggest@x.test')
+        self.client.force_login(user)
+        url = reverse('notes:autocomplete')
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(user=user, title="Lab", subject="Organic Chemistry")
+            Note.objects.create(user=user, title="N", content="", subject="Chemistry", tags="lab, exam")
+        self.assertEqual(self.client.get(url, {'q': 'chem'}).json()['results'], [
+            {'value': "Chemistry", 'count': 1}, {'value': "Organic Chemistry", 'count': 1},
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(user=user, title="Quiz", subject="Calculus")
+        self.assertEqual(self.client.get(url, {'q': 'cal'}).json()['results'], [{'value': "Calculus", 'count': 1}])
+        tags = self.client.get(url, {'field': 'tag', 'q': 'ex'}).json()['results']
+        self.assertEqual(tags, [{'value': "exam", 'count': 1}])
+        self.assertEqual(self.client.get(url, {'field': 'title'}).status_code, 400)
+
+
+@page_settings
+class RelatedNotesTests(TestCase):
+    """TF-IDF related-note suggestions (notes/related.py)."""
+
+    def setUp(self):
+        self.user = make_user('related@x.test')
+        self.notes = {title: Note.objects.create(user=self.user, title=title, content=content, tags=tags)
+                      for title, content, tags in [
+                          ("Photosynthesis", "Chlorophyll absorbs light; the Calvin cycle fixes carbon.", "biology"),
+                          ("Calvin cycle", "Carbon fixation by RuBisCO in the Calvin cycle.", "biology"),
+                          ("Cell respiration", "Glycolysis and the Krebs cycle release energy.", "biology"),
+                          ("French Revolution", "The Estates-General met in 1789.", "history"),
+                      ]}
+        other = make_user('other@x.test')
+        Note.objects.create(user=other, title="Calvin cycle", content="Calvin cycle carbon fixation", tags="biology")
+        # The signals invalidate on commit, which a TestCase never reaches
+        related.invalidate(self.user.pk)
+
+    def brute_force(self, rows):
+        """Cosine similarities with the same TF-IDF weighting, computed the slow way."""
+        vectors = [dict(zip(related.term_counts(*row)[0].tolist(), related.term_counts(*row)[1].tolist()))
+                   for row in rows]
+        df = {}
+        for vector in vectors:
+            for term in vector:
+                df[term] = df.get(term, 0) + 1
+        weighted = []
+        for vector in vectors:
+            w = {t: (1 + math.log(c)) * (math.log((1 + len(rows)) / (1 + df[t])) + 1) for t, c in vector.items()}
+            norm = math.sqrt(sum(x * x for x in w.values()))
+            weighted.append({t: x / norm for t, x in w.items()})
+        return [[sum(a.get(t, 0) * x for t, x in b.items()) for b in weighted] for a in weighted]
+
+    def test_matrix_matches_brute_force(self):
+        notes = sorted(self.notes.values(), key=lambda n: n.pk)
+        matrix = related.build_matrix(self.user.pk)
+        expected = self.brute_force([(n.title, n.content, n.tags) for n in notes])
+        for i, note in enumerate(notes):
+            scores = dict(matrix.similar(note.pk, k=10))
+            for j, other in enumerate(notes):
+                if i != j and expected[i][j] >= related.MIN_SIMILARITY:
+                    self.assertAlmostEqual(scores[other.pk], expected[i][j], places=5)
+            self.assertNotIn(note.pk, scores)
+
+    def test_endpoint_ranks_the_owners_notes(self):
+        self.client.force_login(self.user)
+        url = reverse('notes:related_notes', args=[self.notes["Photosynthesis"].pk])
+        titles = [row['title'] for row in self.client.get(url).json()['related']]
+        self.assertEqual(titles[0], "Calvin cycle")
+        self.assertNotIn("French Revolution", titles)
+        self.assertEqual(len(titles), len(set(titles)))
+        self.assertEqual(self.client.get(url, {'limit': 1}).json()['related'][0]['title'], "Calvin cycle")
+
+
+class DuplicateNoteTests(TestCase):
+    """SimHash near-duplicate detection and merging (notes/duplicates.py)."""
+
+    LECTURE = (
+        "Mitosis has four phases: prophase, metaphase, anaphase and telophase. In prophase the chromatin "
+        "condenses into chromosomes, each made of two sister chromatids joined at the centromere, and the "
+        "nuclear envelope starts to break down. The spindle forms from microtubules growing out of the "
+        "centrosomes at opposite poles of the cell. During metaphase the chromosomes line up at the cell's "
+        "equator, attached to spindle fibres at their kinetochores. In anaphase the sister chromatids "
+        "separate and are pulled towards opposite poles as the fibres shorten. In telophase a nuclear "
+        "envelope re-forms around each set of chromosomes, which decondense. Cytokinesis then divides the "
+        "cytoplasm: animal cells pinch in with a cleavage furrow, plant cells build a cell plate. The result "
+        "is two daughter cells, genetically identical to each other and to the parent cell."
+    )
+
+    def setUp(self):
+        self.user = make_user('dupes@x.test')
+
+    def note(self, title, content, **fields):
+        return Note.objects.create(user=self.user, title=title, content=content, **fields)
+
+    def test_simhash_distance_tracks_edits(self):
+        base = duplicates.simhash(self.LECTURE)
+        edited = duplicates.simhash(self.LECTURE.replace("pinch in", "pinch inwards"))
+        unrelated = duplicates.simhash("The Treaty of Westphalia ended the Thirty Years' War in 1648.")
+        self.assertLessEqual(duplicates.distance(base, edited), duplicates.MAX_DISTANCE)
+        self.assertGreater(duplicates.distance(base, unrelated), duplicates.MAX_DISTANCE)
+        self.assertIsNone(duplicates.simhash("  ...  "))
+
+    def test_band_lookup_finds_every_fingerprint_within_range(self):
+        rng = random.Random(47)
+        base = rng.getrandbits(64)
+        anchor = self.note("Anchor", "x")
+        expected = set()
+        for i in range(40):
+            value = base
+            for bit in rng.sample(range(64), rng.randint(0, 9)):
+                value ^= 1 << bit
+            other = self.note(f"Variant {i}", "x")
+            NoteFingerprint.objects.filter(note=other).update(
+                simhash=duplicates._signed(value),
+                **{f'band{b}': band for b, band in enumerate(duplicates.bands(value))},
+            )
+            if duplicates.distance(base, value) <= duplicates.MAX_DISTANCE:
+                expected.add(other.pk)
+        NoteFingerprint.objects.filter(note=anchor).update(
+            simhash=duplicates._signed(base), **{f'band{b}': band for b, band in enumerate(duplicates.bands(base))},
+        )
+        anchor = Note.objects.get(pk=anchor.pk)
+        self.assertTrue(expected)
+        self.assertEqual({note.pk for note in duplicates.near_duplicates(anchor)}, expected)
+
+    def test_groups_and_merge(self):
+        first = self.note("Mitosis", self.LECTURE, tags="biology, cells")
+        second = self.note("Mitosis (copy)", self.LECTURE.replace("pinch in", "pinch inwards"), tags="Cells, exam",
+                           subject="Biology")
+        self.note("Treaty", "The Treaty of Westphalia ended the Thirty Years' War in 1648.")
+        self.assertEqual(duplicates.duplicate_groups(self.user.pk), [[first.pk, second.pk]])
+        self.assertEqual(duplicates.near_duplicates(first), [second])
+
+        duplicates.merge_notes(first, [second])
+        first.refresh_from_db()
+        self.assertEqual(first.tags, "biology, cells, exam")
+        self.assertEqual(first.subject, "Biology")
+        self.assertFalse(Note.objects.filter(title="Mitosis (copy)").exists())
+        self.assertEqual(duplicates.duplicate_groups(self.user.pk), [])
+
+
+class MarkdownRenderingTests(TestCase):
+    """Sanitized, stored Markdown rendering of notes (notes/rendering.py)."""
+
+    def setUp(self):
+        self.user = make_user('markdown@x.test')
+
+    def test_markdown_features(self):
+        html = rendering.render_markdown("# Title\n\n**bold** ~~gone~~\nnext line\n\n| a | b |\n|:-|-:|\n| 1 | 2 |")
+        self.assertIn('<h1>Title</h1>', html)
+        self.assertIn('<strong>bold</strong> <s>gone</s><br>', html)
+        self.assertIn('<td style="text-align:right">2</td>', html)
+
+    def elements(self, html):
+        """``(tag, attrs)`` for every element the browser would create from `html`."""
+        found = []
+        parser = HTMLParser()
+        parser.handle_starttag = lambda tag, attrs: found.append((tag, dict(attrs)))
+        parser.feed(html)
+        return found
+
+    def test_scripts_and_handlers_are_stripped(self):
+        attacks = [
+            '<script>alert(1)</script>',
+            '<img src=x onerror=alert(1)>',
+            '[click](javascript:alert(1))',
+            '![x](javascript:alert(1))',
+            '[data](data:text/html;base64,PHNjcmlwdD4=)',
+            '<a href="https://ok.test" onclick="steal()">x</a>',
+            '<style>body{display:none}</style>',
+            '| a |\n|---|\n| b |\n\n<td style="background:url(x)">',
+        ]
+        for source in attacks:
+            for tag, attrs in self.elements(rendering.render_markdown(source)):
+                self.assertIn(tag, rendering.ALLOWED_TAGS, source)
+                self.assertLessEqual(set(attrs) - {'rel'}, rendering.ALLOWED_ATTRIBUTES.get(tag, set()), source)
+                for name in ('href', 'src'):
+                    if name in attrs:
+                        self.assertRegex(attrs[name], r'^(https?:|mailto:)', source)
+                self.assertNotIn('url(', attrs.get('style') or '', source)
+        self.assertEqual(self.elements(rendering.render_markdown('[site](https://example.com)')), [
+            ('p', {}), ('a', {'href': 'https://example.com', 'rel': 'noopener noreferrer nofollow'}),
+        ])
+
+    def test_rendering_follows_the_content(self):
+        note = Note.objects.create(user=self.user, title="N", content="*one*")
+        self.assertEqual(RenderedNote.objects.get(note=note).html, '<p><em>one</em></p>\n')
+        # Changed without signals: stale until shown
+        Note.objects.filter(pk=note.pk).update(content=b'\x00**two**')
+        note = Note.objects.select_related('rendered').get(pk=note.pk)
+        self.assertEqual(rendering.rendered_html(note), '<p><strong>two</strong></p>\n')
+        self.assertEqual(RenderedNote.objects.get(note=note).content_hash, rendering.content_hash("**two**"))
+
+    def test_render_stale_batches_with_and_without_upserts(self):
+        notes = [Note.objects.create(user=self.user, title=f"N{i}", content=f"v{i}") for i in range(3)]
+        RenderedNote.objects.filter(note=notes[0]).delete()
+        Note.objects.filter(pk=notes[1].pk).update(content=b'\x00_new_')
+        for supports_upsert in (True, False):
+            with self.subTest(supports_upsert=supports_upsert):
+                features = connection.features
+                with mock.patch.object(features, 'supports_update_conflicts_with_target', supports_upsert):
+                    rendering.render_stale(list(Note.objects.select_related('rendered').order_by('pk')))
+                self.assertEqual(
+                    list(RenderedNote.objects.order_by('note_id').values_list('html', flat=True)),
+                    ['<p>v0</p>\n', '<p><em>new</em></p>\n', '<p>v2</p>\n'],
+                )
+                RenderedNote.objects.filter(note=notes[2]).update(content_hash='stale')
+
+
+@page_settings
+class CalendarFeedTests(TestCase):
+    """iCalendar feed and its validators (notes/ical.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('ical@x.test', calendar_token=ical.new_token())
+        self.url = reverse('notes:calendar_feed', args=[self.user.calendar_token])
+        self.task = Task.objects.create(user=self.user, title="Essay", due_date=timezone.now() + timedelta(days=2))
+
+    def fetch(self, **headers):
+        response = self.client.get(self.url, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body.decode('utf-8')
+
+    def test_reminder_changes_leave_the_task_alone(self):
+        updated_at = Task.objects.get(pk=self.task.pk).updated_at
+        reminder = Reminder.objects.create(task=self.task, remind_time=self.task.due_date - timedelta(hours=1))
+        reminder.remind_time -= timedelta(hours=1)
+        reminder.save()
+        reminder.delete()
+        self.assertEqual(Task.objects.get(pk=self.task.pk).updated_at, updated_at)
+
+    def test_reminder_changes_change_the_etag(self):
+        tags = [self.fetch()[0]['ETag']]
+        reminder = Reminder.objects.create(task=self.task, remind_time=self.task.due_date - timedelta(hours=1))
+        response, body = self.fetch()
+        tags.append(response['ETag'])
+        self.assertIn(f'UID:reminder-{reminder.pk}@stunotes', body)
+        reminder.remind_time -= timedelta(hours=1)
+        reminder.save()
+        tags.append(self.fetch()[0]['ETag'])
+        reminder_id = reminder.pk
+        reminder.delete()
+        response, body = self.fetch()
+        tags.append(response['ETag'])
+        self.assertNotIn(f'UID:reminder-{reminder_id}@stunotes', body)
+        self.assertEqual(len(set(tags)), 4)
+        # Not a delta-sync kind
+        self.assertEqual(sync.changes_since(self.user, timezone.now() - timedelta(minutes=1))['tasks']['deleted'], [])
+
+    def test_unchanged_feed_is_not_modified(self):
+        response, body = self.fetch()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertEqual(self.fetch(HTTP_IF_NONE_MATCH=response['ETag'])[0].status_code, 304)
+        # Served from the cache the second time
+        cached = self.client.get(self.url)
+        self.assertFalse(cached.streaming)
+        self.assertEqual(cached.content.decode('utf-8'), body)
+
+    def test_series_with_stored_occurrences(self):
+        start = timezone.make_aware(datetime(2026, 3, 2, 9))
+        series = Task.objects.create(user=self.user, title="Lab", due_date=start, recurrence='weekly')
+        Task.objects.create(user=self.user, title="Lab (moved)", due_date=start + timedelta(days=8),
+                            series=series, occurrence_date=start + timedelta(days=7))
+        body = self.fetch()[1]
+        self.assertIn('RRULE:FREQ=WEEKLY;INTERVAL=1\r\n', body)
+        self.assertIn(f'EXDATE;TZID={settings.TIME_ZONE}:20260309T090000\r\n', body)
+        self.assertIn('SUMMARY:Lab (moved)\r\n', body)
+
+    def test_long_lines_are_folded(self):
+        Task.objects.filter(pk=self.task.pk).update(title="Übung " * 30)
+        body = self.fetch()[1]
+        lines = body.split('\r\n')
+        self.assertTrue(all(len(line.encode('utf-8')) <= 75 for line in lines))
+        summary = next(i for i, line in enumerate(lines) if line.startswith('SUMMARY:'))
+        unfolded = lines[summary] + ''.join(line[1:] for line in lines[summary + 1:] if line.startswith(' '))
+        self.assertEqual(unfolded, 'SUMMARY:' + "Übung " * 30)
+
+    def test_unknown_or_disabled_token(self):
+        self.assertEqual(self.client.get(reverse('notes:calendar_feed', args=['nope'])).status_code, 404)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+@page_settings
+class TaskArchiveTests(TestCase):
+    """Archival of completed tasks and the figures that count them (notes/archive.py)."""
+
+    def setUp(self):
+        self.user = make_user('archive@x.test')
+        self.now = timezone.now()
+        Task.objects.create(user=self.user, title="Open")
+        self.old = self.completed("Old essay", days_ago=200)
+        self.completed("Recent lab", days_ago=1)
+
+    def completed(self, title, days_ago):
+        task = Task.objects.create(user=self.user, title=title, status='completed', priority='high')
+        Task.objects.filter(pk=task.pk).update(updated_at=self.now - timedelta(days=days_ago))
+        return task
+
+    def test_only_old_completed_tasks_are_archived(self):
+        self.assertEqual(archive.archive_completed_tasks(now=self.now), 1)
+        self.assertEqual(list(ArchivedTask.objects.values_list('pk', 'title')), [(self.old.pk, "Old essay")])
+        self.assertFalse(Task.objects.filter(pk=self.old.pk).exists())
+        self.assertEqual(archive.archive_completed_tasks(now=self.now), 0)
+        with override_settings(TASK_ARCHIVE_AFTER_DAYS=0):
+            self.assertIsNone(archive.archivable(self.now))
+
+    def test_history_pages_through_both_tables(self):
+        for days_ago in (150, 120, 100):
+            self.completed(f"Done {days_ago}", days_ago)
+        archive.archive_completed_tasks(now=self.now)
+        titles, cursor = [], None
+        while True:
+            rows, cursor = archive.completed_history(self.user, cursor=cursor, page_size=2)
+            titles += [row.title for row in rows]
+            if cursor is None:
+                break
+        self.assertEqual(titles, ["Recent lab", "Done 100", "Done 120", "Done 150", "Old essay"])
+
+        self.client.force_login(self.user)
+        url = reverse('notes:completed_tasks_history')
+        page = self.client.get(url).json()
+        self.assertEqual([(row['title'], row['archived']) for row in page['results']][:2],
+                         [("Recent lab", False), ("Done 100", True)])
+        self.assertIsNone(page['next_cursor'])
+
+    def test_counts_include_archived_tasks(self):
+        archive.archive_completed_tasks(now=self.now)
+        self.client.force_login(self.user)
+        profile = self.client.get(reverse('notes:profile_view')).context
+        self.assertEqual((profile['total_tasks_created'], profile['tasks_completed']), (3, 2))
+        settings_page = self.client.get(reverse('notes:settings_page')).context
+        self.assertEqual((settings_page['total_tasks_count'], settings_page['completed_tasks']), (3, 2))
+        # The sidebar total matches the profile on every page
+        for name in ('notes:home', 'notes:notes_list', 'notes:duplicate_notes', 'notes:calendar'):
+            self.assertEqual(self.client.get(reverse(name)).context['total_tasks_count'], 3, name)
+
+        admin = make_user('staff@x.test', is_staff=True)
+        self.client.force_login(admin)
+        dashboard = self.client.get(reverse('notes:admin_dashboard')).context
+        self.assertEqual((dashboard['total_tasks'], dashboard['completed_tasks'], dashboard['high_priority_tasks']),
+                         (3, 2, 2))
+
+    def test_async_counts_include_archived_tasks(self):
+        archive.archive_completed_tasks(now=self.now)
+        factory = RequestFactory()
+
+        def context(view, user):
+            request = factory.get('/')
+            request.user, request.session = user, {}
+            with mock.patch.object(async_views, '_arender', mock.AsyncMock(side_effect=lambda r, t, c: c)):
+                return async_to_sync(view)(request)
+
+        profile = context(async_views.profile_view, self.user)
+        self.assertEqual((profile['total_tasks_created'], profile['tasks_completed']), (3, 2))
+        home = context(async_views.home, self.user)
+        self.assertEqual((home['total_tasks'], home['total_tasks_count'], home['completed_tasks']), (3, 3, 2))
+        dashboard = context(async_views.admin_dashboard, make_user('staff@x.test', is_staff=True))
+        self.assertEqual((dashboard['total_tasks'], dashboard['completed_tasks'], dashboard['high_priority_tasks']),
+                         (3, 2, 2))
+
+
+class AsyncViewURLs:
+    """URLconf mounting the coroutine views, as ASYNC_VIEWS does under ASGI."""
+    urlpatterns = [
+        path('async/home/', async_views.home),
+        path('async/profile/edit/', async_views.edit_profile),
+        path('', include('notes.urls')),
+    ]
+
+
+@page_settings
+@override_settings(ROOT_URLCONF=AsyncViewURLs)
+class AsyncViewTests(TestCase):
+    """Coroutine dashboard and profile views, driven through AsyncClient (notes/async_views.py)."""
+
+    def setUp(self):
+        self.storage = temporary_media(self)
+        self.user = make_user('async@x.test')
+        Task.objects.create(user=self.user, title="Read", status='pending')
+        Task.objects.create(user=self.user, title="Done", status='completed')
+        Note.objects.create(user=self.user, title="Notes", content="x")
+        self.async_client.force_login(self.user)
+
+    async def test_home(self):
+        response = await self.async_client.get('/async/home/')
+        self.assertEqual(response.status_code, 200)
+        figures = ('total_tasks', 'completed_tasks', 'pending_tasks', 'total_notes')
+        self.assertEqual([response.context[key] for key in figures], [2, 1, 1, 1])
+        self.assertEqual([task.title for task in response.context['tasks']], ["Read"])
+
+    async def test_upload_replaces_the_thumbnails(self):
+        # Thumbnails left from a picture that is gone from the row
+        self.storage.save('profile_pics/thumbs/stale_64.jpg', image_upload())
+        await User.objects.filter(pk=self.user.pk).aupdate(
+            profile_pic_thumbs={'64': {'name': 'profile_pics/thumbs/stale_64.jpg', 'url': '/media/stale.jpg'}})
+        data = {'full_name': "Async User", 'email': 'async@x.test', 'bio': "", 'theme': 'dark'}
+
+        response = await self.async_client.post('/async/profile/edit/', {**data, 'profile_pic': image_upload()})
+        self.assertRedirects(response, reverse('notes:profile_view'), fetch_redirect_response=False)
+        user = await User.objects.aget(pk=self.user.pk)
+        self.assertFalse(self.storage.exists('profile_pics/thumbs/stale_64.jpg'))
+        self.assertEqual(sorted(user.profile_pic_thumbs, key=int), [str(size) for size in THUMBNAIL_SIZES])
+        first = user.profile_pic.name, [entry['name'] for entry in user.profile_pic_thumbs.values()]
+
+        response = await self.async_client.post('/async/profile/edit/',
+                                                 {**data, 'profile_pic': image_upload('new.png', color='red')})
+        self.assertRedirects(response, reverse('notes:profile_view'), fetch_redirect_response=False)
+        user = await User.objects.aget(pk=self.user.pk)
+        self.assertEqual((user.full_name, user.theme), ("Async User", 'dark'))
+        self.assertTrue(self.storage.exists(user.profile_pic.name))
+        self.assertFalse(any(self.storage.exists(name) for name in [first[0], *first[1]]))
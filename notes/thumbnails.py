@@ -0,0 +1,97 @@
+"""
+Profile picture thumbnails.
+
+Avatars are shown at 32-144px but the original upload can be several MB.
+At upload time we render a few square sizes, store them next to the original
+and keep their URLs on the user row (`User.profile_pic_thumbs`), so templates
+can pick a small image without asking the storage backend anything.
+"""
+
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+
+# Square edge lengths (px) generated for every upload. Templates ask for the
+# displayed size times two (for high-DPI screens) and get the closest match.
+THUMBNAIL_SIZES = (64, 128, 256)
+
+THUMBNAIL_DIR = 'profile_pics/thumbs/'
+THUMBNAIL_QUALITY = 85
+
+
+def pick_size(requested, available=THUMBNAIL_SIZES):
+    """Return the smallest available size >= requested, else the largest one."""
+    available = sorted(int(s) for s in available)
+    if not available:
+        return None
+    for size in available:
+        if size >= requested:
+            return size
+    return available[-1]
+
+
+def default_thumb_url(default_url, size):
+    """
+    Ask Cloudinary to resize the shared default avatar on its CDN by inserting
+    a transformation segment into the URL. Non-Cloudinary URLs are returned as is.
+    """
+    marker = '/image/upload/'
+    if marker not in default_url:
+        return default_url
+    return default_url.replace(marker, f'{marker}c_fill,w_{size},h_{size}/', 1)
+
+
+def _render(image, size):
+    """Crop/resize an already-opened image to a size x size JPEG."""
+    from PIL import Image, ImageOps
+
+    thumb = ImageOps.fit(image, (size, size), Image.LANCZOS)
+    buf = BytesIO()
+    thumb.save(buf, format='JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+    return buf.getvalue()
+
+
+def delete_profile_thumbnails(user):
+    """Remove stored thumbnails for `user` (storage errors are ignored)."""
+    storage = user._meta.get_field('profile_pic').storage
+    for entry in (user.profile_pic_thumbs or {}).values():
+        name = entry.get('name') if isinstance(entry, dict) else None
+        if not name:
+            continue
+        try:
+            storage.delete(name)
+        except Exception:
+            pass
+    user.profile_pic_thumbs = {}
+
+
+def generate_profile_thumbnails(user, source=None):
+    """
+    Render and store every size in THUMBNAIL_SIZES for the user's profile picture.
+
+    `source` may be the freshly uploaded file so we don't download the original
+    back from storage. Returns the new `{size: {'name', 'url'}}` mapping (also
+    assigned to `user.profile_pic_thumbs`; the caller saves the user).
+    """
+    delete_profile_thumbnails(user)
+    if not user.profile_pic or not getattr(user.profile_pic, 'name', None):
+        return {}
+
+    # Pillow is only needed on upload; keep it out of the cold-start import path
+    from PIL import Image, ImageOps
+
+    fh = source or user.profile_pic
+    fh.seek(0)
+    with Image.open(fh) as img:
+        img = ImageOps.exif_transpose(img).convert('RGB')
+        storage = user.profile_pic.storage
+        stem = os.path.splitext(os.path.basename(user.profile_pic.name))[0]
+        thumbs = {}
+        for size in THUMBNAIL_SIZES:
+            name = storage.save(f'{THUMBNAIL_DIR}{stem}_{size}.jpg', ContentFile(_render(img, size)))
+            thumbs[str(size)] = {'name': name, 'url': storage.url(name)}
+    fh.seek(0)
+
+    user.profile_pic_thumbs = thumbs
+    return thumbs
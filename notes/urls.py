@@ -1,13 +1,21 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'notes'
 
+# Under ASGI (ASYNC_VIEWS=True) the read-heavy dashboard/profile pages use
+# the coroutine versions from async_views; WSGI keeps the sync ones.
+if settings.ASYNC_VIEWS:
+    from . import async_views as io_views
+else:
+    io_views = views
+
 urlpatterns = [
     #Home
     path('', views.landing_view, name='landing'),
     path('landing/', views.landing_view, name='landing_page'),
-    path('home/', views.home, name='home'),
+    path('home/', io_views.home, name='home'),
     
     #Settings
     path('settings/', views.settings_page, name='settings_page'),
@@ -18,6 +26,9 @@ urlpatterns = [
     path('add_note/', views.add_note, name='add_note'),
     path('note/edit/<int:note_id>/', views.edit_note, name='edit_note'),
     path('note/delete/<int:note_id>/', views.delete_note, name='delete_note'),
+    path('note/<int:note_id>/revisions/', views.note_revisions, name='note_revisions'),
+    path('note/<int:note_id>/revisions/<int:number>/', views.note_revision, name='note_revision'),
+    path('note/<int:note_id>/related/', views.related_notes, name='related_notes'),
 
     #Login and Register URLs
     path('login/', views.login_view, name='login'),
@@ -28,18 +39,23 @@ urlpatterns = [
     path('delete/<int:task_id>/', views.delete_task, name='delete_task'),
     path('edit/<int:task_id>/', views.edit_task, name='edit_task'),
     path('toggle/<int:task_id>/', views.toggle_task_status, name='toggle_task_status'),
+    path('task/<int:task_id>/occurrence/<int:timestamp>/complete/', views.complete_occurrence, name='complete_occurrence'),
+    path('task/<int:task_id>/occurrence/<int:timestamp>/edit/', views.edit_occurrence, name='edit_occurrence'),
     
     #Profile URLs
-    path('profile/', views.profile_view, name='profile_view'), 
-    path('profile/edit/', views.edit_profile, name='edit_profile'),
+    path('profile/', io_views.profile_view, name='profile_view'), 
+    path('profile/edit/', io_views.edit_profile, name='edit_profile'),
     
     # Notes list
     path('notes/', views.notes_list, name='notes_list'),
+    path('notes/duplicates/', views.duplicate_notes, name='duplicate_notes'),
+    path('notes/duplicates/merge/', views.merge_duplicate_notes, name='merge_duplicate_notes'),
 
     # Admin URLs
-    path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-dashboard/', io_views.admin_dashboard, name='admin_dashboard'),
     # Use non-conflicting prefix to avoid clashing with Django Admin at /admin/
     path('admin-requests/', views.admin_requests_list, name='admin_requests_list'),
+    path('admin-requests/batch/', views.batch_review_admin_requests, name='batch_review_admin_requests'),
     path('admin-requests/<int:request_id>/approve/', views.approve_admin_request, name='approve_admin_request'),
     path('admin-requests/<int:request_id>/reject/', views.reject_admin_request, name='reject_admin_request'),
     path('add-user/', views.add_user, name='add_user'),  # ✅ Added earlier
@@ -49,4 +65,15 @@ urlpatterns = [
     
     # Calendar
     path('calendar/', views.calendar_view, name='calendar'),
+    # Subscribed to by calendar apps; the token is the credential
+    path('calendar/feed/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
+
+    # Dashboard delta sync (polled by static/notes/js/sync.js)
+    path('api/sync/', views.sync_changes, name='sync_changes'),
+    # Completed-task history, live and archived (Completed Tasks panel on the dashboard)
+    path('api/tasks/completed/', views.completed_tasks_history, name='completed_tasks_history'),
+    # Subject/tag suggestions (static/notes/js/autocomplete.js)
+    path('api/autocomplete/', views.autocomplete_suggestions, name='autocomplete'),
+    # Background jobs (Vercel cron)
+    path('cron/purge-accounts/', views.cron_purge_accounts, name='cron_purge_accounts'),
 ]
\ No newline at end of file
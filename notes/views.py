@@ -3,14 +3,24 @@ from django.contrib import messages
 from django.contrib.auth import get_user_model, login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.views.decorators.http import require_POST
-from django.http import JsonResponse
+from django.views.decorators.http import require_POST, require_safe
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, urlencode
 from django.urls import reverse
+from django.db import transaction
 from django.db.models import Count, Q
-from datetime import timedelta
+from datetime import datetime, time, timedelta
+from time import monotonic
 from .models import Task, Note, User, Reminder
 from .models import AdminRequest
-from .forms import TaskForm, UserProfileForm, NoteForm, AdminCreationForm, AdminRequestForm
+from .forms import TaskForm, OccurrenceForm, UserProfileForm, NoteForm, AdminCreationForm, AdminRequestForm
+from .thumbnails import generate_profile_thumbnails, delete_profile_thumbnails
+from .ratelimit import check_rate_limit, reset_rate_limit
+from .account_deletion import schedule_account_deletion, purge_pending_deletions
+from .pagination import keyset_page
+from .routers import read_only
+from . import archive, autocomplete, duplicates, facets, ical, recurrence, related, rendering, revisions, sync
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
 
@@ -27,6 +37,11 @@ def register_view(request):
         password1 = request.POST.get("password1")
         password2 = request.POST.get("password2")
 
+        # Throttle before create_user hashes the password
+        if not check_rate_limit(request, 'register', email=email):
+            messages.error(request, "Too many registration attempts. Please try again later.")
+            return redirect("notes:register")
+
         # Password match check
         if password1 != password2:
             messages.error(request, "Passwords do not match!")
@@ -77,9 +92,15 @@ def login_view(request):
         email = request.POST.get("email")
         password = request.POST.get("password")
 
+        # Throttle before authenticate() runs the (slow) password hasher
+        if not check_rate_limit(request, 'login', email=email):
+            messages.error(request, "Too many login attempts. Please wait a few minutes and try again.")
+            return redirect("notes:login")
+
         # Authenticate user
         user = authenticate(request, email=email, password=password)
         if user:
+            reset_rate_limit(request, 'login', email=email)
             login(request, user)
             messages.success(request, "Login successful!")
             
@@ -120,51 +141,38 @@ def home(request):
     
     # Calculate overdue tasks
     now = timezone.now()
-    overdue_tasks_count = tasks.filter(
-        due_date__lt=now, 
-        status__in=['pending', 'in_progress']
-    ).count()
+    overdue_tasks_count = tasks.overdue(now).count()
     
+    # Repeating tasks: only the occurrences this page shows are expanded
+    occurrences = recurrence.dashboard_occurrences(user, now)
+
     # Get today's active tasks
-    today = now.date()
-    today_tasks = tasks.filter(
-        due_date__date=today,
-        status__in=['pending', 'in_progress']
-    ).order_by('due_date')
+    today_tasks = sorted([*tasks.due_today(now), *occurrences['today']], key=lambda t: t.due_date)
     
     # Total notes count
     total_notes = Note.objects.filter(user=user).count()
     
-    # Get completed tasks history
-    completed_tasks_list = tasks.filter(status='completed').only('id','title','updated_at').order_by('-updated_at')
+    # Completed tasks history: the first page, live and archived (notes/archive.py)
+    completed_tasks_list, completed_next_cursor = archive.completed_history(user)
+    archived_tasks_count = archive.archived_count(user)
     
     # Get pending tasks list
     pending_tasks_list = tasks.filter(status='pending').only('id','title','due_date').order_by('due_date')
     
     # Get overdue tasks list
-    overdue_tasks_list = tasks.filter(
-        due_date__lt=now,
-        status__in=['pending', 'in_progress']
-    ).only('id','title','due_date').order_by('due_date')
+    overdue_tasks_list = tasks.overdue(now).only('id','title','due_date').order_by('due_date')
     
     # Get all notes list
     all_notes_list = Note.objects.filter(user=user).only('id','title','subject','created_at').order_by('-created_at')
     
-    # Get unique subjects for filter dropdown
-    unique_subjects = Note.objects.filter(
-        user=user, 
-        subject__isnull=False
-    ).exclude(
-        subject=''
-    ).values_list('subject', flat=True).distinct().order_by('subject')
+    # Subjects for the filter dropdown, from the facet table (notes/facets.py)
+    unique_subjects = facets.user_subjects(user)
 
     # Get upcoming tasks due within 24 hours
-    next_24h = now + timedelta(hours=24)
-    upcoming_tasks = tasks.filter(
-        due_date__gte=now,
-        due_date__lte=next_24h,
-        status__in=['pending', 'in_progress']
-    ).only('id','title','due_date').order_by('due_date')
+    upcoming_tasks = sorted(
+        [*tasks.upcoming(24, now).only('id','title','due_date'), *occurrences['upcoming']],
+        key=lambda t: t.due_date,
+    )
     
     # Detect if editing
     edit_task_id = request.GET.get("edit")
@@ -196,27 +204,29 @@ def home(request):
         form = TaskForm()
 
     context = {
-        'tasks': tasks.exclude(status='completed')[:10],
+        'tasks': [*occurrences['next'], *tasks.active().with_is_overdue(now)[:10]],
         'notes': notes,
         'form': form,
         'edit_form': edit_form,
         'task_to_edit': task_to_edit,
-        'total_tasks': total_tasks,
-        'completed_tasks': completed_tasks_count,
+        'total_tasks': total_tasks + archived_tasks_count,
+        'completed_tasks': completed_tasks_count + archived_tasks_count,
         'pending_tasks': pending_tasks_count,
         'in_progress_tasks': in_progress_tasks,
         'overdue_tasks': overdue_tasks_count,
         'total_notes': total_notes,
         'today_tasks': today_tasks,
         'completed_tasks_list': completed_tasks_list,
+        'completed_next_cursor': completed_next_cursor,
         'pending_tasks_list': pending_tasks_list,
         'overdue_tasks_list': overdue_tasks_list,
         'all_notes_list': all_notes_list,
         'upcoming_tasks': upcoming_tasks,
         'unique_subjects': unique_subjects,
-        'total_tasks_count': total_tasks,
+        'total_tasks_count': total_tasks + archived_tasks_count,
         'total_notes_sidebar': total_notes,
         'view_as_user': request.session.get('view_as_user', False),
+        **sync.page_context(now),
     }
 
     return render(request, "home.html", context)
@@ -237,6 +247,10 @@ def add_user(request):
         password = request.POST.get("password")
         confirm_password = request.POST.get("confirm_password")
         
+        if not check_rate_limit(request, 'add_user', email=request.user.email):
+            messages.error(request, "Too many accounts created recently. Please try again later.")
+            return redirect("notes:admin_dashboard")
+        
         # Validate passwords match
         if password != confirm_password:
             messages.error(request, "Passwords do not match!")
@@ -283,8 +297,9 @@ def delete_user(request, user_id):
         try:
             user_to_delete = get_object_or_404(User, id=user_id)
             user_name = user_to_delete.full_name or user_to_delete.email
-            user_to_delete.delete()
-            messages.success(request, f"User '{user_name}' has been deleted successfully!")
+            # Deactivate now; their data is purged in the background
+            schedule_account_deletion(user_to_delete, requested_by=request.user)
+            messages.success(request, f"User '{user_name}' has been deactivated and will be deleted shortly.")
         except Exception as e:
             messages.error(request, f"Error deleting user: {str(e)}")
         
@@ -293,6 +308,7 @@ def delete_user(request, user_id):
     return redirect("notes:admin_dashboard")
 
 
+@read_only
 @login_required
 def admin_dashboard(request):
     """
@@ -318,14 +334,12 @@ def admin_dashboard(request):
     all_tasks = Task.objects.all()
     all_notes = Note.objects.all()
     
-    # Task statistics
-    total_tasks = all_tasks.count()
-    completed_tasks = all_tasks.filter(status='completed').count()
+    # Task statistics; archived tasks (notes/archive.py) are completed ones
+    archived = archive.archived_totals()
+    total_tasks = all_tasks.count() + archived['total']
+    completed_tasks = all_tasks.filter(status='completed').count() + archived['total']
     pending_tasks = all_tasks.filter(status='pending').count()
-    overdue_tasks = all_tasks.filter(
-        due_date__lt=timezone.now(),
-        status__in=['pending', 'in_progress']
-    ).count()
+    overdue_tasks = all_tasks.overdue().count()
     
     # Note statistics
     total_notes = all_notes.count()
@@ -342,9 +356,9 @@ def admin_dashboard(request):
     ).order_by('-task_count')[:10]
     
     # Tasks by priority
-    high_priority_tasks = all_tasks.filter(priority='high').count()
-    medium_priority_tasks = all_tasks.filter(priority='medium').count()
-    low_priority_tasks = all_tasks.filter(priority='low').count()
+    high_priority_tasks = all_tasks.filter(priority='high').count() + archived['high']
+    medium_priority_tasks = all_tasks.filter(priority='medium').count() + archived['medium']
+    low_priority_tasks = all_tasks.filter(priority='low').count() + archived['low']
     
     # Get date range for activity chart (last 7 days) using local timezone
     # Use explicit start/end boundaries per day to avoid UTC vs local off-by-one issues
@@ -507,28 +521,96 @@ def edit_task(request, task_id):
     return render(request, "edit_task.html", {"form": form, "task": task})
 
 
+def _series_occurrence(request, task_id, timestamp):
+    """The user's series and the date of its occurrence at `timestamp` (404 if none)."""
+    series = get_object_or_404(Task.objects.series(), id=task_id, user=request.user)
+    value = recurrence.occurrence_from_timestamp(series, timestamp)
+    if value is None:
+        raise Http404("No such occurrence.")
+    return series, value
+
+
 @login_required
-def profile_view(request):
+@require_POST
+def complete_occurrence(request, task_id, timestamp):
     """
-    Renders the user's profile page and calculates user statistics.
+    Marks one occurrence of a repeating task as complete, storing it as its own task.
+    """
+    series, value = _series_occurrence(request, task_id, timestamp)
+    recurrence.materialize_occurrence(series, value, status='completed')
+    messages.success(request, f"Task '{series.title}' marked as complete! 🎉")
+    return redirect('notes:home')
+
+
+@login_required
+def edit_occurrence(request, task_id, timestamp):
+    """
+    Edits one occurrence of a repeating task. Saving stores it as its own task;
+    the series and its other occurrences are left alone.
+    """
+    series, value = _series_occurrence(request, task_id, timestamp)
+    stored = Task.objects.filter(series=series, occurrence_date=value, user=request.user).first()
+    if stored is not None:
+        # Already has its own row: edit that like any other task
+        return redirect('notes:edit_task', task_id=stored.id)
+
+    occurrence = recurrence.Occurrence(series, value, timezone.now())
+    panel_mode = request.GET.get('panel') == '1' or request.POST.get('panel') == '1' or request.headers.get('x-requested-with') == 'XMLHttpRequest'
+
+    if request.method == "POST":
+        form = OccurrenceForm(request.POST, instance=Task(user=request.user, series=series, occurrence_date=value))
+        if form.is_valid():
+            form.save()
+            messages.success(request, "Task updated successfully!")
+            if panel_mode:
+                return redirect('notes:calendar')
+            return redirect('notes:home')
+    else:
+        form = OccurrenceForm(instance=Task(
+            title=series.title, description=series.description, subject=series.subject,
+            priority=series.priority, due_date=value,
+        ))
+
+    context = {
+        "form": form,
+        "task": occurrence,
+        "form_action": reverse('notes:edit_occurrence', args=[series.id, occurrence.timestamp]),
+    }
+    if panel_mode:
+        return render(request, "includes/edit_task_panel.html", context)
+
+    return render(request, "edit_task.html", context)
+
+
+def fill_display_names(user):
+    """
+    If first/last name are not populated but a full_name exists, derive
+    reasonable first and last name values for display (not persisted).
     """
-    user = request.user
-    # If first/last name are not populated but a full_name exists,
-    # derive reasonable first and last name values for display.
     try:
         if (not getattr(user, 'first_name', None) or not getattr(user, 'last_name', None)) and getattr(user, 'full_name', None):
             parts = user.full_name.strip().split()
             if parts:
-                # assign non-persisted attributes for template rendering
                 user.first_name = parts[0]
                 user.last_name = ' '.join(parts[1:]) if len(parts) > 1 else ''
     except Exception:
         # be defensive; if anything goes wrong, fall back to existing attributes
         pass
+
+
+@read_only
+@login_required
+def profile_view(request):
+    """
+    Renders the user's profile page and calculates user statistics.
+    """
+    user = request.user
+    fill_display_names(user)
     
-    # Calculate Task Statistics
-    total_tasks = Task.objects.filter(user=user).count()
-    completed_tasks = Task.objects.filter(user=user, status='completed').count()
+    # Calculate Task Statistics, archived (completed) tasks included
+    archived_tasks = archive.archived_count(user)
+    total_tasks = Task.objects.filter(user=user).count() + archived_tasks
+    completed_tasks = Task.objects.filter(user=user, status='completed').count() + archived_tasks
     
     # Calculate Note Statistics
     total_notes = Note.objects.filter(user=user).count()
@@ -549,17 +631,7 @@ def edit_profile(request):
     Handles displaying and processing the User Profile edit form.
     """
     user = request.user
-    # If first/last name are not populated but a full_name exists,
-    # derive reasonable first and last name values for display while editing.
-    try:
-        if (not getattr(user, 'first_name', None) or not getattr(user, 'last_name', None)) and getattr(user, 'full_name', None):
-            parts = user.full_name.strip().split()
-            if parts:
-                # assign non-persisted attributes so templates can read them
-                user.first_name = parts[0]
-                user.last_name = ' '.join(parts[1:]) if len(parts) > 1 else ''
-    except Exception:
-        pass
+    fill_display_names(user)
     
     if request.method == "POST":
         # Allow removing current profile picture without changing other fields
@@ -572,9 +644,10 @@ def edit_profile(request):
                         old.delete(save=False)
                     except Exception:
                         pass
+                delete_profile_thumbnails(user)
                 # Set to None/blank - the profile_pic_url property will handle showing default
                 user.profile_pic = None
-                user.save(update_fields=['profile_pic'])
+                user.save(update_fields=['profile_pic', 'profile_pic_thumbs'])
                 messages.success(request, "Profile picture removed. You can upload a new one.")
             except Exception:
                 messages.error(request, "Failed to remove profile picture. Please try again.")
@@ -598,6 +671,7 @@ def edit_profile(request):
                         old.delete(save=False)
                     except Exception:
                         pass
+                delete_profile_thumbnails(profile)
             profile.first_name = first_name
             profile.last_name = last_name
             full_from_post = request.POST.get('full_name', '').strip()
@@ -607,6 +681,13 @@ def edit_profile(request):
                 profile.full_name = (first_name + (' ' + last_name if first_name and last_name else '')).strip() or profile.full_name
 
             profile.save()
+            if 'profile_pic' in request.FILES:
+                # Render the avatar sizes now, from the upload still in memory
+                try:
+                    generate_profile_thumbnails(profile, source=request.FILES['profile_pic'])
+                    profile.save(update_fields=['profile_pic_thumbs'])
+                except Exception:
+                    pass
             messages.success(request, "Your profile has been updated successfully!")
             return redirect("notes:profile_view")
         else:
@@ -632,18 +713,59 @@ def edit_profile(request):
 def notes_list(request):
     """Show all notes created by the logged-in user."""
     user = request.user
-    notes = Note.objects.filter(user=user).order_by('-created_at')
-    total_notes = notes.count()
+    # Stored Markdown renderings come along in the same query
+    notes = list(Note.objects.filter(user=user).select_related('rendered').order_by('-created_at'))
+    rendering.render_stale(notes)
+    total_notes = len(notes)
     context = {
         'notes': notes,
         'total_notes': total_notes,
-        'total_tasks_count': Task.objects.filter(user=user).count(),
+        'total_tasks_count': archive.total_count(user),
         'total_notes_sidebar': total_notes,
+        'duplicate_group_count': len(duplicates.duplicate_groups(user.id)),
         'view_as_user': request.session.get('view_as_user', False),
     }
     return render(request, 'notes_list.html', context)
 
 
+@login_required
+def duplicate_notes(request):
+    """Groups of near-duplicate notes (see notes/duplicates.py) to merge."""
+    user = request.user
+    groups = duplicates.duplicate_groups(user.id)
+    notes = Note.objects.filter(user=user).in_bulk([note_id for group in groups for note_id in group])
+    total_notes = Note.objects.filter(user=user).count()
+    return render(request, 'duplicate_notes.html', {
+        'groups': [[notes[note_id] for note_id in group if note_id in notes] for group in groups],
+        'total_notes': total_notes,
+        'total_tasks_count': archive.total_count(user),
+        'total_notes_sidebar': total_notes,
+    })
+
+
+@login_required
+@require_POST
+def merge_duplicate_notes(request):
+    """Merge the selected `note` ids into the one chosen as `keep`."""
+    try:
+        keep_id = int(request.POST.get('keep', ''))
+        note_ids = {int(note_id) for note_id in request.POST.getlist('note')}
+    except ValueError:
+        messages.error(request, 'Choose the note to keep.')
+        return redirect('notes:duplicate_notes')
+    notes = Note.objects.filter(user=request.user).in_bulk(note_ids | {keep_id})
+    if keep_id not in notes:
+        messages.error(request, 'Choose the note to keep.')
+        return redirect('notes:duplicate_notes')
+    others = [note for note_id, note in sorted(notes.items()) if note_id != keep_id]
+    if not others:
+        messages.error(request, 'Select at least one other note to merge.')
+        return redirect('notes:duplicate_notes')
+    duplicates.merge_notes(notes[keep_id], others)
+    messages.success(request, f'Merged {len(others)} note(s) into "{notes[keep_id].title}".')
+    return redirect('notes:duplicate_notes')
+
+
 @login_required
 @require_POST
 def add_note(request):
@@ -656,6 +778,7 @@ def add_note(request):
         note = form.save(commit=False)
         note.user = request.user
         note.save()
+        revisions.record_revision(note)
         messages.success(request, "Note created successfully!")
 
         if is_ajax:
@@ -670,7 +793,11 @@ def add_note(request):
                 'delete_url': reverse('notes:delete_note', args=[note.id]),
             }
             total_notes = Note.objects.filter(user=request.user).count()
-            return JsonResponse({'status': 'ok', 'note': note_data, 'total_notes': total_notes})
+            similar = duplicates.near_duplicates(note)
+            return JsonResponse({
+                'status': 'ok', 'note': note_data, 'total_notes': total_notes,
+                'duplicate_of': similar[0].title if similar else None,
+            })
     else:
         messages.error(request, "Failed to create note. Please check the form.")
         if is_ajax:
@@ -682,12 +809,15 @@ def add_note(request):
 @login_required
 def edit_note(request, note_id):
     """Edit an existing note for the logged-in user."""
-    note = get_object_or_404(Note, id=note_id, user=request.user)
+    note = get_object_or_404(Note.objects.select_related('rendered'), id=note_id, user=request.user)
 
     if request.method == 'POST':
+        # The form writes into `note`; keep what it was for the revision history
+        previous = (note.title, note.content, note.updated_at)
         form = NoteForm(request.POST, instance=note)
         if form.is_valid():
             form.save()
+            revisions.record_revision(note, previous)
             messages.success(request, 'Note updated successfully!')
             return redirect('notes:home')
         else:
@@ -695,7 +825,61 @@ def edit_note(request, note_id):
     else:
         form = NoteForm(instance=note)
 
-    return render(request, 'edit_note.html', {'form': form, 'note': note})
+    return render(request, 'edit_note.html', {
+        'form': form,
+        'note': note,
+        'related_notes': related.related_notes(note),
+    })
+
+
+@login_required
+def related_notes(request, note_id):
+    """The user's notes most similar to this one (see notes/related.py), best first."""
+    note = get_object_or_404(Note.objects.only('id', 'user_id'), id=note_id, user=request.user)
+    try:
+        limit = int(request.GET.get('limit', related.DEFAULT_TOP_K))
+    except ValueError:
+        limit = related.DEFAULT_TOP_K
+    limit = max(1, min(limit, related.MAX_TOP_K))
+    return JsonResponse({'status': 'ok', 'related': [
+        {
+            'id': other.id,
+            'title': other.title,
+            'subject': other.subject,
+            'score': round(score, 4),
+            'url': reverse('notes:edit_note', args=[other.id]),
+        }
+        for other, score in related.related_notes(note, limit)
+    ]})
+
+
+@login_required
+def note_revisions(request, note_id):
+    """A note's kept revisions, newest first (content via `note_revision`)."""
+    note = get_object_or_404(Note, id=note_id, user=request.user)
+    rows = note.revisions.order_by('-number').values('number', 'title', 'created_at')
+    return JsonResponse({'status': 'ok', 'revisions': [
+        {
+            'number': row['number'],
+            'title': row['title'],
+            'created_at': row['created_at'].isoformat(),
+            'url': reverse('notes:note_revision', args=[note.id, row['number']]),
+        }
+        for row in rows
+    ]})
+
+
+@login_required
+def note_revision(request, note_id, number):
+    """The title and content of one revision of a note."""
+    note = get_object_or_404(Note, id=note_id, user=request.user)
+    revision = get_object_or_404(note.revisions.only('number', 'title', 'created_at'), number=number)
+    return JsonResponse({'status': 'ok', 'revision': {
+        'number': revision.number,
+        'title': revision.title,
+        'content': revisions.revision_content(note.id, number),
+        'created_at': revision.created_at.isoformat(),
+    }})
 
 
 @login_required
@@ -725,6 +909,11 @@ def settings_page(request):
         if 'old_password' in request.POST:
             password_form = PasswordChangeForm(user, request.POST)
             
+            # Throttle before the form checks the old password and hashes the new one
+            if not check_rate_limit(request, 'password_change', email=user.email):
+                messages.error(request, 'Too many password change attempts. Please try again later.')
+                return redirect('notes:settings_page')
+
             if password_form.is_valid():
                 user = password_form.save()
                 update_session_auth_hash(request, user)
@@ -817,11 +1006,25 @@ def settings_page(request):
                     messages.success(request, 'Your admin request has been submitted for review.')
                 else:
                     messages.error(request, 'Please provide a valid reason.')
+
+        # Calendar feed: a new secret link (turning it on), or off
+        elif 'reset_calendar_feed' in request.POST:
+            user.calendar_token = ical.new_token()
+            user.save(update_fields=['calendar_token'])
+            messages.success(request, 'Your calendar feed link is ready. Any previous link no longer works.')
+            return redirect('notes:settings_page')
+
+        elif 'disable_calendar_feed' in request.POST:
+            user.calendar_token = None
+            user.save(update_fields=['calendar_token'])
+            messages.success(request, 'Your calendar feed was turned off.')
+            return redirect('notes:settings_page')
             
     try:
         total_notes = Note.objects.filter(user=user).count()
-        total_tasks = Task.objects.filter(user=user).count()
-        completed_tasks_count = Task.objects.filter(user=user, status='completed').count()
+        archived_tasks = archive.archived_count(user)
+        total_tasks = Task.objects.filter(user=user).count() + archived_tasks
+        completed_tasks_count = Task.objects.filter(user=user, status='completed').count() + archived_tasks
     except Exception:
         total_notes = 0
         total_tasks = 0
@@ -852,6 +1055,10 @@ def settings_page(request):
         'admin_upgraded_info': admin_upgraded_info,
         'should_show_admin_success': should_show_admin_success,
         'admin_request_form': admin_request_form,
+        'calendar_feed_url': (
+            request.build_absolute_uri(reverse('notes:calendar_feed', args=[user.calendar_token]))
+            if user.calendar_token else ''
+        ),
     }
     
     return render(request, 'settings_page.html', context)
@@ -876,53 +1083,107 @@ def request_admin(request):
 
 @login_required
 def admin_requests_list(request):
-    """List pending admin requests for admins to review."""
+    """List pending admin requests for admins to review, one keyset page at a time."""
     if not (request.user.is_staff or request.user.is_superuser):
         messages.error(request, "You don't have permission to access this page.")
         return redirect('notes:home')
-    pending = AdminRequest.objects.filter(status='pending')
-    return render(request, 'admin_requests.html', {'pending_requests': pending})
+    cursor = request.GET.get('cursor')
+    pending = AdminRequest.objects.filter(status='pending').select_related('requester')
+    page, next_cursor = keyset_page(pending, cursor=cursor)
+    return render(request, 'admin_requests.html', {
+        'pending_requests': page,
+        'cursor': cursor or '',
+        'next_cursor': next_cursor,
+    })
+
+
+def review_admin_requests(request_ids, approve, reviewer):
+    """
+    Approve or reject the still-pending requests among `request_ids`.
+    Requesters and requests are each updated with a single statement, inside
+    one transaction. Returns the number of requests reviewed.
+    """
+    with transaction.atomic():
+        ids = list(
+            AdminRequest.objects.select_for_update()
+            .filter(id__in=request_ids, status='pending')
+            .values_list('id', flat=True)
+        )
+        if not ids:
+            return 0
+        if approve:
+            # Promote the requesters to admin
+            User.objects.filter(admin_requests__id__in=ids).update(is_staff=True, is_superuser=True)
+        AdminRequest.objects.filter(id__in=ids).update(
+            status='approved' if approve else 'rejected',
+            reviewed_by=reviewer,
+            reviewed_at=timezone.now(),
+        )
+    return len(ids)
+
+
+def _admin_requests_redirect(request):
+    # Return to the page the admin was reviewing
+    cursor = request.POST.get('cursor')
+    url = reverse('notes:admin_requests_list')
+    return redirect(f"{url}?{urlencode({'cursor': cursor})}" if cursor else url)
 
 
 @login_required
+@require_POST
 def approve_admin_request(request, request_id):
     if not (request.user.is_staff or request.user.is_superuser):
         messages.error(request, "You don't have permission to perform this action.")
         return redirect('notes:home')
-    req = get_object_or_404(AdminRequest, id=request_id)
-    if req.status != 'pending':
+    req = get_object_or_404(AdminRequest.objects.select_related('requester'), id=request_id)
+    if not review_admin_requests([req.id], approve=True, reviewer=request.user):
         messages.info(request, 'This request has already been processed.')
-        return redirect('notes:admin_requests_list')
-    # Approve: promote the requester to admin
+        return _admin_requests_redirect(request)
     user = req.requester
-    user.is_staff = True
-    user.is_superuser = True
-    user.save()
-    req.status = 'approved'
-    req.reviewed_by = request.user
-    req.reviewed_at = timezone.now()
-    req.save()
     messages.success(request, f'{user.full_name or user.email} is now an admin.')
-    return redirect('notes:admin_requests_list')
+    return _admin_requests_redirect(request)
 
 
 @login_required
+@require_POST
 def reject_admin_request(request, request_id):
     if not (request.user.is_staff or request.user.is_superuser):
         messages.error(request, "You don't have permission to perform this action.")
         return redirect('notes:home')
     req = get_object_or_404(AdminRequest, id=request_id)
-    if req.status != 'pending':
+    if not review_admin_requests([req.id], approve=False, reviewer=request.user):
         messages.info(request, 'This request has already been processed.')
-        return redirect('notes:admin_requests_list')
-    req.status = 'rejected'
-    req.reviewed_by = request.user
-    req.reviewed_at = timezone.now()
-    req.save()
+        return _admin_requests_redirect(request)
     messages.info(request, 'Request rejected.')
-    return redirect('notes:admin_requests_list')
+    return _admin_requests_redirect(request)
 
 
+@login_required
+@require_POST
+def batch_review_admin_requests(request):
+    """Approve or reject every request ticked on the current page."""
+    if not (request.user.is_staff or request.user.is_superuser):
+        messages.error(request, "You don't have permission to perform this action.")
+        return redirect('notes:home')
+    action = request.POST.get('action')
+    if action not in ('approve', 'reject'):
+        messages.error(request, 'Unknown action.')
+        return _admin_requests_redirect(request)
+    request_ids = [int(pk) for pk in request.POST.getlist('request_ids') if pk.isdigit()]
+    if not request_ids:
+        messages.error(request, 'Select at least one request.')
+        return _admin_requests_redirect(request)
+
+    reviewed = review_admin_requests(request_ids, approve=(action == 'approve'), reviewer=request.user)
+    skipped = len(request_ids) - reviewed
+    verb = 'approved' if action == 'approve' else 'rejected'
+    messages.success(request, f'{reviewed} request(s) {verb}.')
+    if skipped:
+        messages.info(request, f'{skipped} request(s) had already been processed.')
+    return _admin_requests_redirect(request)
+
+
+@read_only
 @login_required
 def calendar_view(request):
     """
@@ -930,7 +1191,7 @@ def calendar_view(request):
     """
     user = request.user
     # Gather tasks with due dates and reminders, but exclude tasks that are completed
-    tasks_with_due = Task.objects.filter(user=user, due_date__isnull=False).exclude(status='completed').order_by('due_date')
+    tasks_with_due = Task.objects.filter(user=user, due_date__isnull=False).active().order_by('due_date')
     # Exclude reminders that belong to completed tasks
     reminders = Reminder.objects.filter(task__user=user).exclude(task__status='completed').order_by('remind_time')
 
@@ -951,14 +1212,29 @@ def calendar_view(request):
             'url': reverse('notes:edit_task', args=[r.task.id])
         })
 
-    # Sort by datetime
-    upcoming_sorted = sorted(upcoming, key=lambda e: e['datetime'] or timezone.now())
 
     # Generate month grid for current month
     import calendar as _pycal
     now = timezone.localtime(timezone.now())
     year = now.year
     month = now.month
+
+    # Repeating tasks: expand the displayed month (and tomorrow, for the to-do list)
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    window_end = max(
+        timezone.make_aware(datetime(year + month // 12, month % 12 + 1, 1)),
+        timezone.make_aware(datetime.combine(now.date() + timedelta(days=2), time.min)),
+    )
+    for occurrence in recurrence.expand_occurrences(user, month_start, window_end, now):
+        upcoming.append({
+            'type': 'task',
+            'title': occurrence.title,
+            'datetime': occurrence.due_date,
+            'url': reverse('notes:edit_occurrence', args=[occurrence.series_id, occurrence.timestamp])
+        })
+
+    # Sort by datetime
+    upcoming_sorted = sorted(upcoming, key=lambda e: e['datetime'] or timezone.now())
     cal = _pycal.Calendar()
     month_weeks = cal.monthdayscalendar(year, month)
 
@@ -988,7 +1264,7 @@ def calendar_view(request):
         # Prepare todos for today and tomorrow
         'todos_today': [e for e in upcoming_sorted if (timezone.localtime(e['datetime']).date() == now.date())],
         'todos_tomorrow': [e for e in upcoming_sorted if (timezone.localtime(e['datetime']).date() == (now + timedelta(days=1)).date())],
-        'total_tasks_count': Task.objects.filter(user=user).count(),
+        'total_tasks_count': archive.total_count(user),
         'total_notes_sidebar': Note.objects.filter(user=user).count(),
         'view_as_user': request.session.get('view_as_user', False),
     }
@@ -998,6 +1274,36 @@ def calendar_view(request):
 
     return render(request, 'calendar.html', context)
 
+@require_safe
+def calendar_feed(request, token):
+    """
+    The user's due tasks and reminders as an iCalendar feed (see notes/ical.py).
+    Calendar apps can't sign in, so the secret token in the URL stands in for
+    the session. Unchanged feeds are answered 304 from the ETag/Last-Modified.
+    """
+    state = ical.feed_state(token)
+    if state is None:
+        raise Http404
+    user_id, last_modified = state
+    base_url = request.build_absolute_uri('/')
+    tag = ical.etag(user_id, last_modified, base_url)
+    modified = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=tag, last_modified=modified)
+    if response is None:
+        body = ical.cached_calendar(user_id, tag)
+        if body is None:
+            response = StreamingHttpResponse(ical.stream_calendar(user_id, tag, base_url), content_type=ical.CONTENT_TYPE)
+        else:
+            response = HttpResponse(body, content_type=ical.CONTENT_TYPE)
+        response['Content-Disposition'] = 'inline; filename="stunotes.ics"'
+    response['ETag'] = tag
+    if modified is not None:
+        response['Last-Modified'] = http_date(modified)
+    # Clients may keep it, but must revalidate (cheaply) before using it
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 @login_required
 def delete_account(request):
     """
@@ -1005,9 +1311,83 @@ def delete_account(request):
     """
     if request.method == 'POST':
         user = request.user
+        # Deactivate now; tasks, notes, etc. are purged in the background
+        schedule_account_deletion(user)
         logout(request)
-        user.delete()
         messages.success(request, 'Your account was permanently deleted. We are sorry to see you go!')
         return redirect('notes:home') 
         
-    return redirect('notes:settings_page')
\ No newline at end of file
+    return redirect('notes:settings_page')
+
+
+def cron_purge_accounts(request):
+    """
+    Purge data of deleted accounts in bounded batches. Called by the Vercel
+    cron job (see vercel.json), which sends `Authorization: Bearer <CRON_SECRET>`.
+    Also prunes old sync tombstones, applies the note revision retention
+    policy and archives tasks completed long ago.
+    """
+    from django.conf import settings
+
+    secret = getattr(settings, 'CRON_SECRET', '')
+    if not secret or request.headers.get('Authorization') != f'Bearer {secret}':
+        return JsonResponse({'status': 'forbidden'}, status=403)
+
+    budget = getattr(settings, 'CRON_TIME_BUDGET', 8)
+    started = monotonic()
+    purged = purge_pending_deletions(time_budget=budget)
+    tombstones_pruned = sync.prune_tombstones()
+    revisions_removed = revisions.compact_revisions()
+    # Archival gets what is left of the budget
+    tasks_archived = archive.archive_completed_tasks(time_budget=max(0, budget - (monotonic() - started)))
+    return JsonResponse({
+        'status': 'ok', 'purged': purged, 'tombstones_pruned': tombstones_pruned,
+        'revisions_removed': revisions_removed, 'tasks_archived': tasks_archived,
+    })
+
+
+@login_required
+def autocomplete_suggestions(request):
+    """
+    The user's subjects or tags starting with `?q=` (see notes/autocomplete.py).
+    `?field=` is 'subject' (default) or 'tag'; `?limit=` caps the results.
+    """
+    field = request.GET.get('field', 'subject')
+    if field not in autocomplete.FIELDS:
+        return JsonResponse({'status': 'error', 'error': 'field must be "subject" or "tag".'}, status=400)
+    try:
+        limit = int(request.GET.get('limit', autocomplete.DEFAULT_LIMIT))
+    except ValueError:
+        limit = autocomplete.DEFAULT_LIMIT
+    limit = max(1, min(limit, autocomplete.MAX_LIMIT))
+    suggestions = autocomplete.suggest(request.user.id, field, request.GET.get('q', ''), limit)
+    return JsonResponse({'status': 'ok', 'field': field, 'results': [
+        {'value': value, 'count': count} for value, count in suggestions
+    ]})
+
+
+@login_required
+def completed_tasks_history(request):
+    """
+    One page of the user's completed tasks, live and archived, most recently
+    completed first (see notes/archive.py). Pass the returned `next_cursor`
+    as `?cursor=` for the next page; it is null on the last one.
+    """
+    rows, next_cursor = archive.completed_history(request.user, cursor=request.GET.get('cursor'))
+    return JsonResponse({
+        'status': 'ok',
+        'results': [archive.serialize_completed(row) for row in rows],
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+def sync_changes(request):
+    """
+    Tasks and notes changed since `?since=<cursor>` (see notes/sync.py).
+    The dashboard polls this and patches the page instead of reloading.
+    """
+    since = sync.decode_cursor(request.GET.get('since'))
+    if since is None:
+        return JsonResponse({'status': 'error', 'error': 'A valid "since" cursor is required.'}, status=400)
+    return JsonResponse({'status': 'ok', **sync.changes_since(request.user, since)})
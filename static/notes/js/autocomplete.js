@@ -0,0 +1,66 @@
+// Subject/tag suggestions for inputs marked data-autocomplete="subject|tag",
+// served by /api/autocomplete/ (notes/autocomplete.py). Suggestions are shown
+// through a <datalist>; for comma-separated tags only the last tag is completed.
+(function() {
+  const DELAY_MS = 120;
+  const cache = new Map();
+
+  function splitTags(value) {
+    const cut = value.lastIndexOf(',');
+    if (cut === -1) return ['', value.trim()];
+    return [value.slice(0, cut + 1) + ' ', value.slice(cut + 1).trim()];
+  }
+
+  function fetchSuggestions(url, field, q) {
+    const key = `${field}:${q.toLowerCase()}`;
+    if (!cache.has(key)) {
+      const params = new URLSearchParams({ field: field, q: q });
+      cache.set(key, fetch(`${url}?${params}`, { credentials: 'same-origin' })
+        .then(response => response.ok ? response.json() : { results: [] })
+        .then(data => data.results || [])
+        .catch(() => {
+          cache.delete(key);
+          return [];
+        }));
+    }
+    return cache.get(key);
+  }
+
+  function attach(input, index) {
+    const field = input.dataset.autocomplete;
+    const url = input.dataset.autocompleteUrl;
+    if (!url) return;
+    const list = document.createElement('datalist');
+    list.id = `autocomplete-${field}-${index}`;
+    input.after(list);
+    input.setAttribute('list', list.id);
+    input.setAttribute('autocomplete', 'off');
+
+    let timer = null;
+    input.addEventListener('input', () => {
+      clearTimeout(timer);
+      timer = setTimeout(() => {
+        const [head, q] = field === 'tag' ? splitTags(input.value) : ['', input.value.trim()];
+        fetchSuggestions(url, field, q).then(results => {
+          list.replaceChildren(...results.map(result => {
+            const option = document.createElement('option');
+            option.value = head + result.value;
+            return option;
+          }));
+        });
+      }, DELAY_MS);
+    });
+    // Most used values before the first keystroke
+    input.addEventListener('focus', () => input.dispatchEvent(new Event('input')), { once: true });
+  }
+
+  function init() {
+    document.querySelectorAll('input[data-autocomplete]').forEach(attach);
+  }
+
+  if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', init);
+  } else {
+    init();
+  }
+})();
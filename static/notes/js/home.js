@@ -673,7 +673,11 @@ document.addEventListener("DOMContentLoaded", function() {
                             });
                         }
 
-                        showNotification('Note created', 'success');
+                        if (data.duplicate_of) {
+                            showNotification(`Note created. It looks like a copy of "${data.duplicate_of}"; merge duplicates from All Notes.`, 'info');
+                        } else {
+                            showNotification('Note created', 'success');
+                        }
 
                         // reset form
                         addNoteForm.reset();
@@ -0,0 +1,299 @@
+// Dashboard delta sync: polls /api/sync/ and patches the page in place.
+// On ASGI deployments a server-sent event stream triggers the sync immediately
+// when a task changes and delivers due reminders.
+(function() {
+  const MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
+
+  function pad(n) {
+    return String(n).padStart(2, '0');
+  }
+
+  // Same shape as the template's date:"M d, Y H:i"
+  function formatDue(iso) {
+    if (!iso) return 'None';
+    const d = new Date(iso);
+    return `${MONTHS[d.getMonth()]} ${pad(d.getDate())}, ${d.getFullYear()} ${pad(d.getHours())}:${pad(d.getMinutes())}`;
+  }
+
+  function escapeHtml(unsafe) {
+    if (unsafe === null || unsafe === undefined) return '';
+    return String(unsafe)
+      .replace(/&/g, '&amp;')
+      .replace(/</g, '&lt;')
+      .replace(/>/g, '&gt;')
+      .replace(/"/g, '&quot;')
+      .replace(/'/g, '&#039;');
+  }
+
+  function truncateWords(text, num) {
+    if (!text) return '';
+    const words = text.split(/\s+/);
+    if (words.length <= num) return text;
+    return words.slice(0, num).join(' ') + '...';
+  }
+
+  function csrfToken() {
+    const input = document.querySelector('input[name="csrfmiddlewaretoken"]');
+    return input ? input.value : '';
+  }
+
+  // ==================== Tasks ====================
+  const OVERDUE_CLASSES = ['!border-red-500', 'from-red-50'];
+
+  function setOverdue(li, overdue) {
+    OVERDUE_CLASSES.forEach(cls => li.classList.toggle(cls, overdue));
+    li.classList.toggle('from-gray-50', !overdue);
+  }
+
+  function buildTaskItem(task) {
+    const li = document.createElement('li');
+    li.dataset.taskId = task.id;
+    li.className = 'bg-gradient-to-br from-gray-50 to-white border border-gray-200 border-l-4 border-emerald-500 rounded-xl p-4 hover:translate-x-1 hover:shadow-md transition-all';
+    const badge = {
+      high: 'bg-red-100 text-red-600',
+      medium: 'bg-orange-100 text-orange-600',
+    }[task.priority] || 'bg-emerald-100 text-emerald-600';
+    li.innerHTML = `
+      <div class="task-content flex justify-between items-start gap-4">
+        <div class="task-info flex-1">
+          <div class="flex items-center gap-2 mb-1">
+            <strong class="task-title text-gray-800 text-base"></strong>
+            <span class="priority-badge px-2 py-1 rounded-full text-xs font-bold uppercase tracking-wide ${badge}">${escapeHtml(task.priority)}</span>
+          </div>
+          <small class="task-meta text-xs text-gray-500"></small>
+          ${task.description ? `<p class="task-description mt-2 text-sm text-gray-600">${escapeHtml(truncateWords(task.description, 15))}</p>` : ''}
+        </div>
+        <div class="task-actions flex gap-2 flex-shrink-0">
+          <form method="post" action="${task.toggle_url}" style="display:inline;">
+            <input type="hidden" name="csrfmiddlewaretoken" value="${escapeHtml(csrfToken())}">
+            <button type="submit" class="btn-complete px-3 py-2 bg-gradient-to-r from-emerald-500 to-emerald-600 text-white rounded-lg hover:-translate-y-0.5 transition-all shadow-sm text-xs font-semibold" title="Mark as complete">✓</button>
+          </form>
+          <a href="?edit=${task.id}" class="btn-edit px-3 py-2 bg-gradient-to-r from-blue-500 to-blue-600 text-white rounded-lg hover:-translate-y-0.5 transition-all shadow-sm text-xs" title="Edit task">✏️</a>
+          <form method="post" action="${task.delete_url}" style="display:inline;">
+            <input type="hidden" name="csrfmiddlewaretoken" value="${escapeHtml(csrfToken())}">
+            <button type="submit" class="btn-delete px-3 py-2 bg-gradient-to-r from-red-500 to-red-600 text-white rounded-lg hover:-translate-y-0.5 transition-all shadow-sm text-xs" title="Delete task">🗑️</button>
+          </form>
+        </div>
+      </div>
+    `;
+    return li;
+  }
+
+  function applyTasks(changes) {
+    const list = document.querySelector('ul.task-list');
+    if (!list) return;
+
+    changes.updated.forEach(task => {
+      // A completed or edited occurrence of a repeating task replaces its expanded row
+      if (task.series_id) {
+        const occurrence = list.querySelector(`li[data-series-id="${task.series_id}"][data-occurrence="${task.occurrence}"]`);
+        if (occurrence) occurrence.remove();
+      }
+      let li = list.querySelector(`li[data-task-id="${task.id}"]`);
+      // The list only shows tasks that still need doing
+      if (task.status === 'completed') {
+        if (li) li.remove();
+        return;
+      }
+      if (!li) {
+        li = buildTaskItem(task);
+        list.prepend(li);
+      }
+      li.querySelector('.task-title').textContent = task.title;
+      li.querySelector('.task-meta').textContent = `Due: ${formatDue(task.due_date)} | Status: ${task.status_display}`;
+      setOverdue(li, task.is_overdue);
+    });
+
+    changes.deleted.forEach(id => {
+      const li = list.querySelector(`li[data-task-id="${id}"]`);
+      if (li) li.remove();
+    });
+
+    // Placeholder row ("No tasks yet.") only when the list is empty
+    const placeholder = list.querySelector('li:not([data-task-id])');
+    const hasTasks = list.querySelector('li[data-task-id]') !== null;
+    if (hasTasks && placeholder) placeholder.remove();
+    if (!hasTasks && !placeholder) {
+      const empty = document.createElement('li');
+      empty.className = 'bg-gray-50 p-4 rounded-lg text-gray-500 text-center';
+      empty.textContent = 'No tasks yet.';
+      list.appendChild(empty);
+    }
+  }
+
+  // ==================== Notes ====================
+  function buildNoteItem(note) {
+    const div = document.createElement('div');
+    div.dataset.noteId = note.id;
+    div.className = 'note bg-gradient-to-br from-gray-50 to-white border-l-4 border-emerald-500 p-4 rounded-lg hover:translate-x-2 hover:shadow-md transition-all cursor-pointer';
+    div.innerHTML = `
+      <div class="relative">
+        <h4 class="text-base font-semibold text-gray-800 mb-2"></h4>
+      </div>
+      <p class="text-sm text-gray-600 leading-relaxed mb-2"></p>
+      <span class="date text-xs text-gray-400 font-medium">${escapeHtml(note.created_at)}</span>
+      <div class="note-actions mt-3 flex gap-2">
+        <button type="button" class="btn btn-sm px-3 py-1 bg-blue-500 text-white rounded-md hover:bg-blue-600 transition text-xs font-semibold"
+                onclick="openEditModal(this)">✏️ Edit</button>
+        <form method="post" action="${note.delete_url}" style="display:inline;">
+          <input type="hidden" name="csrfmiddlewaretoken" value="${escapeHtml(csrfToken())}">
+          <button type="submit" class="btn btn-sm btn-danger px-3 py-1 bg-red-500 text-white rounded-md hover:bg-red-600 transition text-xs font-semibold" onclick="return confirm('Delete this note?');">🗑️ Delete</button>
+        </form>
+      </div>
+    `;
+    return div;
+  }
+
+  function applyNotes(changes) {
+    const container = document.querySelector('.card.notes .note-list');
+    if (!container) return;
+
+    changes.updated.forEach(note => {
+      let item = container.querySelector(`[data-note-id="${note.id}"]`);
+      if (!item) {
+        item = buildNoteItem(note);
+        container.prepend(item);
+      }
+      item.querySelector('h4').textContent = note.title;
+      item.querySelector('p').textContent = truncateWords(note.content, 15);
+      const editBtn = item.querySelector('button[onclick^="openEditModal"]');
+      if (editBtn) {
+        Object.assign(editBtn.dataset, {
+          id: note.id,
+          title: note.title,
+          content: note.content,
+          subject: (note.subject || '').toLowerCase(),
+          tags: note.tags,
+          url: note.edit_url,
+        });
+      }
+    });
+
+    changes.deleted.forEach(id => {
+      const item = container.querySelector(`[data-note-id="${id}"]`);
+      if (item) item.remove();
+    });
+
+    // Placeholder ("No notes yet") only when the list is empty
+    const placeholder = container.querySelector('.note:not([data-note-id])');
+    const hasNotes = container.querySelector('[data-note-id]') !== null;
+    if (hasNotes && placeholder) placeholder.remove();
+    if (!hasNotes && !placeholder) {
+      const empty = document.createElement('div');
+      empty.className = 'note bg-gradient-to-br from-gray-50 to-white border-l-4 border-gray-300 p-4 rounded-lg';
+      empty.innerHTML = `
+        <h4 class="text-base font-semibold text-gray-800 mb-2">No notes yet</h4>
+        <p class="text-sm text-gray-600">Start creating notes to organize your study materials.</p>
+      `;
+      container.appendChild(empty);
+    }
+  }
+
+  function applyStats(stats) {
+    if (!stats) return;
+    Object.keys(stats).forEach(key => {
+      document.querySelectorAll(`[data-stat="${key}"]`).forEach(el => { el.textContent = stats[key]; });
+    });
+  }
+
+  // ==================== Reminders ====================
+  function showReminder(reminder) {
+    const toast = document.createElement('div');
+    toast.className = 'fixed bottom-6 right-6 z-[10001] max-w-sm px-5 py-4 rounded-xl shadow-lg bg-amber-100 text-amber-900 border border-amber-300';
+    toast.innerHTML = `<strong>⏰ Reminder</strong><p class="mt-1 text-sm">${escapeHtml(reminder.task_title)}</p>`;
+    document.body.appendChild(toast);
+    setTimeout(() => toast.remove(), 10000);
+
+    if (window.Notification && Notification.permission === 'granted') {
+      new Notification('StuNotes reminder', { body: reminder.task_title });
+    }
+  }
+
+  // ==================== Polling ====================
+  document.addEventListener('DOMContentLoaded', function() {
+    const config = document.getElementById('dashboardSync');
+    if (!config) return;
+    const url = config.dataset.url;
+    const interval = parseInt(config.dataset.pollSeconds, 10) * 1000;
+    let cursor = config.dataset.cursor;
+    let timer = null;
+    let inFlight = false;
+    let again = false;
+    let stopped = !(interval > 0);
+
+    function schedule() {
+      clearTimeout(timer);
+      if (!stopped && !document.hidden) timer = setTimeout(poll, interval);
+    }
+
+    function poll() {
+      if (stopped) return;
+      if (inFlight) {
+        again = true;
+        return;
+      }
+      inFlight = true;
+      fetch(`${url}?since=${encodeURIComponent(cursor)}`, {
+        credentials: 'same-origin',
+        headers: { 'Accept': 'application/json', 'X-Requested-With': 'XMLHttpRequest' },
+      })
+        .then(resp => {
+          const type = resp.headers.get('Content-Type') || '';
+          // A redirect to the login page (session ended) is not JSON
+          if (!resp.ok || !type.includes('application/json')) throw new Error(`sync stopped (${resp.status})`);
+          return resp.json();
+        })
+        .then(data => {
+          if (data.reset) {
+            window.location.reload();
+            return;
+          }
+          applyTasks(data.tasks);
+          applyNotes(data.notes);
+          applyStats(data.stats);
+          cursor = data.cursor;
+        })
+        .catch(err => {
+          stopped = true;
+          console.warn('Dashboard sync', err);
+        })
+        .finally(() => {
+          inFlight = false;
+          if (again) {
+            again = false;
+            poll();
+          } else {
+            schedule();
+          }
+        });
+    }
+
+    // Only poll while the tab is visible; catch up as soon as it is shown again
+    document.addEventListener('visibilitychange', () => {
+      if (document.hidden) {
+        clearTimeout(timer);
+      } else {
+        poll();
+      }
+    });
+
+    schedule();
+
+    // Server-sent events: sync right away when a task changes, show reminders
+    const eventsUrl = config.dataset.eventsUrl;
+    if (eventsUrl && window.EventSource) {
+      const source = new EventSource(eventsUrl);
+      let dropped = false;
+      source.addEventListener('task', () => poll());
+      source.addEventListener('reminder', e => showReminder(JSON.parse(e.data)));
+      source.addEventListener('error', () => { dropped = true; });
+      // Catch up on anything missed while reconnecting
+      source.addEventListener('open', () => {
+        if (dropped) {
+          dropped = false;
+          poll();
+        }
+      });
+    }
+  });
+})();
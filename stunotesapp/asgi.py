@@ -2,6 +2,12 @@
 ASGI config for stunotes project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serving through ASGI also switches the dashboard/profile pages to the async
+views in ``notes/async_views.py`` (``ASYNC_VIEWS``) and enables the
+server-sent events stream at ``EVENTS_URL`` (``notes/events.py``), which is
+handled here before Django's request/response cycle. Run it with:
+
+    gunicorn -c gunicorn_asgi.conf.py stunotesapp.asgi:application
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,6 +17,17 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stunotes.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stunotesapp.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'true')
+
+django_application = get_asgi_application()
+
+# Imported after setup: notes.events reads settings and the auth models
+from django.conf import settings  # noqa: E402
+from notes.events import sse_application  # noqa: E402
+
 
-application = get_asgi_application()
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and settings.EVENTS_URL and scope['path'] == settings.EVENTS_URL:
+        return await sse_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,78 @@
+"""
+Cold-start import-time harness.
+
+Runs a fresh interpreter with ``python -X importtime``, imports the WSGI app
+(optionally also the URLconf, which pulls in the views the first request
+needs) and reports the total and the most expensive imports:
+
+    python -m stunotesapp.importtime
+    python -m stunotesapp.importtime --settings stunotesapp.settings --urls --top 40
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_SETTINGS = 'stunotesapp.settings_serverless'
+
+# Cold-start budget (total import time of app + URLconf) checked by notes.tests
+# when RUN_BENCHMARKS is set.
+# Override per machine with STARTUP_IMPORT_BUDGET_MS.
+IMPORT_BUDGET_MS = int(os.environ.get('STARTUP_IMPORT_BUDGET_MS', 250))
+
+# Modules that must stay off the cold-start path (loaded on first use instead)
+DEFERRED_MODULES = (
+    'cloudinary', 'cloudinary_storage', 'pymysql', 'PIL', 'widget_tweaks', 'numpy', 'markdown_it', 'nh3',
+)
+
+
+def measure(settings=DEFAULT_SETTINGS, urls=False, env=None):
+    """
+    Import the app in a subprocess and return ``(total_us, imports)`` where
+    ``imports`` maps module name -> ``(self_us, cumulative_us, depth)``.
+    """
+    code = 'import stunotesapp.wsgi'
+    if urls:
+        code += '; from django.urls import get_resolver; get_resolver().url_patterns'
+
+    child_env = dict(os.environ if env is None else env)
+    child_env['DJANGO_SETTINGS_MODULE'] = settings
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=BASE_DIR, env=child_env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+
+    imports = {}
+    total = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports[name.strip()] = (int(self_us), int(cumulative_us), depth)
+        total += int(self_us)
+    return total, imports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', default=DEFAULT_SETTINGS)
+    parser.add_argument('--urls', action='store_true', help="Also import the URLconf and views.")
+    parser.add_argument('--top', type=int, default=25)
+    args = parser.parse_args(argv)
+
+    total, imports = measure(args.settings, urls=args.urls)
+    print(f"{args.settings}: {len(imports)} modules, {total / 1000:.1f} ms total import time\n")
+    print(f"{'cumulative':>12} {'self':>9}  module")
+    ranked = sorted(imports.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_us, cumulative_us, depth) in ranked[:args.top]:
+        print(f"{cumulative_us / 1000:10.1f}ms {self_us / 1000:7.1f}ms  {'  ' * depth}{name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,19 +5,19 @@ Optimized for deployment on Vercel using Supabase PostgreSQL.
 
 import os
 from pathlib import Path
-import dj_database_url
-from dotenv import load_dotenv
 from decouple import config
-import cloudinary
-
-# Load environment variables
-load_dotenv()
 
 # ---------------------------------------------------
 # BASE DIRECTORY
 # ---------------------------------------------------
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Load environment variables from a local .env (dev only; Vercel injects them
+# directly, so skip importing python-dotenv on serverless cold starts)
+if (BASE_DIR / '.env').exists():
+    from dotenv import load_dotenv
+    load_dotenv(BASE_DIR / '.env')
+
 
 # ---------------------------------------------------
 # SECURITY SETTINGS
@@ -48,9 +48,12 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'cloudinary_storage',  # Must be BEFORE staticfiles
-    'cloudinary',
     'django.contrib.staticfiles',  # Only once!
+    # Listed AFTER staticfiles: static files are served by WhiteNoise, so we want
+    # Django's collectstatic, not cloudinary_storage's (which skips copying
+    # unhashed files and breaks WhiteNoise's compression step).
+    'cloudinary_storage',
+    'cloudinary',
     'notes',
     'widget_tweaks',
 ]
@@ -58,6 +61,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For serving static files on Vercel
+    'notes.compression.response_compression_middleware',  # HTML minify + gzip/br; static files are precompressed
+    'notes.routers.replica_routing_middleware',  # Read replica routing; before sessions
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -84,6 +89,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'stunotesapp.wsgi.application'
+ASGI_APPLICATION = 'stunotesapp.asgi.application'
+
+# Route the dashboard/profile pages to the coroutine views in notes/async_views.py.
+# stunotesapp/asgi.py turns this on; leave it off for WSGI deployments.
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
 
 
 # ---------------------------------------------------
@@ -96,6 +106,7 @@ WSGI_APPLICATION = 'stunotesapp.wsgi.application'
 database_url = config('DATABASE_URL', default='')
 
 if database_url:
+    import dj_database_url
     DATABASES = {
         'default': dj_database_url.parse(database_url, conn_max_age=0)
     }
@@ -123,6 +134,29 @@ else:
             }
         }
 
+# Optional read replica (see notes/routers.py): GET requests read from it,
+# with reads pinned to the primary for a while after a browser's own writes.
+# For a local try-out, copy db.sqlite3 and point DATABASE_REPLICA_URL at the copy.
+database_replica_url = config('DATABASE_REPLICA_URL', default='')
+if database_replica_url:
+    import dj_database_url
+    DATABASES['replica'] = dj_database_url.parse(database_replica_url, conn_max_age=0)
+    if 'postgresql' in DATABASES['replica']['ENGINE']:
+        DATABASES['replica']['OPTIONS'] = {'sslmode': 'require'}
+    # Tests run against one database; the replica alias mirrors it
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['notes.routers.ReplicaRouter']
+# How long a browser keeps reading from the primary after it wrote something;
+# should exceed the replica's usual lag.
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=15, cast=int)
+
+
+# PyMySQL stands in for mysqlclient; only load it when a MySQL engine is configured
+if 'mysql' in DATABASES['default']['ENGINE']:
+    import pymysql
+    pymysql.install_as_MySQLdb()
+
 
 # ---------------------------------------------------
 # SESSION MANAGEMENT (Auto Logout, Stay Signed In)
@@ -154,14 +188,40 @@ AUTH_USER_MODEL = 'notes.User'
 LOGIN_URL = 'notes:login'
 
 
+# ---------------------------------------------------
+# CACHE & RATE LIMITING
+# ---------------------------------------------------
+# Local memory by default. For counters shared between processes on one
+# machine use CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# with CACHE_LOCATION=/tmp/stunotes-cache.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='stunotes'),
+    }
+}
+
+# Throttling of login/register/add_user/password change (see notes/ratelimit.py).
+# Override limits with RATE_LIMITS = {scope: {'ip'|'email': (max requests, seconds)}}.
+RATELIMIT_ENABLED = config('RATELIMIT_ENABLED', default=True, cast=bool)
+# Reverse proxies in front of the app that append to X-Forwarded-For; with 0
+# the client address is REMOTE_ADDR. Vercel's edge sets the header itself, so
+# settings_serverless defaults to 1.
+RATELIMIT_PROXY_COUNT = config('RATELIMIT_PROXY_COUNT', default=0, cast=int)
+
+
 # ---------------------------------------------------
 # CLOUDINARY CONFIGURATION (Media Files)
 # ---------------------------------------------------
-cloudinary.config(
-    cloud_name = config('CLOUDINARY_CLOUD_NAME', default=''),
-    api_key = config('CLOUDINARY_API_KEY', default=''),
-    api_secret = config('CLOUDINARY_API_SECRET', default='')
-)
+# cloudinary_storage applies these credentials the first time the media storage
+# is used, so the cloudinary SDK isn't imported at startup. When they are not
+# set, CLOUDINARY_URL (or the CLOUDINARY_* env vars) is picked up instead.
+if config('CLOUDINARY_CLOUD_NAME', default=''):
+    CLOUDINARY_STORAGE = {
+        'CLOUD_NAME': config('CLOUDINARY_CLOUD_NAME', default=''),
+        'API_KEY': config('CLOUDINARY_API_KEY', default=''),
+        'API_SECRET': config('CLOUDINARY_API_SECRET', default=''),
+    }
 
 # Use Cloudinary for all media file storage
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
@@ -176,12 +236,20 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / "staticfiles"  # for Vercel deployment
 
-# Static files config - Use simple storage for development
-STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Static files config - Use simple storage for development.
+# Production: bundled + minified, hashed names, gzip/brotli variants (see stunotesapp/static_storage.py)
+STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG else 'stunotesapp.static_storage.MinifiedManifestStaticFilesStorage'
 
-# Configure WhiteNoise
-WHITENOISE_USE_FINDERS = True
-WHITENOISE_AUTOREFRESH = True
+# Files concatenated into one asset at collectstatic; use {% static_bundle %} in templates
+STATIC_BUNDLES = {
+    'notes/js/login.bundle.js': ['notes/js/common.js', 'notes/js/login.js'],
+}
+
+# Configure WhiteNoise. Finders/autorefresh re-scan static files on every
+# request, so only use them while developing; production serves the
+# collected STATIC_ROOT (hashed files get far-future immutable headers).
+WHITENOISE_USE_FINDERS = DEBUG
+WHITENOISE_AUTOREFRESH = DEBUG
 WHITENOISE_MANIFEST_STRICT = False
 
 # Media URL (served by Cloudinary)
@@ -197,6 +265,114 @@ SECURE_HSTS_INCLUDE_SUBDOMAINS = not DEBUG
 SECURE_HSTS_PRELOAD = not DEBUG
 
 
+# ---------------------------------------------------
+# BACKGROUND JOBS (Vercel cron)
+# ---------------------------------------------------
+# Vercel sends this as a Bearer token to the cron endpoints; unset disables them.
+CRON_SECRET = config('CRON_SECRET', default='')
+# Seconds of work per cron invocation (keep below the function timeout)
+CRON_TIME_BUDGET = config('CRON_TIME_BUDGET', default=8, cast=int)
+# Completed tasks move to the archive table this many days after their last
+# change (notes/archive.py); 0 keeps them in notes_task.
+TASK_ARCHIVE_AFTER_DAYS = config('TASK_ARCHIVE_AFTER_DAYS', default=90, cast=int)
+
+
+# ---------------------------------------------------
+# DASHBOARD SYNC (notes/sync.py)
+# ---------------------------------------------------
+# How often the dashboard polls for changes; 0 turns polling off.
+SYNC_POLL_SECONDS = config('SYNC_POLL_SECONDS', default=30, cast=int)
+# Deleted-row markers are kept this long; older cursors trigger a page reload.
+SYNC_TOMBSTONE_RETENTION_DAYS = config('SYNC_TOMBSTONE_RETENTION_DAYS', default=30, cast=int)
+
+
+# ---------------------------------------------------
+# NOTE REVISIONS (notes/revisions.py)
+# ---------------------------------------------------
+# A full copy every N revisions, line deltas in between; bounds reconstruction work.
+NOTE_REVISION_SNAPSHOT_INTERVAL = config('NOTE_REVISION_SNAPSHOT_INTERVAL', default=20, cast=int)
+# Retention, applied by the cron endpoint / `manage.py compact_note_revisions`; 0 = unlimited.
+NOTE_REVISION_MAX_PER_NOTE = config('NOTE_REVISION_MAX_PER_NOTE', default=200, cast=int)
+NOTE_REVISION_MAX_AGE_DAYS = config('NOTE_REVISION_MAX_AGE_DAYS', default=365, cast=int)
+
+# ---------------------------------------------------
+# NOTE CONTENT STORAGE (notes/fields.py)
+# ---------------------------------------------------
+# zlib (default), zstd (needs the zstandard package) or off. Existing rows stay
+# readable whatever this is set to; only newly saved content follows it.
+NOTE_CONTENT_COMPRESSION = config('NOTE_CONTENT_COMPRESSION', default='zlib')
+# Bodies smaller than this (UTF-8 bytes) are stored uncompressed
+NOTE_CONTENT_COMPRESS_MIN_BYTES = config('NOTE_CONTENT_COMPRESS_MIN_BYTES', default=1024, cast=int)
+
+# ---------------------------------------------------
+# ADMIN CHANGELISTS (notes/pagination.py)
+# ---------------------------------------------------
+# Above this many rows (planner estimate, PostgreSQL only) changelists show an
+# estimate instead of running COUNT(*); 0 always counts exactly.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = config('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=10000, cast=int)
+
+# ---------------------------------------------------
+# RESPONSE COMPRESSION (notes/compression.py)
+# ---------------------------------------------------
+# Strip comments and indentation from HTML responses
+RESPONSE_MINIFY_HTML = config('RESPONSE_MINIFY_HTML', default=True, cast=bool)
+# Text responses at least this big (bytes) are sent gzip/brotli-compressed
+RESPONSE_COMPRESS_MIN_BYTES = config('RESPONSE_COMPRESS_MIN_BYTES', default=1024, cast=int)
+
+# ---------------------------------------------------
+# SUBJECT/TAG SUGGESTIONS (notes/autocomplete.py)
+# ---------------------------------------------------
+# Per-user prefix indexes kept in each process, least recently used dropped first
+AUTOCOMPLETE_MAX_INDEXES = config('AUTOCOMPLETE_MAX_INDEXES', default=500, cast=int)
+# Rebuild an index at least this often (seconds). Writes rebuild it sooner
+# through a version key in the default cache, immediately if that is shared.
+AUTOCOMPLETE_INDEX_TTL = config('AUTOCOMPLETE_INDEX_TTL', default=300, cast=int)
+
+# ---------------------------------------------------
+# RELATED NOTES (notes/related.py)
+# ---------------------------------------------------
+# Users whose TF-IDF matrices each process keeps, and how long (seconds)
+# one is used before it is rebuilt from the stored note vectors
+RELATED_NOTES_MAX_USERS = config('RELATED_NOTES_MAX_USERS', default=100, cast=int)
+RELATED_NOTES_TTL = config('RELATED_NOTES_TTL', default=300, cast=int)
+
+# ---------------------------------------------------
+# CALENDAR FEED (notes/ical.py)
+# ---------------------------------------------------
+# Generated feeds are cached under their ETag for this long (seconds); bodies
+# over CALENDAR_FEED_CACHE_MAX_BYTES are streamed but not cached
+CALENDAR_FEED_CACHE_TTL = config('CALENDAR_FEED_CACHE_TTL', default=3600, cast=int)
+CALENDAR_FEED_CACHE_MAX_BYTES = config('CALENDAR_FEED_CACHE_MAX_BYTES', default=512 * 1024, cast=int)
+
+# ---------------------------------------------------
+# SERVER-SENT EVENTS (notes/events.py, ASGI only)
+# ---------------------------------------------------
+# Path of the event stream served by stunotesapp/asgi.py; empty disables it.
+EVENTS_URL = config('EVENTS_URL', default='/events/' if ASYNC_VIEWS else '')
+# Relay shared by several ASGI workers (`manage.py run_event_broker`), e.g. tcp://127.0.0.1:8765.
+# Unset: events only reach streams held by the worker that published them.
+EVENTS_BROKER_URL = config('EVENTS_BROKER_URL', default='')
+EVENTS_HEARTBEAT_SECONDS = config('EVENTS_HEARTBEAT_SECONDS', default=25, cast=int)
+EVENTS_REMINDER_POLL_SECONDS = config('EVENTS_REMINDER_POLL_SECONDS', default=30, cast=int)
+# Events buffered per stream before the oldest are dropped
+EVENTS_QUEUE_SIZE = config('EVENTS_QUEUE_SIZE', default=100, cast=int)
+
+
+# ---------------------------------------------------
+# PASSWORD HASHING
+# ---------------------------------------------------
+# Hasher + cost used for new/rehashed passwords (see notes/hashers.py).
+# Stored hashes are upgraded to this policy on the user's next login.
+# Compare per-login CPU cost with `python manage.py bench_password_hashing`.
+PASSWORD_HASH_POLICY = config('PASSWORD_HASH_POLICY', default='default')
+# PBKDF2 iterations for the pbkdf2 policy; only counts above Django's default (600k) apply
+PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', default=0, cast=int)
+PASSWORD_SCRYPT_WORK_FACTOR = config('PASSWORD_SCRYPT_WORK_FACTOR', default=2 ** 14, cast=int)
+
+from notes.hashers import password_hashers  # noqa: E402
+PASSWORD_HASHERS = password_hashers(PASSWORD_HASH_POLICY)
+
+
 # ---------------------------------------------------
 # PASSWORD VALIDATORS
 # ---------------------------------------------------
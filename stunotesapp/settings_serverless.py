@@ -0,0 +1,27 @@
+"""
+Settings profile for serverless (Vercel) request handling.
+Same as the main settings, minus apps that are never used while serving
+requests, so each cold start imports and initialises less.
+Management commands (collectstatic, migrate, ...) keep using `settings`.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, config
+
+# Apps only needed for their management commands or template tags, neither of
+# which the request path uses. Media storage is referenced by dotted path
+# (DEFAULT_FILE_STORAGE), so Cloudinary uploads still work without the apps.
+SERVERLESS_SKIP_APPS = {
+    'cloudinary',
+    'cloudinary_storage',
+    'widget_tweaks',
+}
+
+# The Django admin (/admin/) is the heaviest optional app; deployments that
+# only use the in-app admin dashboard can turn it off.
+if not config('DJANGO_ADMIN_ENABLED', default=True, cast=bool):
+    SERVERLESS_SKIP_APPS.add('django.contrib.admin')
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in SERVERLESS_SKIP_APPS]
+
+# Vercel's edge writes the client address to X-Forwarded-For (notes/ratelimit.py)
+RATELIMIT_PROXY_COUNT = config('RATELIMIT_PROXY_COUNT', default=1, cast=int)
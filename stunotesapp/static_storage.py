@@ -0,0 +1,66 @@
+"""
+Production static files storage.
+
+On top of WhiteNoise's CompressedManifestStaticFilesStorage (hashed file
+names + gzip/brotli variants), collectstatic also:
+
+- concatenates the groups listed in ``settings.STATIC_BUNDLES`` into single
+  files, so a page needs one request instead of several;
+- minifies ``.js``/``.css`` (rjsmin/rcssmin) before they are hashed and
+  compressed.
+
+WhiteNoise serves the hashed names with ``Cache-Control: immutable``.
+"""
+from django.conf import settings
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+MINIFY_EXTENSIONS = ('.js', '.css')
+
+
+def minify(name, text):
+    """Minify JS/CSS source; other file types are returned unchanged."""
+    if name.endswith('.js'):
+        import rjsmin
+        return rjsmin.jsmin(text)
+    if name.endswith('.css'):
+        import rcssmin
+        return rcssmin.cssmin(text)
+    return text
+
+
+class MinifiedManifestStaticFilesStorage(CompressedManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = dict(paths)
+            self._build_bundles(paths)
+            self._minify(paths)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def _read(self, paths, name):
+        storage, path = paths[name]
+        with storage.open(path) as fh:
+            return fh.read().decode('utf-8')
+
+    def _replace(self, name, text):
+        # Overwrite the copy collectstatic made, keeping the same name
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(text.encode('utf-8')))
+
+    def _build_bundles(self, paths):
+        for bundle, members in getattr(settings, 'STATIC_BUNDLES', {}).items():
+            missing = [member for member in members if member not in paths]
+            if missing:
+                raise ValueError(f"Static bundle {bundle!r} references unknown files: {missing}")
+            separator = ';\n' if bundle.endswith('.js') else '\n'
+            self._replace(bundle, separator.join(self._read(paths, member) for member in members))
+            paths[bundle] = (self, bundle)
+
+    def _minify(self, paths):
+        for name in list(paths):
+            if not name.endswith(MINIFY_EXTENSIONS) or '.min.' in name:
+                continue
+            self._replace(name, minify(name, self._read(paths, name)))
+            paths[name] = (self, name)
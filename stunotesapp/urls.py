@@ -1,11 +1,8 @@
-from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from notes import views
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     # Use the notes app's root landing page as the project's default root.
     # The logic for redirecting to login vs. landing (first-run) is handled in `notes.views.landing_view`.
     path('', include('notes.urls')),
@@ -14,6 +11,11 @@ urlpatterns = [
     
 ]
 
+# The serverless settings profile can leave the Django admin out
+if 'django.contrib.admin' in settings.INSTALLED_APPS:
+    from django.contrib import admin
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
+
 # Serve media files during development
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -10,7 +10,7 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 import os
 from django.core.wsgi import get_wsgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stunotesapp.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stunotesapp.settings_serverless')
 
 application = get_wsgi_application()
 
@@ -5,5 +5,20 @@ export default {
     './templates/**/*.html',
     './notes/templates/**/*.html',
     './view/templates/**/*.html',
+    // Classes added at runtime (toasts, sync updates, filters)
+    './static/notes/js/**/*.js',
   ],
-}
\ No newline at end of file
+  theme: {
+    extend: {
+      colors: {
+        'emerald-custom': {
+          50: '#e8f5e9',
+          100: '#c8e6c9',
+          500: '#4caf50',
+          600: '#43a047',
+          700: '#388e3c',
+        },
+      },
+    },
+  },
+}